@@ -0,0 +1,39 @@
+# bench/__init__.py
+"""
+Suíte de benchmarks do sistema de certificados.
+
+Gera volumes sintéticos reprodutíveis (semente fixa) e mede as rotas
+principais, reportando p50/p95/p99 e quantidade de statements SQL por rota.
+
+Uso:
+    python -m bench seed --registros 20000 --responsaveis 2000 --reset
+    python -m bench rotas --iteracoes 50
+    python -m bench rotas --url http://127.0.0.1:5000 --concorrencia 8
+
+Sem ``--database-url`` é usado um SQLite em ``bench/bench.db``; nunca aponte
+o benchmark para o banco de produção.
+"""
+
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_URL_PADRAO = f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}"
+
+# Credenciais do administrador criado pelo gerador
+ADMIN_USUARIO = 'admin'
+ADMIN_SENHA = 'bench-admin'
+
+
+def configurar_ambiente(database_url=None):
+    """Define as variáveis lidas por ``app.py`` na importação.
+
+    Precisa ser chamada antes de qualquer ``import app``.
+    """
+    os.environ['DATABASE_URL'] = database_url or os.environ.get('BENCH_DATABASE_URL') or DATABASE_URL_PADRAO
+    os.environ.setdefault('FLASK_ENV', 'production')
+    os.environ.setdefault('MAIL_SUPPRESS_SEND', 'true')
+    # Statements lentos seriam logados a cada iteração e distorceriam a medição
+    os.environ.setdefault('SQL_SLOW_QUERY_MS', '0')
+    # Jobs agendados disparariam alertas durante a medição
+    os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+    return os.environ['DATABASE_URL']
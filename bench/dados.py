@@ -0,0 +1,153 @@
+# bench/dados.py
+"""Gerador de dados sintéticos com semente fixa."""
+
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, func
+from werkzeug.security import generate_password_hash
+
+from bench import ADMIN_USUARIO, ADMIN_SENHA
+
+TIPOS = ['certificado', 'senha', 'licenca']
+ORIGENS = ['Receita Federal', 'Serasa', 'Certisign', 'Microsoft', 'Oracle', 'VMware', 'Interno']
+DEPARTAMENTOS = ['TI', 'Financeiro', 'RH', 'Jurídico', 'Compras', 'Operações']
+ACOES_USUARIO = ['login', 'login', 'login', 'updated', 'status_changed', 'password_reset']
+ACOES_REGISTRO = ['created', 'updated', 'updated', 'regularized', 'deleted']
+LOTE = 5000
+
+
+def _inserir_em_lotes(model, linhas):
+    from models import db
+    for inicio in range(0, len(linhas), LOTE):
+        db.session.execute(insert(model), linhas[inicio:inicio + LOTE])
+
+
+def _momento_aleatorio(rng, agora, dias):
+    return agora - timedelta(seconds=rng.randint(0, dias * 86400))
+
+
+def popular(registros=5000, responsaveis=500, fanout=3, usuarios=50, historico=20000,
+            seed=42, reset=False, saida=print):
+    """Cria o esquema padrão (via ``manage_db``) e insere o volume pedido.
+
+    ``fanout`` é o máximo de responsáveis por registro; ``historico`` é dividido
+    entre ``user_history``, ``role_history`` e ``registro_history``.
+    Retorna um dicionário com as quantidades e o tempo gasto.
+    """
+    from app import app
+    from manage_db import DatabaseManager
+    from models import (db, Registro, Responsavel, User, Role, RoleHistory, UserHistory,
+                        RegistroHistory, registro_responsavel)
+
+    rng = random.Random(seed)
+    hoje = date.today()
+    agora = datetime.now()
+    inicio = time.perf_counter()
+
+    with app.app_context():
+        if reset:
+            saida("Removendo tabelas existentes...")
+            db.drop_all()
+        else:
+            db.create_all()
+            if db.session.query(func.count(Registro.id)).scalar():
+                raise RuntimeError("O banco já possui registros; use --reset para recriá-lo")
+
+        DatabaseManager().init_database(reset=False)
+
+        roles = {role.nome: role.id for role in Role.query.all()}
+        senha_hash = generate_password_hash(ADMIN_SENHA)
+
+        saida(f"Usuários: {usuarios} + admin")
+        admin = User.query.filter_by(username=ADMIN_USUARIO).first()
+        if admin:
+            admin.password = senha_hash
+            admin.status = 'ativo'
+        _inserir_em_lotes(User, ([] if admin else [{
+            'username': ADMIN_USUARIO, 'nome': 'Administrador', 'email': 'admin@bench.local',
+            'password': senha_hash, 'status': 'ativo', 'role_id': roles['admin'], 'login_count': 0,
+        }]) + [{
+            'username': f'usuario{i:05d}', 'nome': f'Usuário {i}', 'email': f'usuario{i:05d}@bench.local',
+            'password': senha_hash,
+            'status': rng.choices(['ativo', 'inativo', 'bloqueado'], weights=[90, 7, 3])[0],
+            'role_id': rng.choice(list(roles.values())),
+            'departamento': rng.choice(DEPARTAMENTOS),
+            'login_count': rng.randint(0, 500),
+            'last_login': _momento_aleatorio(rng, agora, 90),
+        } for i in range(usuarios)])
+
+        saida(f"Responsáveis: {responsaveis}")
+        _inserir_em_lotes(Responsavel, [{
+            'nome': f'Responsável {i}', 'email': f'responsavel{i:06d}@bench.local',
+        } for i in range(responsaveis)])
+
+        saida(f"Registros: {registros} (até {fanout} responsáveis cada)")
+        _inserir_em_lotes(Registro, [{
+            'nome': f'{rng.choice(TIPOS).title()} {i:06d}',
+            'origem': rng.choice(ORIGENS),
+            'tipo': rng.choice(TIPOS),
+            'data_vencimento': hoje + timedelta(days=rng.randint(-400, 400)),
+            'tempo_alerta': rng.choice([7, 15, 30, 60]),
+            'observacoes': None if rng.random() < 0.7 else f'Observação gerada {i}',
+            'regularizado': rng.random() < 0.1,
+        } for i in range(registros)])
+
+        ids_registros = [linha[0] for linha in db.session.query(Registro.id).order_by(Registro.id)]
+        ids_responsaveis = [linha[0] for linha in db.session.query(Responsavel.id).order_by(Responsavel.id)]
+        associacoes = []
+        if ids_responsaveis:
+            for registro_id in ids_registros:
+                quantidade = rng.randint(1, min(fanout, len(ids_responsaveis)))
+                for responsavel_id in rng.sample(ids_responsaveis, quantidade):
+                    associacoes.append({'registro_id': registro_id, 'responsavel_id': responsavel_id})
+        for lote in range(0, len(associacoes), LOTE):
+            db.session.execute(registro_responsavel.insert(), associacoes[lote:lote + LOTE])
+        saida(f"Associações registro-responsável: {len(associacoes)}")
+
+        ids_usuarios = [linha[0] for linha in db.session.query(User.id)]
+        ids_roles = list(roles.values())
+        por_tabela = historico // 3
+        saida(f"Histórico: {historico} linhas")
+        _inserir_em_lotes(UserHistory, [{
+            'user_id': rng.choice(ids_usuarios),
+            'acao': rng.choice(ACOES_USUARIO),
+            'usuario': ADMIN_USUARIO,
+            'ip_address': f'10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+            'user_agent': 'bench',
+            'created_at': _momento_aleatorio(rng, agora, 365),
+        } for _ in range(por_tabela)])
+        _inserir_em_lotes(RoleHistory, [{
+            'role_id': rng.choice(ids_roles),
+            'acao': rng.choice(['updated', 'permissions_changed']),
+            'usuario': ADMIN_USUARIO,
+            'timestamp': _momento_aleatorio(rng, agora, 365),
+        } for _ in range(por_tabela)])
+        _inserir_em_lotes(RegistroHistory, [{
+            'registro_id': rng.choice(ids_registros) if ids_registros else 0,
+            'registro_nome': 'Registro sintético',
+            'registro_tipo': rng.choice(TIPOS),
+            'acao': rng.choice(ACOES_REGISTRO),
+            'detalhes': json.dumps({'origem': 'bench'}),
+            'usuario': ADMIN_USUARIO,
+            'created_at': _momento_aleatorio(rng, agora, 60),
+        } for _ in range(historico - 2 * por_tabela)])
+        db.session.commit()
+
+        # Inserções em massa não passam pelos eventos da sessão
+        from utils.status_rollup import reconstruir_status_rollup
+        from utils.activity import reconstruir_atividade_diaria
+        reconstruir_status_rollup()
+        reconstruir_atividade_diaria()
+
+    return {
+        'registros': registros,
+        'responsaveis': responsaveis,
+        'associacoes': len(associacoes),
+        'usuarios': usuarios + 1,
+        'historico': historico,
+        'seed': seed,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
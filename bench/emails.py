@@ -0,0 +1,169 @@
+# bench/emails.py
+"""Benchmark dos pipelines de alerta e de resumo por email.
+
+O Flask-Mail é apontado para um :class:`~bench.smtp_sink.SMTPSink` local.
+Mede emails/s, tempo de renderização de templates, tempo de envio SMTP, tempo
+de banco (instrumentação de SQL) e pico de memória (tracemalloc, em uma
+segunda execução para não distorcer os tempos). Em pipelines paralelos,
+render e SMTP somam o tempo de todas as threads.
+
+``render_ms_por_email`` é o custo médio de renderização por mensagem; com
+``--sem-cache-layout`` (``EMAIL_LAYOUT_CACHE=false``) cada email é
+renderizado por inteiro, para comparar com o layout pré-renderizado.
+"""
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PIPELINES = {
+    'alertas': 'enviar_alertas_vencimento',
+    'resumos': 'enviar_email_resumo_responsaveis',
+}
+
+# Métricas comparadas com o baseline: (chave, maior_e_melhor)
+METRICAS_COMPARADAS = [
+    ('emails_por_segundo', True),
+    ('total_ms', False),
+    ('render_ms', False),
+    ('render_ms_por_email', False),
+    ('smtp_ms', False),
+    ('db_ms', False),
+    ('db_statements', False),
+    ('pico_memoria_kb', False),
+]
+
+
+class _Cronometros:
+    """Soma o tempo gasto em renderização e envio durante uma execução."""
+
+    def __init__(self):
+        self.render_ms = 0.0
+        self.renders = 0
+        self.smtp_ms = 0.0
+        self._lock = threading.Lock()
+
+    def somar_render(self, inicio):
+        with self._lock:
+            self.render_ms += (time.perf_counter() - inicio) * 1000
+            self.renders += 1
+
+    def somar_smtp(self, inicio):
+        with self._lock:
+            self.smtp_ms += (time.perf_counter() - inicio) * 1000
+
+
+def _cronometrar(funcao, somar):
+    def cronometrada(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            somar(inicio)
+    return cronometrada
+
+
+@contextmanager
+def _instrumentar(modulo_tarefas, cronometros):
+    """Cronometra renderizações e envios SMTP durante o bloco.
+
+    A renderização é medida na chamada inteira (``render_template`` de ``tarefas`` e
+    ``LayoutEmail.renderizar``), incluindo busca do template e context
+    processors. O envio é medido em ``flask_mail.Connection.send``, usado
+    tanto por ``mail.send`` quanto pelas sessões de ``utils.email_pool``.
+    """
+    from flask_mail import Connection
+    from utils.email_render import LayoutEmail
+
+    alvos = [
+        (modulo_tarefas, 'render_template', cronometros.somar_render),
+        (LayoutEmail, 'renderizar', cronometros.somar_render),
+        (Connection, 'send', cronometros.somar_smtp),
+    ]
+    originais = [(alvo, nome, getattr(alvo, nome)) for alvo, nome, _ in alvos]
+    for alvo, nome, somar in alvos:
+        setattr(alvo, nome, _cronometrar(getattr(alvo, nome), somar))
+    try:
+        yield
+    finally:
+        for alvo, nome, original in originais:
+            setattr(alvo, nome, original)
+
+
+def medir_pipeline(nome, sink, memoria=True):
+    """Executa um pipeline e retorna suas métricas."""
+    import tarefas
+    from app import app
+    from utils.cache import cache
+    from utils.sql_instrumentation import coletar_sql
+
+    funcao = getattr(tarefas, PIPELINES[nome])
+
+    with app.app_context():
+        cache.clear()
+        sink.zerar()
+        cronometros = _Cronometros()
+        with _instrumentar(tarefas, cronometros), coletar_sql() as sql:
+            inicio = time.perf_counter()
+            funcao()
+            total_ms = (time.perf_counter() - inicio) * 1000
+        emails = sink.mensagens
+        bytes_enviados = sink.bytes
+
+    resultado = {
+        'pipeline': nome,
+        'emails': emails,
+        'kb_enviados': round(bytes_enviados / 1024, 1),
+        'total_ms': round(total_ms, 1),
+        'emails_por_segundo': round(emails / (total_ms / 1000), 1) if total_ms else None,
+        'render_ms': round(cronometros.render_ms, 1),
+        'renders': cronometros.renders,
+        'render_ms_por_email': (round(cronometros.render_ms / cronometros.renders, 3)
+                                if cronometros.renders else None),
+        'smtp_ms': round(cronometros.smtp_ms, 1),
+        'db_ms': round(sql.tempo_ms, 1),
+        'db_statements': sql.statements,
+        'pico_memoria_kb': None,
+    }
+
+    if memoria:
+        with app.app_context():
+            cache.clear()
+            tracemalloc.start()
+            try:
+                funcao()
+                _, pico = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        resultado['pico_memoria_kb'] = round(pico / 1024, 1)
+
+    return resultado
+
+
+def comparar_com_baseline(atual, baseline, tolerancia=0.10):
+    """Compara métricas por pipeline; retorna (linhas, houve_regressao).
+
+    Uma métrica regride quando piora mais que ``tolerancia`` (fração) em
+    relação ao baseline.
+    """
+    anteriores = {item['pipeline']: item for item in baseline.get('pipelines', [])}
+    linhas = []
+    regressao = False
+    for item in atual:
+        anterior = anteriores.get(item['pipeline'])
+        if not anterior:
+            continue
+        for chave, maior_melhor in METRICAS_COMPARADAS:
+            antes, depois = anterior.get(chave), item.get(chave)
+            if not antes or depois is None:
+                continue
+            variacao = (depois - antes) / antes
+            piorou = -variacao if maior_melhor else variacao
+            situacao = 'REGRESSÃO' if piorou > tolerancia else ('melhora' if piorou < -tolerancia else 'ok')
+            regressao = regressao or situacao == 'REGRESSÃO'
+            linhas.append({
+                'pipeline': item['pipeline'], 'metrica': chave, 'baseline': antes, 'atual': depois,
+                'variacao': f'{variacao:+.1%}', 'situacao': situacao,
+            })
+    return linhas, regressao
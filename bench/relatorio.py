@@ -0,0 +1,62 @@
+# bench/relatorio.py
+"""Estatísticas e formatação dos resultados de benchmark."""
+
+import json
+import os
+import platform
+from datetime import datetime
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) por interpolação linear; ``None`` se vazio."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    fracao = posicao - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fracao
+
+
+def resumir(amostras):
+    """Resumo de uma lista de amostras (ms): n, média, p50, p95, p99 e máximo."""
+    if not amostras:
+        return {'n': 0}
+    return {
+        'n': len(amostras),
+        'media': round(sum(amostras) / len(amostras), 2),
+        'p50': round(percentil(amostras, 50), 2),
+        'p95': round(percentil(amostras, 95), 2),
+        'p99': round(percentil(amostras, 99), 2),
+        'max': round(max(amostras), 2),
+    }
+
+
+def metadados():
+    """Informações do ambiente gravadas junto com os resultados."""
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'banco': os.environ.get('DATABASE_URL', '').split('@')[-1],
+    }
+
+
+def imprimir_tabela(colunas, linhas):
+    """Imprime uma tabela de texto alinhada; ``colunas`` é uma lista de (titulo, chave)."""
+    textos = [[('-' if linha.get(chave) is None else str(linha.get(chave))) for _, chave in colunas]
+              for linha in linhas]
+    larguras = [max([len(titulo)] + [len(t[i]) for t in textos]) for i, (titulo, _) in enumerate(colunas)]
+    print('  '.join(titulo.ljust(larguras[i]) for i, (titulo, _) in enumerate(colunas)))
+    print('  '.join('-' * largura for largura in larguras))
+    for texto in textos:
+        print('  '.join(valor.ljust(larguras[i]) if i == 0 else valor.rjust(larguras[i])
+                        for i, valor in enumerate(texto)))
+
+
+def salvar_json(caminho, dados):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2)
@@ -0,0 +1,170 @@
+# bench/rotas.py
+"""Medição das rotas principais pelo test client do Flask ou por HTTP."""
+
+import re
+import threading
+import time
+from collections import defaultdict
+
+from bench import ADMIN_USUARIO, ADMIN_SENHA
+from bench.relatorio import resumir
+
+ROTAS_PADRAO = [
+    '/dashboard',
+    '/dashboard-vencimentos',
+    '/dashboard-vencimentos/widgets/vencidos-30-dias',
+    '/dashboard-responsaveis',
+    '/dashboard-atividade',
+    '/registros',
+    '/usuarios',
+    '/usuarios/dashboard/widgets/resumo',
+    '/perfis/relatorio-permissoes',
+]
+ROTA_LOGIN = 'login'
+
+_SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) statements"')
+
+
+def _ler_server_timing(cabecalho):
+    """Extrai (statements, sql_ms) do Server-Timing emitido pela instrumentação de SQL."""
+    encontrado = _SERVER_TIMING.search(cabecalho or '')
+    if not encontrado:
+        return None, None
+    return int(encontrado.group(2)), float(encontrado.group(1))
+
+
+class _Coleta:
+    """Amostras por rota: latência (ms), statements, tempo de SQL e status."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.statements = defaultdict(list)
+        self.sql_ms = defaultdict(list)
+        self.erros = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def registrar(self, rota, latencia_ms, status, server_timing):
+        statements, sql_ms = _ler_server_timing(server_timing)
+        with self._lock:
+            self.latencias[rota].append(latencia_ms)
+            if statements is not None:
+                self.statements[rota].append(statements)
+                self.sql_ms[rota].append(sql_ms)
+            if status >= 400:
+                self.erros[rota] += 1
+
+    def resultado(self, rotas):
+        linhas = []
+        for rota in rotas:
+            latencia = resumir(self.latencias[rota])
+            statements = self.statements[rota]
+            sql = resumir(self.sql_ms[rota])
+            linhas.append({
+                'rota': rota,
+                **latencia,
+                'statements': round(sum(statements) / len(statements), 1) if statements else None,
+                'sql_p50': sql.get('p50'),
+                'erros': self.erros[rota],
+            })
+        return linhas
+
+
+def _medir(coleta, rota, funcao):
+    inicio = time.perf_counter()
+    status, server_timing = funcao()
+    coleta.registrar(rota, (time.perf_counter() - inicio) * 1000, status, server_timing)
+
+
+# --- Test client (mesmo processo) ---
+
+def executar_test_client(rotas=None, iteracoes=30, aquecimento=3, saida=print):
+    """Executa as rotas em sequência no test client; inclui o POST de login."""
+    from app import app
+
+    rotas = rotas or ROTAS_PADRAO
+    app.config['TESTING'] = False  # Erros viram 500 e são contados, como em produção
+    coleta = _Coleta()
+    credenciais = {'username': ADMIN_USUARIO, 'password': ADMIN_SENHA}
+
+    def login():
+        resposta = app.test_client().post('/login', data=credenciais)
+        return resposta.status_code, resposta.headers.get('Server-Timing')
+
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data=credenciais)
+    if resposta.status_code != 302 or '/dashboard' not in resposta.headers.get('Location', ''):
+        raise RuntimeError("Login do administrador falhou; rode 'python -m bench seed' antes")
+
+    def get(rota):
+        def executar():
+            resposta = cliente.get(rota)
+            return resposta.status_code, resposta.headers.get('Server-Timing')
+        return executar
+
+    for rota in [ROTA_LOGIN] + rotas:
+        funcao = login if rota == ROTA_LOGIN else get(rota)
+        saida(f"  {rota} ...")
+        for _ in range(aquecimento):
+            funcao()
+        for _ in range(iteracoes):
+            _medir(coleta, rota, funcao)
+
+    return coleta.resultado([ROTA_LOGIN] + rotas)
+
+
+# --- HTTP (servidor já em execução) ---
+
+def executar_http(url, rotas=None, iteracoes=30, aquecimento=3, concorrencia=4, saida=print):
+    """Dispara as rotas contra um servidor real com ``concorrencia`` clientes.
+
+    Cada cliente faz login uma vez e percorre as rotas ``iteracoes`` vezes.
+    """
+    import requests
+
+    rotas = rotas or ROTAS_PADRAO
+    url = url.rstrip('/')
+    coleta = _Coleta()
+    credenciais = {'username': ADMIN_USUARIO, 'password': ADMIN_SENHA}
+    falhas = []
+
+    def cliente_http():
+        try:
+            sessao = requests.Session()
+
+            def login():
+                resposta = requests.Session().post(f'{url}/login', data=credenciais, allow_redirects=False)
+                return resposta.status_code, resposta.headers.get('Server-Timing')
+
+            resposta = sessao.post(f'{url}/login', data=credenciais, allow_redirects=False)
+            if resposta.status_code != 302:
+                raise RuntimeError(f"login retornou {resposta.status_code}")
+
+            def get(rota):
+                resposta = sessao.get(f'{url}{rota}', allow_redirects=False)
+                return resposta.status_code, resposta.headers.get('Server-Timing')
+
+            for _ in range(aquecimento):
+                for rota in rotas:
+                    get(rota)
+            for _ in range(iteracoes):
+                _medir(coleta, ROTA_LOGIN, login)
+                for rota in rotas:
+                    _medir(coleta, rota, lambda: get(rota))
+        except Exception as e:
+            falhas.append(str(e))
+
+    saida(f"  {concorrencia} clientes x {iteracoes} iterações contra {url}")
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=cliente_http) for _ in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    if falhas:
+        raise RuntimeError(f"Falha em {len(falhas)} cliente(s): {falhas[0]}")
+
+    total = sum(len(amostras) for amostras in coleta.latencias.values())
+    saida(f"  {total} requisições em {duracao:.1f}s ({total / duracao:.1f} req/s)")
+    return coleta.resultado([ROTA_LOGIN] + rotas)
@@ -0,0 +1,87 @@
+# bench/smtp_sink.py
+"""Servidor SMTP mínimo em processo que aceita e descarta mensagens."""
+
+import socketserver
+import threading
+import time
+
+
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    """Implementa o suficiente do protocolo para o smtplib (sem TLS/AUTH)."""
+
+    # Respostas curtas + Nagle + ACK atrasado somariam ~40ms por comando
+    disable_nagle_algorithm = True
+
+    def _responder(self, linha):
+        self.wfile.write(linha.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self._responder('220 bench-sink ESMTP')
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode('ascii', 'replace').strip().upper()
+            if comando.startswith(('EHLO', 'HELO')):
+                self._responder('250-bench-sink\r\n250 SIZE 52428800')
+            elif comando.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self._responder('250 OK')
+            elif comando == 'DATA':
+                self._responder('354 End data with <CR><LF>.<CR><LF>')
+                tamanho = 0
+                while True:
+                    dados = self.rfile.readline()
+                    if not dados or dados in (b'.\r\n', b'.\n'):
+                        break
+                    tamanho += len(dados)
+                if self.server.latencia:
+                    time.sleep(self.server.latencia)
+                self.server.registrar(tamanho)
+                self._responder('250 OK: queued')
+            elif comando == 'QUIT':
+                self._responder('221 Bye')
+                return
+            else:
+                self._responder('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Uso: ``with SMTPSink() as sink: ... sink.porta ... sink.mensagens``.
+
+    ``latencia_ms`` atrasa a resposta a cada mensagem, simulando um relay real.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', porta=0, latencia_ms=0):
+        super().__init__((host, porta), _SessaoSMTP)
+        self.latencia = latencia_ms / 1000
+        self.mensagens = 0
+        self.bytes = 0
+        self._contador_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def porta(self):
+        return self.server_address[1]
+
+    def registrar(self, tamanho):
+        with self._contador_lock:
+            self.mensagens += 1
+            self.bytes += tamanho
+
+    def zerar(self):
+        with self._contador_lock:
+            self.mensagens = 0
+            self.bytes = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        return False
@@ -1,8 +1,10 @@
 # Configuração do Gunicorn para produção
 import multiprocessing
+import os
 
 # Configurações básicas
 import socket
+import tempfile
 
 
 def _detect_machine_ip() -> str:
@@ -28,8 +30,11 @@ def _detect_machine_ip() -> str:
 _ip_addr = _detect_machine_ip()
 _port = 80
 bind = f"{_ip_addr}:{_port}"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+# gthread ou gevent mantêm as conexões de /stream/dashboard abertas sem
+# ocupar o worker inteiro; com sync o dashboard usa polling (utils/ao_vivo.py)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -49,6 +54,26 @@ limit_request_field_size = 8190
 
 # Configurações de processo
 preload_app = True
+
+# O app é carregado no master (preload_app) e dimensiona o pool de conexões
+# a partir destes valores (utils/db_pool.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["GUNICORN_THREADS"] = str(threads)
+os.environ["GUNICORN_WORKER_CLASS"] = worker_class
+
+# Logs da aplicação: os workers enviam os registros ao master, único processo
+# que grava (e rotaciona) LOG_FILE (utils/logs.py)
+if not os.environ.get("LOG_SOCKET"):
+    os.environ["LOG_SOCKET"] = os.path.join(tempfile.mkdtemp(prefix="certificados-logs-"), "logs.sock")
+
+# Métricas Prometheus multiprocesso: o diretório precisa existir (e estar limpo
+# de execuções anteriores) antes do preload, que já cria as métricas no master
+_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _multiproc_dir:
+    os.makedirs(_multiproc_dir, exist_ok=True)
+    for _nome in os.listdir(_multiproc_dir):
+        if _nome.endswith(".db"):
+            os.remove(os.path.join(_multiproc_dir, _nome))
 daemon = False
 pidfile = "gunicorn.pid"
 user = None
@@ -62,10 +87,17 @@ tmp_upload_dir = None
 def when_ready(server):
     """Chamado quando o servidor está pronto para receber conexões"""
     server.log.info("Servidor Gunicorn iniciado e pronto para conexões")
+    if server.cfg.preload_app:
+        # Templates carregados no master são herdados já compilados pelos workers
+        from app import app
+        from utils.template_cache import aquecer_templates
+        aquecer_templates(app)
 
 def on_starting(server):
     """Chamado quando o servidor está iniciando"""
     server.log.info("Iniciando servidor Gunicorn...")
+    from utils.logs import iniciar_servidor_logs
+    iniciar_servidor_logs(os.environ["LOG_SOCKET"])
 
 def on_reload(server):
     """Chamado quando o servidor é recarregado"""
@@ -82,7 +114,42 @@ def pre_fork(server, worker):
 def post_fork(server, worker):
     """Chamado após criar um worker"""
     server.log.info(f"Worker {worker.pid} criado")
+    from utils.logs import conectar_servidor_logs
+    conectar_servidor_logs(os.environ["LOG_SOCKET"])
+    # Conexões abertas pelo master durante o preload não podem ser usadas pelo filho
+    from app import app, db
+    from utils.db_pool import descartar_conexoes_herdadas
+    descartar_conexoes_herdadas(app, db)
+    # Sem preload, compila (ou lê do cache de bytecode) antes da primeira requisição
+    from utils.template_cache import aquecer_templates
+    aquecer_templates(app)
+    if server.cfg.workers != int(os.environ.get("WEB_CONCURRENCY", server.cfg.workers)):
+        server.log.warning("Número de workers difere do usado no dimensionamento do pool; "
+                           "defina WEB_CONCURRENCY em vez de --workers")
 
 def post_worker_init(worker):
     """Chamado após inicializar um worker"""
-    worker.log.info(f"Worker {worker.pid} inicializado") 
\ No newline at end of file
+    worker.log.info(f"Worker {worker.pid} inicializado")
+    # Todos os workers disputam a liderança; só o líder executa os jobs
+    from app import app
+    from tarefas import start_scheduler
+    start_scheduler(app)
+
+def worker_exit(server, worker):
+    """Chamado no worker ao encerrar"""
+    from utils.agendador import parar_agendador
+    parar_agendador()
+    # Jobs em execução voltam à fila para o próximo líder (utils/jobs.py)
+    from utils.jobs import parar_executor
+    parar_executor()
+    from utils.logs import parar_logging
+    parar_logging()
+
+def child_exit(server, worker):
+    """Chamado no master quando um worker termina"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        try:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(worker.pid)
+        except ImportError:
+            pass 
\ No newline at end of file
@@ -25,11 +25,13 @@ from pathlib import Path
 # Adicionar path do projeto
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app, db
 from models import User, Role, Permission, RolePermission, RoleHistory, RoleTemplate
 from werkzeug.security import generate_password_hash
 from sqlalchemy import inspect, text
 
+app = create_app('cli')
+
 class Colors:
     """Cores para output no terminal"""
     HEADER = '\033[95m'
@@ -505,6 +507,14 @@ class DatabaseManager:
                     self._migrate_ldap_fields,
                     self._migrate_advanced_roles,
                     self._migrate_user_fields,
+                    self._migrate_registro_history,
+                    self._migrate_status_rollup,
+                    self._migrate_agendador,
+                    self._migrate_alert_ledger,
+                    self._migrate_jobs,
+                    self._migrate_versoes_tabelas,
+                    self._migrate_api_tokens,
+                    self._migrate_alteracoes,
                     self._migrate_indexes
                 ]
                 
@@ -622,6 +632,141 @@ class DatabaseManager:
         db.session.commit()
         print_success("Migração de usuários avançados concluída")
     
+    def _migrate_registro_history(self, inspector):
+        """Migração da trilha de auditoria de registros"""
+        print_info("Verificando histórico de registros...")
+        
+        from models import RegistroHistory, AtividadeDiaria
+        
+        if not inspector.has_table('registro_history'):
+            print_info("Criando tabela registro_history...")
+            RegistroHistory.__table__.create(db.engine)
+            print_success("Tabela registro_history criada")
+        
+        if not inspector.has_table('atividade_diaria'):
+            print_info("Criando tabela atividade_diaria...")
+            AtividadeDiaria.__table__.create(db.engine)
+            # Popular o rollup a partir do histórico existente
+            from utils.activity import reconstruir_atividade_diaria
+            reconstruir_atividade_diaria()
+            print_success("Tabela atividade_diaria criada")
+        
+        print_success("Migração do histórico de registros concluída")
+    
+    def _migrate_status_rollup(self, inspector):
+        """Migração dos contadores de status de registros"""
+        print_info("Verificando rollup de status...")
+        
+        from models import RegistroStatusRollup, RollupEstado
+        
+        criado = False
+        for model in (RegistroStatusRollup, RollupEstado):
+            if not inspector.has_table(model.__tablename__):
+                print_info(f"Criando tabela {model.__tablename__}...")
+                model.__table__.create(db.engine)
+                criado = True
+        
+        if criado:
+            from utils.status_rollup import reconstruir_status_rollup
+            reconstruir_status_rollup()
+            print_success("Rollup de status populado")
+        
+        print_success("Migração do rollup de status concluída")
+    
+    def _migrate_agendador(self, inspector):
+        """Migração da tabela de liderança do scheduler"""
+        print_info("Verificando liderança do scheduler...")
+        
+        from models import AgendadorLideranca
+        
+        if not inspector.has_table(AgendadorLideranca.__tablename__):
+            print_info(f"Criando tabela {AgendadorLideranca.__tablename__}...")
+            AgendadorLideranca.__table__.create(db.engine)
+        # A tabela apscheduler_jobs é criada pelo próprio APScheduler ao assumir a liderança
+        
+        print_success("Migração da liderança do scheduler concluída")
+    
+    def _migrate_alert_ledger(self, inspector):
+        """Migração do ledger de execuções e entregas de alertas"""
+        print_info("Verificando ledger de alertas...")
+        
+        from models import AlertRun, AlertDelivery
+        
+        for model in (AlertRun, AlertDelivery):
+            if not inspector.has_table(model.__tablename__):
+                print_info(f"Criando tabela {model.__tablename__}...")
+                model.__table__.create(db.engine)
+        
+        print_success("Migração do ledger de alertas concluída")
+    
+    def _migrate_jobs(self, inspector):
+        """Migração da tabela de jobs em segundo plano"""
+        print_info("Verificando jobs em segundo plano...")
+        
+        from models import Job
+        
+        if not inspector.has_table(Job.__tablename__):
+            print_info(f"Criando tabela {Job.__tablename__}...")
+            Job.__table__.create(db.engine)
+        elif 'tentativas' not in [col['name'] for col in inspector.get_columns(Job.__tablename__)]:
+            print_info("Adicionando campo tentativas em job...")
+            db.session.execute(text("ALTER TABLE job ADD COLUMN tentativas INTEGER NOT NULL DEFAULT 0"))
+            db.session.commit()
+        
+        print_success("Migração de jobs concluída")
+    
+    def _migrate_versoes_tabelas(self, inspector):
+        """Migração dos contadores de versão usados nos ETags"""
+        print_info("Verificando versões de tabelas...")
+        
+        from models import TabelaVersao
+        
+        if not inspector.has_table(TabelaVersao.__tablename__):
+            print_info(f"Criando tabela {TabelaVersao.__tablename__}...")
+            TabelaVersao.__table__.create(db.engine)
+        
+        print_success("Migração das versões de tabelas concluída")
+    
+    def _migrate_api_tokens(self, inspector):
+        """Migração dos tokens de acesso à API"""
+        print_info("Verificando tokens da API...")
+        
+        from models import ApiToken
+        
+        if not inspector.has_table(ApiToken.__tablename__):
+            print_info(f"Criando tabela {ApiToken.__tablename__}...")
+            ApiToken.__table__.create(db.engine)
+        
+        print_success("Migração dos tokens da API concluída")
+    
+    def _migrate_alteracoes(self, inspector):
+        """Migração do feed de alterações (created_at/updated_at e marcas de exclusão)"""
+        print_info("Verificando datas de alteração de registros e responsáveis...")
+        
+        from models import Exclusao, agora_utc
+        
+        for tabela in ('registro', 'responsavel'):
+            colunas = [col['name'] for col in inspector.get_columns(tabela)]
+            for campo in ('created_at', 'updated_at'):
+                if campo not in colunas:
+                    print_info(f"Adicionando campo {campo} em {tabela}...")
+                    db.session.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {campo} TIMESTAMP"))
+            # Linhas existentes entram no feed como alteradas agora
+            db.session.execute(
+                text(f"UPDATE {tabela} SET created_at = COALESCE(created_at, :agora), updated_at = :agora "
+                     f"WHERE updated_at IS NULL"),
+                {'agora': agora_utc()}
+            )
+            for campo in ('created_at', 'updated_at'):
+                db.session.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{campo} ON {tabela} ({campo})"))
+        db.session.commit()
+        
+        if not inspector.has_table(Exclusao.__tablename__):
+            print_info(f"Criando tabela {Exclusao.__tablename__}...")
+            Exclusao.__table__.create(db.engine)
+        
+        print_success("Migração do feed de alterações concluída")
+    
     def _migrate_indexes(self, inspector):
         """Cria índices para performance"""
         print_info("Verificando índices...")
@@ -630,7 +775,8 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS ix_role_ativo ON role (ativo)",
             "CREATE INDEX IF NOT EXISTS ix_role_prioridade ON role (prioridade)",
             "CREATE INDEX IF NOT EXISTS ix_permission_categoria ON permission (categoria)",
-            "CREATE INDEX IF NOT EXISTS ix_permission_ativo ON permission (ativo)"
+            "CREATE INDEX IF NOT EXISTS ix_permission_ativo ON permission (ativo)",
+            "CREATE INDEX IF NOT EXISTS ix_registro_responsavel_responsavel_id ON registro_responsavel (responsavel_id)"
         ]
         
         for index_sql in indexes:
@@ -718,6 +864,164 @@ class DatabaseManager:
             except Exception as e:
                 print_error(f"Erro ao verificar status: {e}")
 
+    def partition_history(self):
+        """Converte as tabelas de auditoria para particionamento mensal"""
+        print_header("PARTICIONAMENTO DAS TABELAS DE AUDITORIA")
+        
+        from utils.audit_archive import TABELAS_AUDITORIA, particionar_tabela
+        
+        if self.db_type != 'postgresql':
+            print_info("SQLite não suporta particionamento nativo.")
+            print_info("O arquivamento usará tabelas-sombra mensais (archive-history).")
+            return True
+        
+        with app.app_context():
+            try:
+                for tabela in TABELAS_AUDITORIA:
+                    if particionar_tabela(tabela):
+                        print_success(f"Tabela {tabela} particionada por mês")
+                    else:
+                        print_info(f"Tabela {tabela} já particionada - partições futuras verificadas")
+                return True
+            except Exception as e:
+                db.session.rollback()
+                print_error(f"Erro ao particionar tabelas: {e}")
+                return False
+    
+    def archive_history(self, months=None):
+        """Arquiva o histórico anterior ao período de retenção"""
+        print_header("ARQUIVAMENTO DO HISTÓRICO")
+        
+        from utils.audit_archive import arquivar_historico, data_corte, get_archive_dir
+        
+        with app.app_context():
+            try:
+                print_info(f"Mantendo registros a partir de {data_corte(meses=months).strftime('%d/%m/%Y')}")
+                arquivados = arquivar_historico(meses=months)
+                for tabela, arquivo, linhas in arquivados:
+                    print_success(f"{tabela}: {linhas} linhas -> {arquivo}")
+                if not arquivados:
+                    print_info("Nenhum mês expirado para arquivar")
+                print_info(f"Diretório de arquivos: {get_archive_dir()}")
+                return True
+            except Exception as e:
+                db.session.rollback()
+                print_error(f"Erro ao arquivar histórico: {e}")
+                return False
+    
+    def rebuild_rollups(self):
+        """Recalcula os contadores de status e de atividade a partir das tabelas de origem"""
+        print_header("RECONSTRUÇÃO DOS ROLLUPS")
+        
+        from utils.status_rollup import reconstruir_status_rollup, resumo_status
+        from utils.activity import reconstruir_atividade_diaria
+        
+        with app.app_context():
+            try:
+                reconstruir_status_rollup()
+                resumo = resumo_status()
+                print_success(f"Status: {resumo['total']} registros "
+                              f"({resumo['validos']} válidos, {resumo['vencendo']} vencendo, {resumo['vencidos']} vencidos)")
+                dias = reconstruir_atividade_diaria()
+                print_success(f"Atividade diária: {dias} contadores")
+                return True
+            except Exception as e:
+                db.session.rollback()
+                print_error(f"Erro ao reconstruir rollups: {e}")
+                return False
+    
+    def create_api_token(self, username, nome, dias=None):
+        """Cria um token da API para o usuário e o exibe uma única vez"""
+        print_header("CRIAÇÃO DE TOKEN DA API")
+        
+        from utils.api import criar_token
+        
+        with app.app_context():
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                print_error(f"Usuário '{username}' não encontrado!")
+                return False
+            if user.status != 'ativo':
+                print_error(f"Usuário '{username}' não está ativo!")
+                return False
+            
+            try:
+                token, texto = criar_token(user, nome, dias)
+            except Exception as e:
+                db.session.rollback()
+                print_error(f"Erro ao criar token: {e}")
+                return False
+            
+            print_success(f"Token '{nome}' criado para '{username}' (id {token.id}, prefixo {token.prefixo})")
+            if token.expira_em:
+                print_info(f"Expira em: {token.expira_em:%d/%m/%Y %H:%M}")
+            print_warning("Guarde o token agora; ele não será exibido novamente:")
+            print(f"\n  {texto}\n")
+            print_info("Uso: Authorization: Bearer <token>")
+            return True
+    
+    def revoke_api_token(self, identificador):
+        """Revoga um token da API pelo id ou pelo prefixo"""
+        print_header("REVOGAÇÃO DE TOKEN DA API")
+        
+        from utils.api import revogar_token
+        
+        with app.app_context():
+            token = revogar_token(identificador)
+            if token is None:
+                print_error(f"Token '{identificador}' não encontrado!")
+                return False
+            print_success(f"Token '{token.nome}' (id {token.id}, prefixo {token.prefixo}) revogado "
+                          f"em {token.revogado_em:%d/%m/%Y %H:%M}")
+            return True
+    
+    def startup_profile(self, module='app', limit=None, role='web'):
+        """Mostra o tempo de importação da aplicação por pacote (python -X importtime)"""
+        print_header("PERFIL DE INICIALIZAÇÃO")
+        
+        from utils.startup_profile import OPCIONAIS, perfilar_importacao
+        
+        limite = limit or 15
+        try:
+            perfil = perfilar_importacao(module, papel=role)
+        except RuntimeError as e:
+            print_error(str(e))
+            return False
+        
+        print_info(f"import {perfil['modulo']} (papel {perfil['papel']}): {perfil['total_ms']:.0f}ms (processo novo, com -X importtime)")
+        print(f"\n{Colors.BOLD}Tempo próprio por pacote{Colors.ENDC}")
+        for nome, ms in perfil['pacotes'][:limite]:
+            print(f"  {ms:8.1f}ms  {nome}")
+        print(f"\n{Colors.BOLD}Imports diretos de {perfil['modulo']} (acumulado){Colors.ENDC}")
+        for nome, ms in perfil['diretos'][:limite]:
+            print(f"  {ms:8.1f}ms  {nome}")
+        print()
+        if perfil['opcionais']:
+            print_warning(f"Carregados na subida (deveriam ser sob demanda): {', '.join(perfil['opcionais'])}")
+        else:
+            print_success(f"Nenhum subsistema opcional carregado na subida ({', '.join(OPCIONAIS)})")
+        return True
+    
+    def query_archive(self, table, since=None, until=None, filters=None, limit=None):
+        """Consulta os arquivos NDJSON do histórico arquivado"""
+        from utils.audit_archive import TABELAS_AUDITORIA, consultar_arquivos
+        
+        if table not in TABELAS_AUDITORIA:
+            print_error(f"Tabela inválida. Use: {', '.join(TABELAS_AUDITORIA)}")
+            return False
+        
+        inicio = datetime.fromisoformat(since) if since else None
+        fim = datetime.fromisoformat(until) if until else None
+        campos = dict(filtro.split('=', 1) for filtro in (filters or []))
+        
+        total = 0
+        for linha in consultar_arquivos(table, inicio, fim, campos, limit):
+            print(json.dumps(linha, ensure_ascii=False))
+            total += 1
+        if sys.stdout.isatty():
+            print_info(f"{total} linha(s) encontrada(s)")
+        return True
+
 def main():
     """Função principal do script"""
     parser = argparse.ArgumentParser(
@@ -733,11 +1037,21 @@ Exemplos de uso:
   python manage_db.py backup                  # Criar backup
   python manage_db.py restore backup.db       # Restaurar backup
   python manage_db.py status                  # Ver status do banco
+  python manage_db.py partition-history       # Particionar histórico por mês (PostgreSQL)
+  python manage_db.py archive-history --months 12
+  python manage_db.py query-archive --table user_history --since 2024-01-01 --where acao=login
+  python manage_db.py rebuild-rollups         # Recalcular contadores dos dashboards
+  python manage_db.py create-api-token usuario "CMDB" --days 365  # Token para a API /api/v1
+  python manage_db.py revoke-api-token cert_AbC123  # Revogar pelo prefixo ou id
+  python manage_db.py startup-profile --limit 20  # Tempo de importação do app por pacote
+  python manage_db.py startup-profile --app-role scheduler  # Subida do processo só de scheduler
         """
     )
     
     parser.add_argument('command', 
-                       choices=['init', 'reset', 'create-admin', 'create-user', 'migrate', 'backup', 'restore', 'status'],
+                       choices=['init', 'reset', 'create-admin', 'create-user', 'migrate', 'backup', 'restore', 'status',
+                                'partition-history', 'archive-history', 'query-archive', 'rebuild-rollups',
+                                'startup-profile', 'create-api-token', 'revoke-api-token'],
                        help='Comando a executar')
     
     parser.add_argument('args', nargs='*', help='Argumentos do comando')
@@ -748,6 +1062,16 @@ Exemplos de uso:
     parser.add_argument('--role', default='operador', help='Role do usuário')
     parser.add_argument('--force', action='store_true', help='Força operações sem confirmação')
     parser.add_argument('--non-interactive', action='store_true', help='Modo não interativo para scripts')
+    parser.add_argument('--months', type=int, help='Meses de retenção do histórico (padrão: HISTORY_RETENTION_MONTHS)')
+    parser.add_argument('--table', default='user_history', help='Tabela de auditoria para consulta de arquivos')
+    parser.add_argument('--since', help='Data/hora inicial (ISO 8601) para consulta de arquivos')
+    parser.add_argument('--until', help='Data/hora final (ISO 8601) para consulta de arquivos')
+    parser.add_argument('--where', action='append', help='Filtro campo=valor para consulta de arquivos')
+    parser.add_argument('--limit', type=int, help='Número máximo de linhas retornadas')
+    parser.add_argument('--days', type=int, help='Validade em dias do token da API (padrão: sem expiração)')
+    parser.add_argument('--module', default='app', help='Módulo medido pelo startup-profile')
+    parser.add_argument('--app-role', choices=['web', 'scheduler', 'cli'], default='web',
+                        help='Papel do app criado pelo startup-profile')
     
     args = parser.parse_args()
     
@@ -804,6 +1128,33 @@ Exemplos de uso:
         elif args.command == 'status':
             db_manager.status()
             
+        elif args.command == 'partition-history':
+            db_manager.partition_history()
+            
+        elif args.command == 'archive-history':
+            db_manager.archive_history(args.months)
+            
+        elif args.command == 'query-archive':
+            db_manager.query_archive(args.table, args.since, args.until, args.where, args.limit)
+            
+        elif args.command == 'rebuild-rollups':
+            db_manager.rebuild_rollups()
+            
+        elif args.command == 'startup-profile':
+            db_manager.startup_profile(args.module, args.limit, args.app_role)
+            
+        elif args.command == 'create-api-token':
+            if len(args.args) >= 2:
+                db_manager.create_api_token(args.args[0], args.args[1], args.days)
+            else:
+                print_error("Uso: python manage_db.py create-api-token <username> <nome> [--days N]")
+                
+        elif args.command == 'revoke-api-token':
+            if args.args:
+                db_manager.revoke_api_token(args.args[0])
+            else:
+                print_error("Uso: python manage_db.py revoke-api-token <id|prefixo>")
+            
     except KeyboardInterrupt:
         print_warning("\nOperação cancelada pelo usuário")
         sys.exit(1)
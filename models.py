@@ -3,16 +3,26 @@
 Modelos principais do sistema: User, Role, Permission, etc.
 Implementa o RBAC (Role-Based Access Control) e entidades de domínio.
 """
+from datetime import datetime, timezone
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 
-db = SQLAlchemy()
+from utils.replica import SessaoRoteada
+
+# Sessão que envia leituras de rotas somente_leitura à réplica (quando configurada)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
+
+def agora_utc():
+    """Data e hora UTC sem fuso (``created_at``/``updated_at`` lidos pelo feed de alterações)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 # Associação N:N entre Registro e Responsavel
 registro_responsavel = db.Table(
     'registro_responsavel',
     db.Column('registro_id', db.Integer, db.ForeignKey('registro.id')),
-    db.Column('responsavel_id', db.Integer, db.ForeignKey('responsavel.id'))
+    # Registros de um responsável (resumos, calendário ICS)
+    db.Column('responsavel_id', db.Integer, db.ForeignKey('responsavel.id'), index=True)
 )
 
 class Role(db.Model):
@@ -209,6 +219,8 @@ class Responsavel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False, index=True)
     email = db.Column(db.String(120), nullable=False, unique=True, index=True)
+    created_at = db.Column(db.DateTime, default=agora_utc, index=True)
+    updated_at = db.Column(db.DateTime, default=agora_utc, onupdate=agora_utc, index=True)
 
     def __str__(self):
         return f"{self.nome} ({self.email})"
@@ -224,10 +236,153 @@ class Registro(db.Model):
     observacoes = db.Column(db.Text, nullable=True)
     regularizado = db.Column(db.Boolean, default=False, index=True)
     responsaveis = db.relationship('Responsavel', secondary=registro_responsavel, backref='registros')
+    # UTC; updated_at também muda quando a lista de responsáveis muda (ver utils/alteracoes.py)
+    created_at = db.Column(db.DateTime, default=agora_utc, index=True)
+    updated_at = db.Column(db.DateTime, default=agora_utc, onupdate=agora_utc, index=True)
 
     def __repr__(self):
         return f'<Registro {self.nome}>' 
 
+class RegistroHistory(db.Model):
+    """Histórico de alterações dos registros (trilha de auditoria).
+    Não possui chave estrangeira para que o histórico sobreviva à exclusão do registro.
+    """
+    __tablename__ = 'registro_history'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    registro_id = db.Column(db.Integer, nullable=False, index=True)
+    registro_nome = db.Column(db.String(120), nullable=False)
+    registro_tipo = db.Column(db.String(50))
+    acao = db.Column(db.String(50), nullable=False, index=True)  # 'created', 'updated', 'regularized', 'deleted'
+    detalhes = db.Column(db.Text)  # JSON com detalhes da alteração
+    ip_address = db.Column(db.String(45))
+    usuario = db.Column(db.String(80), nullable=False, index=True)  # Quem fez a alteração
+    # Horário local da aplicação: o dia dele é o bucket de AtividadeDiaria
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+
+class AtividadeDiaria(db.Model):
+    """Contadores diários de alterações em registros, mantidos incrementalmente."""
+    __tablename__ = 'atividade_diaria'
+    
+    dia = db.Column(db.Date, primary_key=True)
+    acao = db.Column(db.String(50), primary_key=True)  # Mesmas ações de RegistroHistory
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class RegistroStatusRollup(db.Model):
+    """Contadores de registros por (tipo, status), mantidos incrementalmente.
+    O status é relativo a ``RollupEstado.data_referencia``, não a ``date.today()``.
+    """
+    __tablename__ = 'registro_status_rollup'
+
+    tipo = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)  # 'vencido', 'vencendo', 'valido'
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupEstado(db.Model):
+    """Data de referência dos rollups que dependem do dia corrente."""
+    __tablename__ = 'rollup_estado'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    data_referencia = db.Column(db.Date, nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+class TabelaVersao(db.Model):
+    """Contador de escritas por tabela, usado nos ETags das páginas (utils/etag.py)."""
+    __tablename__ = 'tabela_versao'
+
+    tabela = db.Column(db.String(64), primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+class AgendadorLideranca(db.Model):
+    """Arrendamento da liderança do scheduler (bancos sem trava advisory)."""
+    __tablename__ = 'agendador_lideranca'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    dono = db.Column(db.String(200), nullable=False)
+    expira_em = db.Column(db.DateTime, nullable=False)  # UTC
+    renovado_em = db.Column(db.DateTime)
+
+class AlertRun(db.Model):
+    """Execução do envio de alertas de vencimento (checkpoint para retomada)."""
+    __tablename__ = 'alert_run'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    data_referencia = db.Column(db.Date, nullable=False, index=True)
+    origem = db.Column(db.String(20), nullable=False, default='agendado')  # 'agendado' ou 'manual'
+    status = db.Column(db.String(20), nullable=False, default='em_andamento', index=True)  # 'em_andamento', 'concluida', 'falhou'
+    checkpoint_registro_id = db.Column(db.Integer, nullable=False, default=0)  # Último registro concluído
+    enviados = db.Column(db.Integer, nullable=False, default=0)
+    ignorados = db.Column(db.Integer, nullable=False, default=0)  # Já entregues antes
+    falhas = db.Column(db.Integer, nullable=False, default=0)
+    retomadas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text)
+    iniciado_em = db.Column(db.DateTime, nullable=False)
+    atualizado_em = db.Column(db.DateTime, nullable=False)  # Heartbeat da execução
+    concluido_em = db.Column(db.DateTime)
+
+class AlertDelivery(db.Model):
+    """Entrega de um alerta a um responsável, identificada por chave de idempotência.
+    Sem chave estrangeira para registro/responsável: o histórico sobrevive a exclusões.
+    """
+    __tablename__ = 'alert_delivery'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(120), nullable=False, unique=True)  # alerta:{data}:{registro}:{responsavel}
+    run_id = db.Column(db.Integer, db.ForeignKey('alert_run.id'), nullable=False, index=True)
+    registro_id = db.Column(db.Integer, nullable=False)
+    responsavel_id = db.Column(db.Integer, nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # 'pendente', 'enviado', 'simulado', 'falha'
+    tentativas = db.Column(db.Integer, nullable=False, default=1)
+    erro = db.Column(db.Text)
+    atualizado_em = db.Column(db.DateTime, nullable=False)
+
+class Job(db.Model):
+    """Tarefa em segundo plano disparada pela interface (envio de alertas, resumos)."""
+    __tablename__ = 'job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False, index=True)
+    parametros = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='pendente', index=True)  # 'pendente', 'executando', 'concluido', 'falhou', 'cancelado'
+    total = db.Column(db.Integer)
+    processados = db.Column(db.Integer, nullable=False, default=0)
+    falhas = db.Column(db.Integer, nullable=False, default=0)
+    mensagem = db.Column(db.String(255))
+    erro = db.Column(db.Text)
+    cancelar_solicitado = db.Column(db.Boolean, nullable=False, default=False)
+    usuario = db.Column(db.String(80))
+    processo = db.Column(db.String(200))  # host:pid que executa
+    tentativas = db.Column(db.Integer, nullable=False, default=0)  # Execuções iniciadas (retomadas após interrupção)
+    criado_em = db.Column(db.DateTime, nullable=False)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime, nullable=False)  # Heartbeat do progresso
+
+class ApiToken(db.Model):
+    """Token de acesso à API (``/api/v1``). Só o hash SHA-256 é guardado."""
+    __tablename__ = 'api_token'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)  # Sistema ou integração que usa o token
+    prefixo = db.Column(db.String(16), nullable=False)  # Início do token, para identificá-lo na listagem
+    token_hash = db.Column(db.String(64), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user = db.relationship('User', lazy='joined')
+    criado_em = db.Column(db.DateTime, nullable=False)
+    ultimo_uso_em = db.Column(db.DateTime)
+    expira_em = db.Column(db.DateTime)
+    revogado_em = db.Column(db.DateTime)
+
+class Exclusao(db.Model):
+    """Registro ou responsável excluído (tombstone), informado pelo feed de alterações da API."""
+    __tablename__ = 'exclusao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(50), nullable=False)  # 'registro' ou 'responsavel'
+    objeto_id = db.Column(db.Integer, nullable=False)
+    excluido_em = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+
 class Configuracao(db.Model):
     """Configuração do sistema (agendamento, email, etc)."""
     id = db.Column(db.Integer, primary_key=True)
@@ -1,2 +1,27 @@
 # routes/__init__.py
-# Pacote para organizar as rotas da aplicação 
\ No newline at end of file
+"""Blueprints da aplicação web.
+
+Cada módulo define um blueprint; :func:`registrar_blueprints` os registra na
+aplicação criada por ``app.create_app``. Processos que não atendem HTTP (o
+scheduler, comandos do ``manage_db.py``) não importam este pacote.
+"""
+
+
+def registrar_blueprints(app):
+    from routes.alertas import alertas_bp
+    from routes.api import api_bp
+    from routes.auth import auth_bp
+    from routes.calendario import calendario_bp
+    from routes.configuracao import configuracao_bp
+    from routes.dashboards import dashboards_bp
+    from routes.diagnostico import diagnostico_bp
+    from routes.perfis import perfis_bp
+    from routes.registros import registros_bp
+    from routes.responsaveis import responsaveis_bp
+    from routes.stream import stream_bp
+    from routes.usuarios import usuarios_bp
+
+    for blueprint in (auth_bp, dashboards_bp, diagnostico_bp, registros_bp, responsaveis_bp,
+                      configuracao_bp, alertas_bp, usuarios_bp, perfis_bp, stream_bp, api_bp,
+                      calendario_bp):
+        app.register_blueprint(blueprint)
@@ -0,0 +1,84 @@
+# routes/alertas.py
+"""Envio manual de alertas e resumos (jobs em segundo plano) e acompanhamento dos jobs."""
+
+import logging
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, url_for
+from flask_login import current_user, login_required
+
+from models import Registro, Responsavel
+from utils.permissoes import permission_required
+
+logger = logging.getLogger(__name__)
+
+alertas_bp = Blueprint('alertas', __name__)
+
+@alertas_bp.route('/enviar-alertas')
+@permission_required('send_alerts')
+@login_required
+def enviar_alertas_manual():
+    """Dispara o envio de alertas em segundo plano e abre o acompanhamento."""
+    from utils.jobs import submeter
+    job_id = submeter('alertas', usuario=current_user.username)
+    return redirect(url_for('alertas.acompanhar_job', job_id=job_id))
+
+@alertas_bp.route('/enviar-resumos')
+@permission_required('send_alerts')
+@login_required
+def enviar_resumos_manual():
+    """Dispara o envio de resumos em segundo plano e abre o acompanhamento."""
+    from utils.jobs import submeter
+    job_id = submeter('resumos', usuario=current_user.username)
+    return redirect(url_for('alertas.acompanhar_job', job_id=job_id))
+
+@alertas_bp.route('/enviar-resumo-responsavel/<int:responsavel_id>')
+@permission_required('send_alerts')
+@login_required
+def enviar_resumo_individual(responsavel_id):
+    """Envia email de resumo para um responsável específico (em segundo plano)."""
+    from utils.jobs import submeter
+    responsavel = Responsavel.query.get_or_404(responsavel_id)
+    
+    if not responsavel.email:
+        flash('Este responsável não possui email cadastrado.', 'warning')
+        return redirect(url_for('responsaveis.listar_responsaveis'))
+    
+    if not Registro.query.filter(Registro.responsaveis.contains(responsavel)).first():
+        flash(f'O responsável {responsavel.nome} não possui certificados cadastrados.', 'info')
+        return redirect(url_for('responsaveis.listar_responsaveis'))
+    
+    job_id = submeter('resumo_individual', {'responsavel_id': responsavel_id}, usuario=current_user.username)
+    return redirect(url_for('alertas.acompanhar_job', job_id=job_id))
+
+@alertas_bp.route('/jobs/<int:job_id>')
+@permission_required('send_alerts')
+@login_required
+def status_job(job_id):
+    """Progresso do job em JSON (consultado pela página de acompanhamento)."""
+    from utils.jobs import obter_job
+    job = obter_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
+
+@alertas_bp.route('/jobs/<int:job_id>/acompanhar')
+@permission_required('send_alerts')
+@login_required
+def acompanhar_job(job_id):
+    """Página que acompanha o progresso de um job."""
+    from utils.jobs import obter_job
+    job = obter_job(job_id)
+    if job is None:
+        abort(404)
+    return render_template('jobs/status.html', job=job)
+
+@alertas_bp.route('/jobs/<int:job_id>/cancelar', methods=['POST'])
+@permission_required('send_alerts')
+@login_required
+def cancelar_job(job_id):
+    """Solicita o cancelamento; o job para no próximo registro de progresso."""
+    from utils.jobs import solicitar_cancelamento
+    if solicitar_cancelamento(job_id):
+        logger.info(f"Cancelamento do job #{job_id} solicitado por {current_user.username}")
+        return jsonify({'success': True})
+    return jsonify({'success': False, 'message': 'Job já finalizado'}), 409
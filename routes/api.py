@@ -0,0 +1,217 @@
+# routes/api.py
+"""API JSON somente leitura (``/api/v1``), autenticada por token (ver utils/api.py)."""
+
+import logging
+from datetime import date, datetime
+
+from flask import Blueprint, current_app, request
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only, selectinload
+
+from models import Registro, Responsavel
+from routes.registros import filtrar_registros
+from utils.alteracoes import alteracoes, converter_momento, corte_atual, exclusoes
+from utils.api import (api_token_required, codificar_cursor, comprimir_resposta, decodificar_cursor,
+                       erro_api, limite_pagina)
+from utils.replica import somente_leitura
+
+logger = logging.getLogger(__name__)
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+api_bp.after_request(comprimir_resposta)
+
+CAMPOS_REGISTRO = {
+    'id': Registro.id,
+    'nome': Registro.nome,
+    'origem': Registro.origem,
+    'tipo': Registro.tipo,
+    'data_vencimento': Registro.data_vencimento,
+    'tempo_alerta': Registro.tempo_alerta,
+    'observacoes': Registro.observacoes,
+    'regularizado': Registro.regularizado,
+    'created_at': Registro.created_at,
+    'updated_at': Registro.updated_at,
+}
+CAMPOS_RESPONSAVEL = ('id', 'nome', 'email', 'created_at', 'updated_at')
+ORDENACOES = ('id', 'nome', 'tipo', 'data_vencimento')
+EMBUTIVEIS = ('responsaveis',)
+
+def _valor_json(valor):
+    if isinstance(valor, datetime):
+        # Datas e horas gravadas em UTC; microssegundos mantidos para o watermark do feed
+        return valor.isoformat(timespec='microseconds') + 'Z'
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+def _valor_coluna(coluna, valor):
+    """Valor do cursor convertido de volta para o tipo da coluna."""
+    if valor is None:
+        raise ValueError('cursor inválido')
+    if coluna is Registro.data_vencimento:
+        return date.fromisoformat(valor)
+    return valor
+
+def _lista_param(nome):
+    return [parte.strip() for parte in request.args.get(nome, '').split(',') if parte.strip()]
+
+def _campos_registro():
+    """``fields`` e ``embed`` da requisição: ``(campos, embutir, resposta_de_erro)``."""
+    campos = _lista_param('fields') or list(CAMPOS_REGISTRO)
+    invalidos = [campo for campo in campos if campo not in CAMPOS_REGISTRO]
+    if invalidos:
+        return None, None, erro_api(400, f"Campos desconhecidos: {', '.join(invalidos)}. Use: {', '.join(CAMPOS_REGISTRO)}.")
+    embutir = _lista_param('embed')
+    invalidos = [nome for nome in embutir if nome not in EMBUTIVEIS]
+    if invalidos:
+        return None, None, erro_api(400, f"embed desconhecido: {', '.join(invalidos)}. Use: {', '.join(EMBUTIVEIS)}.")
+    # id sempre vem na resposta
+    if 'id' not in campos:
+        campos.insert(0, 'id')
+    return campos, embutir, None
+
+def _query_registros(query, campos, embutir, *extras):
+    """Só as colunas pedidas; responsáveis de toda a página em uma única consulta (IN)."""
+    query = query.options(load_only(*({CAMPOS_REGISTRO[campo] for campo in campos} | set(extras))))
+    if 'responsaveis' in embutir:
+        query = query.options(selectinload(Registro.responsaveis).load_only(
+            Responsavel.id, Responsavel.nome, Responsavel.email))
+    return query
+
+def _serializar_registro(registro, campos, embutir):
+    item = {campo: _valor_json(getattr(registro, campo)) for campo in campos}
+    if 'responsaveis' in embutir:
+        item['responsaveis'] = [{'id': r.id, 'nome': r.nome, 'email': r.email}
+                                for r in registro.responsaveis]
+    return item
+
+def _resposta(dados):
+    resposta = current_app.response_class(current_app.json.dumps(dados), mimetype='application/json')
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+@api_bp.route('/registros')
+@api_token_required
+@somente_leitura
+def listar_registros():
+    """Registros com os filtros de ``/registros``, paginados por cursor.
+
+    Parâmetros: ``busca_*`` (como na listagem), ``sort`` (``id``, ``nome``,
+    ``tipo``, ``data_vencimento``), ``order``, ``limit``, ``cursor`` (o
+    ``next_cursor`` da página anterior, com os mesmos filtros), ``fields``
+    (colunas separadas por vírgula; ``id`` sempre incluído) e
+    ``embed=responsaveis``.
+    """
+    campos, embutir, erro = _campos_registro()
+    if erro:
+        return erro
+    try:
+        limite = limite_pagina(request.args.get('limit'))
+        cursor = decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return erro_api(400, f"Parâmetro inválido: {e}")
+
+    # O cursor fixa a ordenação da primeira página
+    sort = cursor.get('sort') if cursor else request.args.get('sort', 'id')
+    order = cursor.get('order') if cursor else request.args.get('order', 'asc')
+    if sort not in ORDENACOES or order not in ('asc', 'desc'):
+        return erro_api(400, f"Ordenação inválida. sort: {', '.join(ORDENACOES)}; order: asc, desc.")
+    coluna = CAMPOS_REGISTRO[sort]
+
+    # A coluna de ordenação é carregada para o cursor
+    query = _query_registros(filtrar_registros(Registro.query, request.args), campos, embutir, coluna)
+
+    if cursor:
+        try:
+            valor, ultimo_id = _valor_coluna(coluna, cursor.get('valor')), int(cursor.get('id'))
+        except (TypeError, ValueError):
+            return erro_api(400, 'Parâmetro inválido: cursor inválido')
+        if sort == 'id':
+            query = query.filter(Registro.id < ultimo_id if order == 'desc' else Registro.id > ultimo_id)
+        elif order == 'desc':
+            query = query.filter(or_(coluna < valor, and_(coluna == valor, Registro.id < ultimo_id)))
+        else:
+            query = query.filter(or_(coluna > valor, and_(coluna == valor, Registro.id > ultimo_id)))
+
+    ordem = [coluna.desc(), Registro.id.desc()] if order == 'desc' else [coluna.asc(), Registro.id.asc()]
+    if sort == 'id':
+        ordem = ordem[:1]
+    # Uma linha a mais indica se há próxima página
+    registros = query.order_by(*ordem).limit(limite + 1).all()
+    proximo = None
+    if len(registros) > limite:
+        registros = registros[:limite]
+        ultimo = registros[-1]
+        proximo = codificar_cursor({'sort': sort, 'order': order,
+                                    'valor': _valor_json(getattr(ultimo, sort)), 'id': ultimo.id})
+
+    dados = [_serializar_registro(registro, campos, embutir) for registro in registros]
+    return _resposta({'data': dados, 'next_cursor': proximo, 'limit': limite})
+
+def _feed(modelo, query, serializar):
+    """Página do feed de alterações de ``modelo`` (ver utils/alteracoes.py).
+
+    As rotas do feed leem do primário: na réplica, linhas gravadas antes do
+    ``corte`` podem ainda não ter chegado e ficariam para trás do ``watermark``.
+    """
+    try:
+        limite = limite_pagina(request.args.get('limit'))
+        if request.args.get('cursor'):
+            # O cursor fixa a janela (desde, corte] da primeira página
+            cursor = decodificar_cursor(request.args['cursor'])
+            desde = converter_momento(cursor['desde']) if cursor.get('desde') else None
+            corte = converter_momento(cursor['corte'])
+            depois = (converter_momento(cursor['momento']), int(cursor['id']))
+        else:
+            desde = converter_momento(request.args['updated_since']) if request.args.get('updated_since') else None
+            corte = corte_atual()
+            depois = None
+    except (KeyError, TypeError, ValueError) as e:
+        return erro_api(400, f"Parâmetro inválido: {e}")
+    if desde is not None and desde >= corte:
+        # Watermark recente demais: nada consolidado ainda
+        return _resposta({'data': [], 'deleted': [], 'next_cursor': None,
+                          'watermark': _valor_json(desde), 'limit': limite})
+
+    linhas, ha_mais = alteracoes(query, modelo, desde, corte, depois, limite)
+    # Exclusões no mesmo trecho de tempo da página: depois da anterior até a última linha
+    inicio = depois[0] if depois else desde
+    fim = linhas[-1].updated_at if ha_mais else corte
+    removidos = [{'id': e.objeto_id, 'deleted_at': _valor_json(e.excluido_em)}
+                 for e in exclusoes(modelo.__tablename__, inicio, fim)]
+    proximo = None
+    if ha_mais:
+        proximo = codificar_cursor({'desde': _valor_json(desde) if desde else None,
+                                    'corte': _valor_json(corte),
+                                    'momento': _valor_json(fim), 'id': linhas[-1].id})
+    return _resposta({
+        'data': [serializar(linha) for linha in linhas],
+        'deleted': removidos,
+        'next_cursor': proximo,
+        # Só na última página: o updated_since da próxima sincronização
+        'watermark': None if ha_mais else _valor_json(corte),
+        'limit': limite,
+    })
+
+@api_bp.route('/registros/alteracoes')
+@api_token_required
+def alteracoes_registros():
+    """Registros criados ou alterados depois de ``updated_since`` e os excluídos (``deleted``).
+
+    Aceita ``fields`` e ``embed`` como ``/api/v1/registros``. Percorra as
+    páginas por ``next_cursor`` e guarde o ``watermark`` da última como
+    ``updated_since`` da próxima sincronização; aplique ``deleted`` antes de
+    ``data`` em cada página.
+    """
+    campos, embutir, erro = _campos_registro()
+    if erro:
+        return erro
+    if 'updated_at' not in campos:
+        campos.append('updated_at')
+    query = _query_registros(Registro.query, campos, embutir)
+    return _feed(Registro, query, lambda registro: _serializar_registro(registro, campos, embutir))
+
+@api_bp.route('/responsaveis/alteracoes')
+@api_token_required
+def alteracoes_responsaveis():
+    """Responsáveis criados ou alterados depois de ``updated_since`` e os excluídos."""
+    return _feed(Responsavel, Responsavel.query,
+                 lambda r: {campo: _valor_json(getattr(r, campo)) for campo in CAMPOS_RESPONSAVEL})
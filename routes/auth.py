@@ -1,17 +1,22 @@
 # routes/auth.py
-"""Rotas de autenticação e login com suporte LDAP/AD melhorado."""
+"""Rotas de autenticação (login, logout, limpeza de sessão) e integração LDAP/AD."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
-from flask_login import login_user, logout_user, login_required, current_user
-from flask_principal import identity_changed, Identity
-from werkzeug.security import check_password_hash
-from models import User, Role, db
-from ldap3 import Server, Connection, ALL, SIMPLE, SUBTREE
+import logging
 import os
-import time
 import re
+import time
+from datetime import datetime
 from functools import lru_cache
-from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from flask_login import login_required, login_user, logout_user
+from flask_principal import Identity, identity_changed
+from werkzeug.security import check_password_hash
+
+from models import db, Role, User, UserHistory
+from utils.permissoes import SERVER_START_TIME
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -28,88 +33,157 @@ LDAP_ROLE_MAPPING = {
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
-    """Tela de login com suporte a banco de dados e LDAP."""
+    """Tela de login. Dispara identity_changed após login para RBAC funcionar corretamente."""
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         auth_mode = current_app.config.get('AUTH_MODE', 'banco')
-        
         user = User.query.filter_by(username=username).first()
-        
         # Admin sempre autentica pelo banco
         if user and user.username == 'admin':
+            if user.status == 'bloqueado':
+                flash('Usuário admin está bloqueado.', 'danger')
+                return render_template('login.html')
             if user.status != 'ativo':
-                flash('Usuário admin inativo ou bloqueado.', 'danger')
+                flash('Usuário admin inativo.', 'danger')
                 return render_template('login.html')
             if user.password and check_password_hash(user.password, password):
+                # Atualiza login info
+                from datetime import datetime
+                user.last_login = datetime.now()
+                user.login_count = (user.login_count or 0) + 1
+                db.session.commit()
+                historico = UserHistory(
+                    user_id=user.id,
+                    acao='login',
+                    detalhes=None,
+                    usuario=user.username,
+                    ip_address=request.remote_addr,
+                    user_agent=request.headers.get('User-Agent', '')[:255]
+                )
+                db.session.add(historico)
+                db.session.commit()
                 login_user(user)
-                identity_changed.send(current_app, identity=Identity(user.id))
-                return redirect(url_for('dashboard'))
+                # Armazenar timestamp de início do servidor na sessão
+                session['server_start_time'] = SERVER_START_TIME
+                identity_changed.send(current_app._get_current_object(), identity=Identity(user.id))
+                return redirect(url_for('dashboards.dashboard'))
             else:
                 flash('Usuário ou senha inválidos', 'danger')
                 return render_template('login.html')
-        
         # Autenticação por banco
         if auth_mode == 'banco':
-            if user and user.status == 'ativo':
+            if user:
+                if user.status == 'bloqueado':
+                    flash('Usuário bloqueado. Contate o administrador.', 'danger')
+                    return render_template('login.html')
+                if user.status != 'ativo':
+                    flash('Usuário inativo.', 'danger')
+                    return render_template('login.html')
                 if user.password and check_password_hash(user.password, password):
-                    login_user(user)
-                    identity_changed.send(current_app, identity=Identity(user.id))
-                    return redirect(url_for('dashboard'))
-                else:
-                    flash('Usuário ou senha inválidos', 'danger')
+                    from datetime import datetime
+                    user.last_login = datetime.now()
+                    user.login_count = (user.login_count or 0) + 1
+                    db.session.commit()
+                    historico = UserHistory(
+                        user_id=user.id,
+                        acao='login',
+                        detalhes=None,
+                        usuario=user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    db.session.commit()
+                login_user(user)
+                # Armazenar timestamp de início do servidor na sessão
+                session['server_start_time'] = SERVER_START_TIME
+                identity_changed.send(current_app._get_current_object(), identity=Identity(user.id))
+                return redirect(url_for('dashboards.dashboard'))
             else:
-                flash('Usuário não encontrado ou inativo', 'danger')
-        
-        # Autenticação LDAP
+                flash('Usuário ou senha inválidos', 'danger')
+                return render_template('login.html')
+        # Autenticação por LDAP
         elif auth_mode == 'ldap':
-            if authenticate_ldap(username, password):
-                # Buscar ou criar usuário no banco
-                user = User.query.filter_by(username=username).first()
+            # Exemplo de configuração LDAP (ajuste conforme seu AD)
+            LDAP_SERVER = os.environ.get('LDAP_SERVER', 'ldap://seu-servidor-ldap')
+            LDAP_BASE_DN = os.environ.get('LDAP_BASE_DN', 'dc=empresa,dc=com,dc=br')
+            LDAP_USER_DN = os.environ.get('LDAP_USER_DN', 'ou=usuarios')
+            LDAP_USER_ATTR = os.environ.get('LDAP_USER_ATTR', 'sAMAccountName')
+            try:
+                from ldap3 import Server, Connection, ALL, SIMPLE
+                server = Server(LDAP_SERVER, get_info=ALL)
+                user_dn = f'{LDAP_USER_ATTR}={username},{LDAP_USER_DN},{LDAP_BASE_DN}'
+                conn = Connection(server, user=user_dn, password=password, authentication=SIMPLE, auto_bind=True)
+                # Se autenticar, busca ou cria usuário local
                 if not user:
-                    # Buscar dados completos do usuário LDAP
-                    ldap_user_data = get_ldap_user_details(username)
-                    if ldap_user_data:
-                        # Criar usuário com dados reais do LDAP
-                        user = User(
-                            username=username,
-                            nome=ldap_user_data.get('nome', username),
-                            email=ldap_user_data.get('email', f"{username}@empresa.com"),
-                            ldap_user=True
-                        )
-                        db.session.add(user)
-                        db.session.commit()
-                        
-                        # Mapear grupos LDAP para roles
-                        assign_ldap_roles(user, ldap_user_data.get('grupos', []))
-                    else:
-                        flash('Erro ao obter dados do usuário LDAP', 'danger')
-                        return render_template('login.html')
-                else:
-                    # Usuário já existe - sincronizar dados do LDAP
-                    if user.ldap_user:
-                        sync_ldap_user_data(user, username)
-                
-                if user.status == 'ativo':
-                    login_user(user)
-                    identity_changed.send(current_app, identity=Identity(user.id))
-                    return redirect(url_for('dashboard'))
-                else:
-                    flash('Usuário inativo ou bloqueado', 'danger')
-            else:
-                flash('Credenciais LDAP inválidas', 'danger')
-        
-        return render_template('login.html')
-    
+                    user = User(username=username, email=f'{username}@empresa.com.br', status='ativo', ldap_user=True)
+                    db.session.add(user)
+                    db.session.commit()
+                if user.status == 'bloqueado':
+                    flash('Usuário bloqueado. Contate o administrador.', 'danger')
+                    return render_template('login.html')
+                if user.status != 'ativo':
+                    flash('Usuário inativo.', 'danger')
+                    return render_template('login.html')
+                from datetime import datetime
+                user.last_login = datetime.now()
+                user.login_count = (user.login_count or 0) + 1
+                db.session.commit()
+                historico = UserHistory(
+                    user_id=user.id,
+                    acao='login',
+                    detalhes=None,
+                    usuario=user.username,
+                    ip_address=request.remote_addr,
+                    user_agent=request.headers.get('User-Agent', '')[:255]
+                )
+                db.session.add(historico)
+                db.session.commit()
+                login_user(user)
+                # Armazenar timestamp de início do servidor na sessão
+                session['server_start_time'] = SERVER_START_TIME
+                identity_changed.send(current_app._get_current_object(), identity=Identity(user.id))
+                return redirect(url_for('dashboards.dashboard'))
+            except Exception as e:
+                flash('Usuário ou senha inválidos (LDAP)', 'danger')
+                return render_template('login.html')
     return render_template('login.html')
 
+@auth_bp.route('/clear-session')
+def clear_session():
+    """Força a limpeza da sessão atual (para resolver problemas de autenticação)."""
+    logout_user()
+    session.clear()
+    response = redirect(url_for('auth.login'))
+    response.delete_cookie('session')
+    response.delete_cookie('remember_token')
+    response.delete_cookie('certificados_session')
+    response.set_cookie('session', '', expires=0, max_age=0)
+    response.set_cookie('remember_token', '', expires=0, max_age=0)
+    response.set_cookie('certificados_session', '', expires=0, max_age=0)
+    flash('Sessão limpa. Faça login novamente.', 'info')
+    return response
+
 @auth_bp.route('/logout')
 @login_required
 def logout():
-    """Logout do usuário."""
+    """Logout do usuário atual."""
+    # Limpar sessão do Flask
+    session.clear()
+    # Logout do Flask-Login
     logout_user()
-    flash('Logout realizado com sucesso!', 'success')
-    return redirect(url_for('auth.login'))
+    # Limpar cookies de sessão
+    response = redirect(url_for('auth.login'))
+    response.delete_cookie('session')
+    response.delete_cookie('remember_token')
+    response.delete_cookie('certificados_session')
+    # Forçar expiração de todos os cookies relacionados
+    response.set_cookie('session', '', expires=0, max_age=0)
+    response.set_cookie('remember_token', '', expires=0, max_age=0)
+    response.set_cookie('certificados_session', '', expires=0, max_age=0)
+    flash('Logout realizado com sucesso.', 'success')
+    return response
 
 @lru_cache(maxsize=10)
 def get_ldap_server_config():
@@ -130,6 +204,8 @@ def get_ldap_server_config():
 
 def get_cached_ldap_connection():
     """Obtém conexão LDAP do cache ou cria nova."""
+    from ldap3 import ALL, SIMPLE, Connection, Server
+
     config = get_ldap_server_config()
     cache_key = f"{config['server']}:{config['port']}"
     
@@ -198,6 +274,8 @@ def get_cached_ldap_connection():
 
 def authenticate_ldap(username, password):
     """Autentica usuário via LDAP com melhorias de segurança e performance."""
+    from ldap3 import SIMPLE, SUBTREE, Connection
+
     # Validação de entrada
     if not username or not password:
         current_app.logger.warning("Tentativa de login LDAP com credenciais vazias")
@@ -364,4 +442,4 @@ def sync_ldap_user_data(user, username):
             current_app.logger.info(f"Dados LDAP sincronizados para {username}")
             
     except Exception as e:
-        current_app.logger.error(f"Erro ao sincronizar dados LDAP de {username}: {e}") 
\ No newline at end of file
+        current_app.logger.error(f"Erro ao sincronizar dados LDAP de {username}: {e}") 
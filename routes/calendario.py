@@ -0,0 +1,66 @@
+# routes/calendario.py
+"""Calendários ICS de vencimentos por responsável e por tipo (ver utils/calendario.py)."""
+
+import logging
+from datetime import date, timezone
+
+from flask import Blueprint, abort, current_app, request, url_for
+
+from models import db, Responsavel
+from utils.calendario import gerar_ics, ler_token, registros_calendario, token_calendario, validadores
+from utils.etag import CACHE_CONTROL
+from utils.fragmentos import fragmentos_ativos, guardar_fragmento, obter_fragmento
+from utils.replica import somente_leitura
+
+logger = logging.getLogger(__name__)
+
+calendario_bp = Blueprint('calendario', __name__)
+
+@calendario_bp.app_template_global()
+def url_calendario(escopo, valor):
+    """Endereço do calendário de um responsável (id) ou tipo, para os templates."""
+    return url_for('calendario.calendario', token=token_calendario(escopo, valor), _external=True)
+
+def _nao_modificado(etag, ultima_alteracao):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    # Datas HTTP têm resolução de segundos
+    return (request.if_modified_since is not None and ultima_alteracao is not None
+            and ultima_alteracao.replace(microsecond=0) <= request.if_modified_since)
+
+@calendario_bp.route('/calendar/<token>.ics')
+@somente_leitura
+def calendario(token):
+    """Eventos dos registros pendentes; 304 enquanto nenhum deles muda."""
+    lido = ler_token(token)
+    if lido is None:
+        abort(404)
+    escopo, valor = lido
+    hoje = date.today()
+
+    etag, ultima_alteracao = validadores(escopo, valor, hoje)
+    if ultima_alteracao is not None:
+        ultima_alteracao = ultima_alteracao.replace(tzinfo=timezone.utc)
+    if _nao_modificado(etag, ultima_alteracao):
+        resposta = current_app.response_class(status=304)
+    else:
+        corpo = obter_fragmento(etag) if fragmentos_ativos() else None
+        if corpo is None:
+            if escopo == 'responsavel':
+                responsavel = db.session.get(Responsavel, valor)
+                if responsavel is None:
+                    abort(404)
+                nome = f'Vencimentos - {responsavel.nome}'
+            else:
+                nome = f'Vencimentos - {valor}'
+            corpo = gerar_ics(nome, registros_calendario(escopo, valor, hoje), hoje,
+                              lambda r: url_for('registros.listar_registros', busca_nome=r.nome, _external=True))
+            if fragmentos_ativos():
+                guardar_fragmento(etag, corpo)
+        resposta = current_app.response_class(corpo, mimetype='text/calendar')
+        resposta.headers['Content-Disposition'] = f'inline; filename="vencimentos-{escopo}.ics"'
+    resposta.set_etag(etag)
+    if ultima_alteracao is not None:
+        resposta.last_modified = ultima_alteracao
+    resposta.headers['Cache-Control'] = CACHE_CONTROL
+    return resposta
@@ -0,0 +1,354 @@
+# routes/configuracao.py
+"""Configurações do sistema, agendamento e testes de LDAP/email."""
+
+import logging
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from models import db, Configuracao
+from utils.configuracao_sistema import get_system_config
+from utils.metrics import registrar_email
+from utils.permissoes import permission_required
+from tarefas import recarregar_agendamento
+
+logger = logging.getLogger(__name__)
+
+configuracao_bp = Blueprint('configuracao', __name__)
+
+@configuracao_bp.route('/configuracao', methods=['GET', 'POST'])
+@permission_required('manage_config')
+@login_required
+def configuracao():
+    config = Configuracao.query.first()
+    if not config:
+        config = Configuracao(dia_semana='fri', hora=14, minuto=0)
+        db.session.add(config)
+        db.session.commit()
+    
+    # Carregar configurações LDAP do ambiente
+    ldap_config = {
+        'ldap_server': os.environ.get('LDAP_SERVER', 'ldap://seu-servidor-ldap'),
+        'ldap_port': int(os.environ.get('LDAP_PORT', 389)),
+        'ldap_base_dn': os.environ.get('LDAP_BASE_DN', 'dc=empresa,dc=com,dc=br'),
+        'ldap_user_dn': os.environ.get('LDAP_USER_DN', 'ou=usuarios'),
+        'ldap_user_attr': os.environ.get('LDAP_USER_ATTR', 'sAMAccountName'),
+        'ldap_bind_dn': os.environ.get('LDAP_BIND_DN', ''),
+        'ldap_bind_password': os.environ.get('LDAP_BIND_PASSWORD', ''),
+        'ldap_email_attr': os.environ.get('LDAP_EMAIL_ATTR', 'mail')
+    }
+    
+    # Carregar configurações de email
+    email_config = {
+        'mail_server': config.mail_server if config else 'smtp.gmail.com',
+        'mail_port': config.mail_port if config else 587,
+        'mail_username': config.mail_username if config else '',
+        'mail_password': config.mail_password if config else '',
+        'mail_use_tls': config.mail_use_tls if config else 'tls',
+        'mail_default_sender': config.mail_default_sender if config else ''
+    }
+    
+    if request.method == 'POST':
+        # Verificar se agendamento está ativo antes de pegar os valores
+        agendamento_ativo = 'agendamento_ativo' in request.form
+        
+        if agendamento_ativo:
+            config.dia_semana = request.form.get('dia_semana', 'fri')
+            config.hora = int(request.form.get('hora', 14))
+            config.minuto = int(request.form.get('minuto', 0))
+        else:
+            # Manter valores atuais se agendamento estiver desativado
+            pass
+            
+        config.agendamento_ativo = agendamento_ativo
+        
+        # Salvar configurações de email
+        config.mail_server = request.form.get('mail_server', 'smtp.gmail.com')
+        config.mail_port = int(request.form.get('mail_port', 587))
+        config.mail_username = request.form.get('mail_username', '')
+        config.mail_password = request.form.get('mail_password', '')
+        config.mail_use_tls = request.form.get('mail_use_tls', 'tls')
+        config.mail_default_sender = request.form.get('mail_default_sender', '')
+        
+        # Salvar configurações de personalização (simplificadas)
+        config.nome_sistema = request.form.get('nome_sistema', 'Sistema de Certificados')
+        config.equipe_ti = request.form.get('equipe_ti', 'Equipe de TI')
+        config.email_ti = request.form.get('email_ti', 'ti@empresa.com')
+        config.telefone_ti = request.form.get('telefone_ti', '(11) 99999-9999')
+        config.logo_url = request.form.get('logo_url', '')
+
+        
+        # Atualizar modo de autenticação
+        auth_mode = request.form.get('auth_mode', 'banco')
+        current_app.config['AUTH_MODE'] = auth_mode
+        
+        # Salvar configurações LDAP no ambiente (se for LDAP)
+        if auth_mode == 'ldap':
+            os.environ['LDAP_SERVER'] = request.form.get('ldap_server', 'ldap://seu-servidor-ldap')
+            os.environ['LDAP_PORT'] = request.form.get('ldap_port', '389')
+            os.environ['LDAP_BASE_DN'] = request.form.get('ldap_base_dn', 'dc=empresa,dc=com,dc=br')
+            os.environ['LDAP_USER_DN'] = request.form.get('ldap_user_dn', 'ou=usuarios')
+            os.environ['LDAP_USER_ATTR'] = request.form.get('ldap_user_attr', 'sAMAccountName')
+            os.environ['LDAP_BIND_DN'] = request.form.get('ldap_bind_dn', '')
+            os.environ['LDAP_BIND_PASSWORD'] = request.form.get('ldap_bind_password', '')
+            os.environ['LDAP_EMAIL_ATTR'] = request.form.get('ldap_email_attr', 'mail')
+        
+        db.session.commit()
+        
+        # Recarregar agendamento se necessário
+        if 'agendamento_ativo' in request.form:
+            recarregar_agendamento()
+        
+        flash('Configuração atualizada com sucesso!', 'success')
+        return redirect(url_for('configuracao.configuracao'))
+    
+    # Retorno para método GET
+    return render_template('configuracao/form_colapsavel.html', 
+                          config=config, 
+                          auth_mode=current_app.config.get('AUTH_MODE', 'banco'),
+                          ldap_config=ldap_config,
+                          email_config=email_config)
+
+@configuracao_bp.route('/configuracao/salvar-secao/<secao>', methods=['POST'])
+@permission_required('manage_config')
+@login_required
+def salvar_secao_configuracao(secao):
+    """Salva uma seção específica da configuração."""
+    try:
+        config = Configuracao.query.first()
+        if not config:
+            config = Configuracao()
+            db.session.add(config)
+        
+        if secao == 'auth':
+            # Salvar configurações de autenticação
+            auth_mode = request.form.get('auth_mode', 'banco')
+            current_app.config['AUTH_MODE'] = auth_mode
+            
+            # Salvar configurações LDAP se for LDAP
+            if auth_mode == 'ldap':
+                os.environ['LDAP_SERVER'] = request.form.get('ldap_server', 'ldap://seu-servidor-ldap')
+                os.environ['LDAP_PORT'] = request.form.get('ldap_port', '389')
+                os.environ['LDAP_BASE_DN'] = request.form.get('ldap_base_dn', 'dc=empresa,dc=com,dc=br')
+                os.environ['LDAP_USER_DN'] = request.form.get('ldap_user_dn', 'ou=usuarios')
+                os.environ['LDAP_USER_ATTR'] = request.form.get('ldap_user_attr', 'sAMAccountName')
+                os.environ['LDAP_BIND_DN'] = request.form.get('ldap_bind_dn', '')
+                os.environ['LDAP_BIND_PASSWORD'] = request.form.get('ldap_bind_password', '')
+                os.environ['LDAP_EMAIL_ATTR'] = request.form.get('ldap_email_attr', 'mail')
+            
+            mensagem = 'Configurações de autenticação salvas com sucesso!'
+            
+        elif secao == 'email':
+            # Salvar configurações de email
+            config.mail_server = request.form.get('mail_server', 'smtp.gmail.com')
+            config.mail_port = int(request.form.get('mail_port', 587))
+            config.mail_username = request.form.get('mail_username', '')
+            config.mail_password = request.form.get('mail_password', '')
+            config.mail_use_tls = request.form.get('mail_use_tls', 'tls')
+            config.mail_default_sender = request.form.get('mail_default_sender', '')
+            
+            mensagem = 'Configurações de email salvas com sucesso!'
+            
+        elif secao == 'agendamento':
+            # Salvar configurações de agendamento
+            agendamento_ativo = 'agendamento_ativo' in request.form
+            config.agendamento_ativo = agendamento_ativo
+            
+            if agendamento_ativo:
+                config.dia_semana = request.form.get('dia_semana', 'fri')
+                config.hora = int(request.form.get('hora', 14))
+                config.minuto = int(request.form.get('minuto', 0))
+                recarregar_agendamento()
+            
+            mensagem = 'Configurações de agendamento salvas com sucesso!'
+            
+        elif secao == 'personalizacao':
+            # Salvar configurações de personalização (simplificadas)
+            config.nome_sistema = request.form.get('nome_sistema', 'Sistema de Certificados')
+            config.equipe_ti = request.form.get('equipe_ti', 'Equipe de TI')
+            config.email_ti = request.form.get('email_ti', 'ti@empresa.com')
+            config.telefone_ti = request.form.get('telefone_ti', '(11) 99999-9999')
+            config.logo_url = request.form.get('logo_url', '')
+
+            
+            mensagem = 'Configurações de personalização salvas com sucesso!'
+        
+        else:
+            return jsonify({'success': False, 'message': 'Seção inválida'}), 400
+        
+        db.session.commit()
+        return jsonify({'success': True, 'message': mensagem})
+        
+    except Exception as e:
+        logger.error(f"Erro ao salvar seção {secao}: {e}")
+        return jsonify({'success': False, 'message': f'Erro ao salvar: {str(e)}'}), 500
+
+@configuracao_bp.route('/testar-ldap', methods=['POST'])
+@permission_required('manage_config')
+@login_required
+def testar_ldap():
+    """Testa a conexão LDAP com as configurações fornecidas usando as funções melhoradas."""
+    try:
+        # Temporariamente definir variáveis de ambiente com os valores do formulário
+        original_env = {}
+        form_config = {
+            'LDAP_SERVER': request.form.get('ldap_server', 'ldap://localhost'),
+            'LDAP_PORT': request.form.get('ldap_port', '389'),
+            'LDAP_BASE_DN': request.form.get('ldap_base_dn', 'dc=empresa,dc=com'),
+            'LDAP_USER_DN': request.form.get('ldap_user_dn', 'ou=usuarios'),
+            'LDAP_USER_ATTR': request.form.get('ldap_user_attr', 'sAMAccountName'),
+            'LDAP_BIND_DN': request.form.get('ldap_bind_dn', ''),
+            'LDAP_BIND_PASSWORD': request.form.get('ldap_bind_password', ''),
+            'LDAP_EMAIL_ATTR': request.form.get('ldap_email_attr', 'mail'),
+            'LDAP_NAME_ATTR': 'displayName',
+            'LDAP_GROUP_ATTR': 'memberOf',
+            'LDAP_TIMEOUT': '10'
+        }
+        
+        # Salvar configurações originais e aplicar temporárias
+        for key, value in form_config.items():
+            original_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        
+        # Limpar cache das configurações para usar as novas
+        from routes.auth import get_ldap_server_config
+        get_ldap_server_config.cache_clear()
+        
+        # Importar funções melhoradas
+        from routes.auth import get_cached_ldap_connection, get_ldap_user_details
+        
+        # Testar conexão usando as funções melhoradas
+        conn = get_cached_ldap_connection()
+        
+        if not conn:
+            return jsonify({
+                'success': False,
+                'message': 'Falha ao estabelecer conexão LDAP. Verifique servidor, porta e credenciais.'
+            })
+        
+        # Testar busca de usuários
+        config = get_ldap_server_config()
+        search_base = f"{config['user_dn']},{config['base_dn']}"
+        search_filter = f"({config['user_attr']}=*)"
+        
+        success = conn.search(search_base, search_filter, attributes=[config['user_attr']], size_limit=5)
+        
+        if success and conn.entries:
+            # Testar busca de detalhes de um usuário específico
+            first_user = str(conn.entries[0][config['user_attr']].value)
+            user_details = get_ldap_user_details(first_user)
+            
+            result_msg = f"✅ Conexão LDAP bem-sucedida!\\n"
+            result_msg += f"📊 Encontrados {len(conn.entries)} usuários (mostrando primeiros 5)\\n"
+            result_msg += f"👤 Teste de detalhes do usuário '{first_user}': "
+            
+            if user_details:
+                result_msg += f"✅ Sucesso\\n"
+                result_msg += f"   📧 Email: {user_details.get('email', 'N/A')}\\n"
+                result_msg += f"   👥 Grupos: {len(user_details.get('grupos', []))} encontrados"
+            else:
+                result_msg += "⚠️ Detalhes não obtidos"
+            
+            return jsonify({
+                'success': True, 
+                'message': result_msg
+            })
+        else:
+            return jsonify({
+                'success': False, 
+                'message': 'Conexão estabelecida, mas nenhum usuário encontrado. Verifique User DN e Base DN.'
+            })
+            
+    except Exception as e:
+        logger.error(f"Erro ao testar LDAP melhorado: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao testar LDAP: {str(e)}'
+        })
+    finally:
+        # Restaurar configurações originais
+        for key, original_value in original_env.items():
+            if original_value is not None:
+                os.environ[key] = original_value
+            elif key in os.environ:
+                del os.environ[key]
+        
+        # Limpar cache novamente para usar configurações originais
+        try:
+            from routes.auth import get_ldap_server_config
+            get_ldap_server_config.cache_clear()
+        except:
+            pass
+
+@configuracao_bp.route('/testar-email', methods=['POST'])
+@permission_required('manage_config')
+@login_required
+def testar_email():
+    """Testa a configuração de email com as configurações fornecidas."""
+    try:
+        from flask_mail import Mail, Message
+        
+        # Pegar configurações do formulário
+        mail_server = request.form.get('mail_server', 'smtp.gmail.com')
+        mail_port = int(request.form.get('mail_port', 587))
+        mail_username = request.form.get('mail_username', '')
+        mail_password = request.form.get('mail_password', '')
+        mail_use_tls = request.form.get('mail_use_tls', 'tls')
+        mail_default_sender = request.form.get('mail_default_sender', '')
+        
+        if not mail_username or not mail_password:
+            return jsonify({
+                'success': False,
+                'message': 'Usuário e senha são obrigatórios para teste de email.'
+            })
+        
+        # Configurar Flask-Mail temporariamente
+        test_app = current_app._get_current_object()
+        test_app.config['MAIL_SERVER'] = mail_server
+        test_app.config['MAIL_PORT'] = mail_port
+        test_app.config['MAIL_USE_TLS'] = mail_use_tls == 'tls'
+        test_app.config['MAIL_USE_SSL'] = mail_use_tls == 'ssl'
+        test_app.config['MAIL_USERNAME'] = mail_username
+        test_app.config['MAIL_PASSWORD'] = mail_password
+        test_app.config['MAIL_DEFAULT_SENDER'] = mail_default_sender or mail_username
+        
+        test_mail = Mail(test_app)
+        
+        # Tentar enviar email de teste
+        with test_app.app_context():
+            # Renderizar template HTML
+            html_content = render_template('emails/email_teste.html',
+                                         config={
+                                             'mail_server': mail_server,
+                                             'mail_port': mail_port,
+                                             'mail_username': mail_username,
+                                             'mail_use_tls': mail_use_tls,
+                                             'mail_default_sender': mail_default_sender or mail_username
+                                         },
+                                         momento_teste=datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+                                         destinatario=mail_username,
+                                         system_config=get_system_config(),
+                                         subject='Teste de Configuração - Sistema de Certificados')
+            
+            msg = Message(
+                subject='Teste de Configuração - Sistema de Certificados',
+                recipients=[mail_username],
+                html=html_content,
+                sender=mail_default_sender or mail_username
+            )
+            test_mail.send(msg)
+            registrar_email('teste', 'enviado')
+        
+        return jsonify({
+            'success': True,
+            'message': f'Email de teste enviado com sucesso para {mail_username}!'
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao testar email: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro na configuração de email: {str(e)}'
+        })
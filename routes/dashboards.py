@@ -0,0 +1,249 @@
+# routes/dashboards.py
+"""Dashboards de registros, vencimentos, responsáveis e atividade."""
+
+import logging
+from datetime import timedelta
+
+from flask import Blueprint, redirect, render_template, url_for
+from flask_login import login_required
+
+from models import db
+from utils.ao_vivo import modo_ao_vivo
+from utils.etag import etag_dependente
+from utils.fragmentos import DadosAdiados, widget_json
+from utils.replica import somente_leitura
+
+logger = logging.getLogger(__name__)
+
+dashboards_bp = Blueprint('dashboards', __name__)
+
+@dashboards_bp.route('/')
+def index():
+    """Redireciona a raiz para a tela de login."""
+    return redirect(url_for('auth.login'))
+
+@dashboards_bp.route('/dashboard')
+@dashboards_bp.route('/dashboard/')
+@login_required
+@somente_leitura
+@etag_dependente('registro')
+def dashboard():
+    """Totais do rollup de status; não grava, então contadores e versões do ETag vêm do mesmo banco."""
+    from utils.status_rollup import resumo_status
+    resumo = resumo_status()
+    total_registros = resumo['total']
+    vencidos = resumo['vencidos']
+    vencendo = resumo['vencendo']
+    validos = resumo['validos']
+    
+    # Contagem por tipo
+    certificados = resumo['por_tipo'].get('certificado', 0)
+    senhas = resumo['por_tipo'].get('senha', 0)
+    licencas = resumo['por_tipo'].get('licenca', 0)
+    
+    return render_template('dashboard.html', 
+                         total_registros=total_registros, 
+                         vencidos=vencidos, 
+                         vencendo=vencendo,
+                         validos=validos,
+                         certificados=certificados,
+                         senhas=senhas,
+                         licencas=licencas,
+                         modo_ao_vivo=modo_ao_vivo())
+
+@dashboards_bp.route('/dashboard-vencimentos')
+@login_required
+@etag_dependente()
+def dashboard_vencimentos():
+    """Esqueleto da página; tabelas e gráfico vêm das rotas de widget."""
+    return render_template('dashboard_vencimentos.html')
+
+def _registros_vencimento(*filtros):
+    from models import Registro
+    return Registro.query.filter(
+        *filtros,
+        Registro.regularizado == False
+    ).order_by(Registro.data_vencimento).all()
+
+@dashboards_bp.route('/dashboard-vencimentos/widgets/proximos-7-dias')
+@login_required
+@somente_leitura
+@etag_dependente('registro')
+@widget_json('registro')
+def widget_proximos_7_dias():
+    from models import Registro
+    from datetime import date
+    
+    hoje = date.today()
+    # Próximos 7 dias (crítico)
+    registros = _registros_vencimento(
+        Registro.data_vencimento >= hoje,
+        Registro.data_vencimento <= hoje + timedelta(days=7)
+    )
+    return {'total': len(registros),
+            'html': render_template('widgets/vencimentos_proximos_7_dias.html', registros=registros, hoje=hoje)}
+
+@dashboards_bp.route('/dashboard-vencimentos/widgets/proximos-30-dias')
+@login_required
+@somente_leitura
+@etag_dependente('registro')
+@widget_json('registro')
+def widget_proximos_30_dias():
+    from models import Registro
+    from datetime import date
+    
+    hoje = date.today()
+    # Próximos 30 dias (atenção)
+    registros = _registros_vencimento(
+        Registro.data_vencimento > hoje + timedelta(days=7),
+        Registro.data_vencimento <= hoje + timedelta(days=30)
+    )
+    return {'total': len(registros),
+            'html': render_template('widgets/vencimentos_proximos_30_dias.html', registros=registros, hoje=hoje)}
+
+@dashboards_bp.route('/dashboard-vencimentos/widgets/vencidos-30-dias')
+@login_required
+@somente_leitura
+@etag_dependente('registro', 'responsavel')
+@widget_json('registro', 'responsavel')
+def widget_vencidos_30_dias():
+    from models import Registro
+    from datetime import date
+    from sqlalchemy.orm import selectinload
+    
+    hoje = date.today()
+    # Vencidos há mais de 30 dias (urgente), com os responsáveis de cada um
+    registros = Registro.query.options(selectinload(Registro.responsaveis)).filter(
+        Registro.data_vencimento < hoje - timedelta(days=30),
+        Registro.regularizado == False
+    ).order_by(Registro.data_vencimento).all()
+    return {'total': len(registros),
+            'html': render_template('widgets/vencimentos_vencidos_30_dias.html', registros=registros, hoje=hoje)}
+
+@dashboards_bp.route('/dashboard-vencimentos/widgets/grafico')
+@login_required
+@somente_leitura
+@etag_dependente('registro')
+@widget_json('registro')
+def widget_grafico_vencimentos():
+    from models import Registro
+    from datetime import date
+    from sqlalchemy import func
+    
+    hoje = date.today()
+    # Dados para gráfico temporal (últimos 90 dias + próximos 30 dias), em uma única consulta agrupada
+    vencimentos_por_dia = db.session.query(
+        Registro.data_vencimento, func.count(Registro.id)
+    ).filter(
+        Registro.data_vencimento >= hoje - timedelta(days=90),
+        Registro.data_vencimento <= hoje + timedelta(days=30),
+        Registro.regularizado == False
+    ).group_by(Registro.data_vencimento).order_by(Registro.data_vencimento).all()
+    
+    return {'labels': [data.strftime('%d/%m') for data, _ in vencimentos_por_dia],
+            'valores': [count for _, count in vencimentos_por_dia]}
+
+@dashboards_bp.route('/dashboard-responsaveis')
+@login_required
+@somente_leitura
+@etag_dependente('registro', 'responsavel')
+def dashboard_responsaveis():
+    from datetime import date
+    
+    hoje = date.today()
+    return render_template('dashboard_responsaveis.html',
+                         dados=DadosAdiados(lambda: _dados_responsaveis(hoje)),
+                         hoje=hoje)
+
+def _dados_responsaveis(hoje):
+    from models import Responsavel
+    
+    # Buscar todos os responsáveis com contagem de itens
+    responsaveis_stats = []
+    todos_responsaveis = Responsavel.query.all()
+    
+    for responsavel in todos_responsaveis:
+        # Total de itens
+        total_itens = len(responsavel.registros)
+        
+        # Itens vencidos
+        itens_vencidos = sum(1 for r in responsavel.registros 
+                           if r.data_vencimento < hoje and not r.regularizado)
+        
+        # Itens em alerta (próximos 7 dias)
+        itens_alerta = sum(1 for r in responsavel.registros 
+                          if r.data_vencimento >= hoje and 
+                          r.data_vencimento <= hoje + timedelta(days=7) and 
+                          not r.regularizado)
+        
+        # Itens válidos
+        itens_validos = total_itens - itens_vencidos - itens_alerta
+        
+        responsaveis_stats.append({
+            'responsavel': responsavel,
+            'total_itens': total_itens,
+            'itens_vencidos': itens_vencidos,
+            'itens_alerta': itens_alerta,
+            'itens_validos': itens_validos
+        })
+    
+    # Ordenar por total de itens (ranking)
+    responsaveis_stats.sort(key=lambda x: x['total_itens'], reverse=True)
+    
+    # Top 5 responsáveis
+    top_5 = responsaveis_stats[:5]
+    
+    # Responsáveis com itens vencidos
+    responsaveis_com_vencidos = [r for r in responsaveis_stats if r['itens_vencidos'] > 0]
+    
+    # Dados para gráfico de pizza (top 10)
+    top_10_nomes = [r['responsavel'].nome for r in responsaveis_stats[:10]]
+    top_10_quantidades = [r['total_itens'] for r in responsaveis_stats[:10]]
+    
+    return dict(responsaveis_stats=responsaveis_stats,
+                top_5=top_5,
+                responsaveis_com_vencidos=responsaveis_com_vencidos,
+                top_10_nomes=top_10_nomes,
+                top_10_quantidades=top_10_quantidades)
+
+@dashboards_bp.route('/dashboard-atividade')
+@login_required
+@somente_leitura
+def dashboard_atividade():
+    from models import Registro, User, RegistroHistory
+    from datetime import date
+    from utils.activity import obter_atividade_diaria, ACOES_REGISTRO
+    
+    hoje = date.today()
+    
+    # Últimos 10 registros criados
+    ultimos_registros = Registro.query.order_by(Registro.id.desc()).limit(10).all()
+    
+    # Últimas 10 alterações (trilha de auditoria)
+    ultimas_alteracoes = RegistroHistory.query.order_by(RegistroHistory.created_at.desc()).limit(10).all()
+    
+    # Buckets diários pré-calculados dos últimos 30 dias (uma única consulta)
+    atividade = obter_atividade_diaria(dias=30, hoje=hoje)
+    
+    # Registros criados nos últimos 30 dias
+    registros_30_dias = sum(acoes.get('created', 0) for acoes in atividade.values())
+    
+    # Usuários ativos
+    usuarios_ativos = User.query.filter(User.status == 'ativo').count()
+    
+    # Dados para gráfico de atividade (últimos 7 dias + hoje)
+    datas_atividade = []
+    contagem_atividade = []
+    for dia in sorted(atividade)[-8:]:
+        datas_atividade.append(dia.strftime('%d/%m'))
+        contagem_atividade.append(sum(atividade[dia].values()))
+    
+    return render_template('dashboard_atividade.html',
+                         ultimos_registros=ultimos_registros,
+                         ultimas_alteracoes=ultimas_alteracoes,
+                         acoes_registro=ACOES_REGISTRO,
+                         registros_30_dias=registros_30_dias,
+                         usuarios_ativos=usuarios_ativos,
+                         datas_atividade=datas_atividade,
+                         contagem_atividade=contagem_atividade,
+                         hoje=hoje)
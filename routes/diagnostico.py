@@ -0,0 +1,66 @@
+# routes/diagnostico.py
+"""Health check e diagnósticos do worker (SQL, pool, alertas, scheduler)."""
+
+import logging
+import os
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required
+
+from models import db
+from utils.permissoes import permission_required
+from utils.replica import estado_replica
+
+logger = logging.getLogger(__name__)
+
+diagnostico_bp = Blueprint('diagnostico', __name__)
+
+@diagnostico_bp.route('/health')
+def health():
+    return jsonify({'status': 'ok'}), 200
+
+@diagnostico_bp.route('/diagnostico/sql')
+@permission_required('manage_config')
+@login_required
+def diagnostico_sql():
+    """Agregados de SQL por endpoint do worker atual (maiores médias de statements primeiro)."""
+    from utils.sql_instrumentation import obter_agregados, get_slow_query_ms
+    return jsonify({
+        'pid': os.getpid(),
+        'slow_query_ms': get_slow_query_ms(),
+        'endpoints': obter_agregados()
+    })
+
+@diagnostico_bp.route('/diagnostico/pool')
+@permission_required('manage_config')
+@login_required
+def diagnostico_pool():
+    """Uso do pool de conexões do worker atual e o dimensionamento calculado."""
+    from utils.db_pool import calcular_pool, estatisticas_pool
+    return jsonify({
+        'pid': os.getpid(),
+        'dimensionamento': calcular_pool(),
+        'pools': estatisticas_pool(db),
+        'replica': estado_replica()
+    })
+
+@diagnostico_bp.route('/diagnostico/alertas')
+@permission_required('manage_config')
+@login_required
+def diagnostico_alertas():
+    """Últimas execuções do envio de alertas (ledger de entregas)."""
+    from utils.alert_ledger import execucoes_recentes
+    # Valor inválido volta ao padrão; limitado a 1..200
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 200)
+    return jsonify({'execucoes': execucoes_recentes(limite)})
+
+@diagnostico_bp.route('/diagnostico/agendador')
+@permission_required('manage_config')
+@login_required
+def diagnostico_agendador():
+    """Liderança do scheduler neste processo e jobs agendados (quando líder)."""
+    from utils.agendador import agendador_habilitado, obter_agendador
+    agendador = obter_agendador()
+    if agendador is None:
+        return jsonify({'pid': os.getpid(), 'habilitado': agendador_habilitado(), 'lider': False})
+    return jsonify({'pid': os.getpid(), 'habilitado': True, **agendador.estado()})
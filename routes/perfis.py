@@ -0,0 +1,734 @@
+# routes/perfis.py
+"""Gestão de perfis (roles) e permissões: templates, assistente, importação/exportação e relatório."""
+
+import logging
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from models import db, Permission, Role, User
+from utils.permissoes import permission_required
+from utils.replica import somente_leitura
+
+logger = logging.getLogger(__name__)
+
+perfis_bp = Blueprint('perfis', __name__)
+
+@perfis_bp.route('/perfis')
+@perfis_bp.route('/perfis/')
+@permission_required('manage_access')
+@login_required
+def listar_perfis():
+    """Listagem de perfis (roles). Protegida por manage_access."""
+    perfis = Role.query.all()
+    return render_template('perfis/list.html', perfis=perfis) 
+
+@perfis_bp.route('/perfis/novo', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def novo_perfil():
+    """Cadastro de novo perfil (role) com seleção de permissões."""
+    permissoes = Permission.query.all()
+    if request.method == 'POST':
+        nome = request.form['nome']
+        descricao = request.form['descricao']
+        perms_ids = request.form.getlist('permissoes')
+        if not nome:
+            flash('Nome do perfil é obrigatório.', 'danger')
+            return render_template('perfis/form.html', permissoes=permissoes)
+        if Role.query.filter_by(nome=nome).first():
+            flash('Já existe um perfil com esse nome.', 'danger')
+            return render_template('perfis/form.html', permissoes=permissoes)
+        perfil = Role(nome=nome, descricao=descricao)
+        for pid in perms_ids:
+            perm = Permission.query.get(int(pid))
+            if perm:
+                perfil.permissions.append(perm)
+        db.session.add(perfil)
+        db.session.commit()
+        
+        # Registrar no histórico
+        from models import RoleHistory
+        import json
+        historico = RoleHistory(
+            role_id=perfil.id,
+            acao='created',
+            detalhes=json.dumps({
+                'nome': perfil.nome,
+                'descricao': perfil.descricao,
+                'permissoes_adicionadas': len(perfil.permissions)
+            }),
+            usuario=current_user.username
+        )
+        db.session.add(historico)
+        db.session.commit()
+        
+        flash('Perfil criado com sucesso!', 'success')
+        return redirect(url_for('perfis.listar_perfis'))
+    return render_template('perfis/form.html', permissoes=permissoes) 
+
+@perfis_bp.route('/perfis/<int:perfil_id>/editar', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def editar_perfil(perfil_id):
+    """Edição de perfil (role). Permite alterar nome, descrição e permissões."""
+    perfil = Role.query.get_or_404(perfil_id)
+    permissoes = Permission.query.all()
+    if request.method == 'POST':
+        nome = request.form['nome']
+        descricao = request.form['descricao']
+        perms_ids = request.form.getlist('permissoes')
+        if not nome:
+            flash('Nome do perfil é obrigatório.', 'danger')
+            return render_template('perfis/form.html', perfil=perfil, permissoes=permissoes)
+        if Role.query.filter(Role.nome == nome, Role.id != perfil.id).first():
+            flash('Já existe um perfil com esse nome.', 'danger')
+            return render_template('perfis/form.html', perfil=perfil, permissoes=permissoes)
+        # Salvar valores anteriores para o histórico
+        nome_anterior = perfil.nome
+        descricao_anterior = perfil.descricao
+        permissoes_anteriores = [p.nome for p in perfil.permissions]
+        
+        perfil.nome = nome
+        perfil.descricao = descricao
+        perfil.permissions = [Permission.query.get(int(pid)) for pid in perms_ids]
+        db.session.commit()
+        
+        # Registrar no histórico
+        from models import RoleHistory
+        import json
+        historico = RoleHistory(
+            role_id=perfil.id,
+            acao='updated',
+            detalhes=json.dumps({
+                'nome_anterior': nome_anterior,
+                'nome_novo': nome,
+                'descricao_anterior': descricao_anterior,
+                'descricao_nova': descricao,
+                'permissoes_anteriores': permissoes_anteriores,
+                'permissoes_novas': [p.nome for p in perfil.permissions]
+            }),
+            usuario=current_user.username
+        )
+        db.session.add(historico)
+        db.session.commit()
+        
+        flash('Perfil atualizado com sucesso!', 'success')
+        return redirect(url_for('perfis.listar_perfis'))
+    return render_template('perfis/form.html', perfil=perfil, permissoes=permissoes) 
+
+@perfis_bp.route('/perfis/<int:perfil_id>/excluir', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def excluir_perfil(perfil_id):
+    """Exclusão de perfil. Não permite excluir admin nem perfis em uso."""
+    perfil = Role.query.get_or_404(perfil_id)
+    if perfil.nome == 'admin':
+        flash('O perfil admin não pode ser excluído.', 'danger')
+        return redirect(url_for('perfis.listar_perfis'))
+    if perfil.users:
+        flash('Não é possível excluir um perfil associado a usuários.', 'danger')
+        return redirect(url_for('perfis.listar_perfis'))
+    if request.method == 'POST':
+        # Salvar informações antes de deletar para o histórico
+        perfil_info = {
+            'nome': perfil.nome,
+            'descricao': perfil.descricao,
+            'permissoes': [p.nome for p in perfil.permissions],
+            'usuarios_afetados': [u.username for u in perfil.users]
+        }
+        
+        # Registrar no histórico ANTES de deletar o perfil
+        from models import RoleHistory
+        import json
+        historico = RoleHistory(
+            role_id=perfil.id,  # Usar o ID antes de deletar
+            acao='deleted',
+            detalhes=json.dumps(perfil_info),
+            usuario=current_user.username
+        )
+        db.session.add(historico)
+        db.session.commit()
+        
+        # Agora deletar o perfil
+        db.session.delete(perfil)
+        db.session.commit()
+        
+        flash('Perfil excluído com sucesso!', 'success')
+        return redirect(url_for('perfis.listar_perfis'))
+    return render_template('perfis/confirm_delete.html', perfil=perfil) 
+
+# ===== FUNCIONALIDADES AVANÇADAS DE GERENCIAMENTO DE ROLES =====
+
+@perfis_bp.route('/perfis/dashboard')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+def dashboard_perfis():
+    """Dashboard avançado de gestão de perfis com estatísticas."""
+    from sqlalchemy import func
+    from models import RoleHistory, RoleTemplate
+    
+    # Estatísticas básicas
+    total_roles = Role.query.count()
+    roles_ativos = Role.query.filter_by(ativo=True).count()
+    roles_ldap = Role.query.filter_by(is_ldap_role=True).count()
+    usuarios_por_role = db.session.query(
+        Role.nome, func.count(User.id).label('usuarios')
+    ).outerjoin(User).group_by(Role.id, Role.nome).all()
+    
+    # Histórico recente
+    historico_recente = RoleHistory.query.order_by(
+        RoleHistory.timestamp.desc()
+    ).limit(10).all()
+    
+    # Permissions por categoria
+    perms_por_categoria = db.session.query(
+        Permission.categoria, func.count(Permission.id).label('total')
+    ).group_by(Permission.categoria).all()
+    
+    # Templates disponíveis
+    templates = RoleTemplate.query.filter_by(ativo=True).all()
+    
+    return render_template('perfis/dashboard.html',
+                         total_roles=total_roles,
+                         roles_ativos=roles_ativos,
+                         roles_ldap=roles_ldap,
+                         usuarios_por_role=usuarios_por_role,
+                         historico_recente=historico_recente,
+                         perms_por_categoria=perms_por_categoria,
+                         templates=templates)
+
+@perfis_bp.route('/perfis/<int:perfil_id>/clonar', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def clonar_perfil(perfil_id):
+    """Clona um perfil existente com todas as suas permissões."""
+    perfil_origem = Role.query.get_or_404(perfil_id)
+    
+    if request.method == 'POST':
+        nome_novo = request.form['nome']
+        descricao_nova = request.form.get('descricao', f"Clone de {perfil_origem.nome}")
+        
+        # Validações
+        if Role.query.filter_by(nome=nome_novo).first():
+            flash('Já existe um perfil com esse nome.', 'danger')
+            return render_template('perfis/clonar.html', perfil=perfil_origem)
+        
+        # Criar novo perfil
+        novo_perfil = Role(
+            nome=nome_novo,
+            descricao=descricao_nova,
+            cor=perfil_origem.cor,
+            icone=perfil_origem.icone,
+            prioridade=perfil_origem.prioridade,
+            parent_id=perfil_origem.parent_id,
+            created_by=current_user.username
+        )
+        
+        # Clonar permissões
+        for perm in perfil_origem.permissions:
+            novo_perfil.permissions.append(perm)
+        
+        db.session.add(novo_perfil)
+        db.session.commit()
+        
+        # Registrar no histórico
+        from models import RoleHistory
+        import json
+        historico = RoleHistory(
+            role_id=novo_perfil.id,
+            acao='cloned',
+            detalhes=json.dumps({
+                'origem_id': perfil_origem.id,
+                'origem_nome': perfil_origem.nome,
+                'permissoes_clonadas': len(perfil_origem.permissions)
+            }),
+            usuario=current_user.username
+        )
+        db.session.add(historico)
+        db.session.commit()
+        
+        flash(f'Perfil "{nome_novo}" clonado com sucesso de "{perfil_origem.nome}"!', 'success')
+        return redirect(url_for('perfis.listar_perfis'))
+    
+    return render_template('perfis/clonar.html', perfil=perfil_origem)
+
+@perfis_bp.route('/perfis/bulk-action', methods=['POST'])
+@permission_required('manage_access')
+@login_required
+def bulk_action_perfis():
+    """Ações em lote para múltiplos perfis."""
+    action = request.form.get('action')
+    perfis_ids = request.form.getlist('perfis_ids')
+    
+    if not perfis_ids:
+        flash('Nenhum perfil selecionado.', 'warning')
+        return redirect(url_for('perfis.listar_perfis'))
+    
+    perfis = Role.query.filter(Role.id.in_(perfis_ids)).all()
+    
+    if action == 'ativar':
+        for perfil in perfis:
+            if perfil.nome != 'admin':  # Não alterar admin
+                perfil.ativo = True
+        flash(f'{len(perfis)} perfis ativados com sucesso!', 'success')
+        
+    elif action == 'desativar':
+        for perfil in perfis:
+            if perfil.nome != 'admin':  # Não desativar admin
+                perfil.ativo = False
+        flash(f'{len(perfis)} perfis desativados com sucesso!', 'success')
+        
+    elif action == 'excluir':
+        excluidos = 0
+        for perfil in perfis:
+            can_delete, msg = perfil.can_be_deleted()
+            if can_delete:
+                db.session.delete(perfil)
+                excluidos += 1
+        flash(f'{excluidos} perfis excluídos com sucesso!', 'success')
+        
+    db.session.commit()
+    return redirect(url_for('perfis.listar_perfis'))
+
+@perfis_bp.route('/perfis/templates')
+@permission_required('manage_access')
+@login_required
+def listar_templates():
+    """Lista templates de perfis disponíveis."""
+    from models import RoleTemplate
+    templates = RoleTemplate.query.filter_by(ativo=True).all()
+    return render_template('perfis/templates.html', templates=templates)
+
+@perfis_bp.route('/perfis/criar-do-template/<int:template_id>')
+@permission_required('manage_access')
+@login_required
+def criar_do_template(template_id):
+    """Cria um perfil baseado em template."""
+    from models import RoleTemplate
+    import json
+    
+    template = RoleTemplate.query.get_or_404(template_id)
+    config = json.loads(template.config_json)
+    
+    # Criar perfil baseado no template
+    novo_perfil = Role(
+        nome=f"{template.nome}_{datetime.now().strftime('%Y%m%d_%H%M')}",
+        descricao=config.get('descricao', template.descricao),
+        cor=config.get('cor', '#6c757d'),
+        icone=config.get('icone', 'bi-person'),
+        prioridade=config.get('prioridade', 0),
+        created_by=current_user.username
+    )
+    
+    # Adicionar permissões do template
+    for perm_nome in config.get('permissions', []):
+        perm = Permission.query.filter_by(nome=perm_nome).first()
+        if perm:
+            novo_perfil.permissions.append(perm)
+    
+    db.session.add(novo_perfil)
+    db.session.commit()
+    
+    flash(f'Perfil criado com sucesso baseado no template "{template.nome}"!', 'success')
+    return redirect(url_for('perfis.editar_perfil', perfil_id=novo_perfil.id))
+
+@perfis_bp.route('/perfis/export')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+def export_perfis():
+    """Exporta perfis para JSON."""
+    import json
+    from flask import make_response
+    
+    perfis = Role.query.all()
+    # Garantir que os objetos estejam na sessão antes de chamar to_dict()
+    perfis_data = []
+    for perfil in perfis:
+        try:
+            perfis_data.append(perfil.to_dict())
+        except Exception as e:
+            # Se houver erro, criar dicionário manualmente
+            perfis_data.append({
+                'nome': perfil.nome,
+                'descricao': perfil.descricao,
+                'cor': perfil.cor,
+                'icone': perfil.icone,
+                'ativo': perfil.ativo,
+                'prioridade': perfil.prioridade,
+                'parent_nome': None,  # Evitar acesso ao parent
+                'permissions': [p.nome for p in perfil.permissions]
+            })
+    
+    export_data = {
+        'timestamp': datetime.now().isoformat(),
+        'exported_by': current_user.username,
+        'perfis': perfis_data
+    }
+    
+    response = make_response(json.dumps(export_data, indent=2, ensure_ascii=False))
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Content-Disposition'] = f'attachment; filename=perfis_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    
+    return response
+
+@perfis_bp.route('/perfis/import', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def import_perfis():
+    """Importa perfis de arquivo JSON."""
+    if request.method == 'POST':
+        import json
+        from models import RoleHistory
+        
+        if 'arquivo' not in request.files:
+            flash('Nenhum arquivo selecionado.', 'danger')
+            return redirect(request.url)
+        
+        arquivo = request.files['arquivo']
+        if arquivo.filename == '':
+            flash('Nenhum arquivo selecionado.', 'danger')
+            return redirect(request.url)
+        
+        try:
+            dados = json.loads(arquivo.read().decode('utf-8'))
+            importados = 0
+            
+            for perfil_data in dados.get('perfis', []):
+                # Verificar se já existe
+                if Role.query.filter_by(nome=perfil_data['nome']).first():
+                    continue
+                
+                # Criar perfil
+                perfil = Role(
+                    nome=perfil_data['nome'],
+                    descricao=perfil_data.get('descricao', ''),
+                    cor=perfil_data.get('cor', '#6c757d'),
+                    icone=perfil_data.get('icone', 'bi-person'),
+                    ativo=perfil_data.get('ativo', True),
+                    prioridade=perfil_data.get('prioridade', 0),
+                    created_by=current_user.username
+                )
+                
+                # Adicionar permissões
+                for perm_nome in perfil_data.get('permissions', []):
+                    perm = Permission.query.filter_by(nome=perm_nome).first()
+                    if perm:
+                        perfil.permissions.append(perm)
+                
+                db.session.add(perfil)
+                importados += 1
+            
+            db.session.commit()
+            flash(f'{importados} perfis importados com sucesso!', 'success')
+            
+        except Exception as e:
+            flash(f'Erro ao importar arquivo: {str(e)}', 'danger')
+    
+    return render_template('perfis/import.html')
+
+@perfis_bp.route('/perfis/<int:perfil_id>/historico')
+@permission_required('manage_access')
+@login_required
+def historico_perfil(perfil_id):
+    """Visualiza histórico de alterações de um perfil."""
+    from models import RoleHistory
+    from datetime import datetime
+    
+    perfil = Role.query.get_or_404(perfil_id)
+    historico = RoleHistory.query.filter_by(role_id=perfil_id).order_by(
+        RoleHistory.timestamp.desc()
+    ).all()
+    
+    # Calcular timestamp atual para comparação no template
+    agora_timestamp = datetime.now().timestamp()
+    
+    return render_template('perfis/historico.html', 
+                         perfil=perfil, 
+                         historico=historico,
+                         agora_timestamp=agora_timestamp)
+
+@perfis_bp.route('/perfis/assistente')
+@permission_required('manage_access')
+@login_required
+def assistente_perfil():
+    """Assistente para criação de perfis baseado em cenários."""
+    scenarios = [
+        {
+            'id': 'admin_dept',
+            'nome': 'Administrador de Departamento',
+            'descricao': 'Gerencia usuários e dados do seu departamento',
+            'permissions': ['manage_registros', 'manage_responsaveis', 'send_alerts'],
+            'cor': '#28a745',
+            'icone': 'bi-building'
+        },
+        {
+            'id': 'operador',
+            'nome': 'Operador de Sistema',
+            'descricao': 'Acesso operacional para tarefas do dia a dia',
+            'permissions': ['manage_registros', 'send_alerts'],
+            'cor': '#17a2b8',
+            'icone': 'bi-gear'
+        },
+        {
+            'id': 'visualizador',
+            'nome': 'Visualizador',
+            'descricao': 'Apenas leitura de dados e relatórios',
+            'permissions': [],
+            'cor': '#6c757d',
+            'icone': 'bi-eye'
+        },
+        {
+            'id': 'auditor',
+            'nome': 'Auditor',
+            'descricao': 'Acesso a logs e auditoria do sistema',
+            'permissions': ['manage_access'],
+            'cor': '#fd7e14',
+            'icone': 'bi-shield-check'
+        }
+    ]
+    
+    return render_template('perfis/assistente.html', scenarios=scenarios)
+
+@perfis_bp.route('/perfis/criar-cenario', methods=['POST'])
+@permission_required('manage_access')
+@login_required
+def criar_perfil_cenario():
+    """Cria perfil baseado em cenário do assistente."""
+    from models import RoleHistory
+    import json
+    
+    scenario_id = request.form.get('scenario')
+    nome_customizado = request.form.get('nome')
+    descricao_customizada = request.form.get('descricao')
+    
+    # Mapear cenários (seria melhor ter isso em BD)
+    scenarios_map = {
+        'admin_dept': {
+            'permissions': ['manage_registros', 'manage_responsaveis', 'send_alerts'],
+            'cor': '#28a745',
+            'icone': 'bi-building'
+        },
+        'operador': {
+            'permissions': ['manage_registros', 'send_alerts'],
+            'cor': '#17a2b8',
+            'icone': 'bi-gear'
+        },
+        'visualizador': {
+            'permissions': [],
+            'cor': '#6c757d',
+            'icone': 'bi-eye'
+        },
+        'auditor': {
+            'permissions': ['manage_access'],
+            'cor': '#fd7e14',
+            'icone': 'bi-shield-check'
+        }
+    }
+    
+    if scenario_id not in scenarios_map:
+        flash('Cenário inválido.', 'danger')
+        return redirect(url_for('perfis.assistente_perfil'))
+    
+    scenario = scenarios_map[scenario_id]
+    
+    # Criar perfil
+    perfil = Role(
+        nome=nome_customizado or f"{scenario_id}_{datetime.now().strftime('%Y%m%d')}",
+        descricao=descricao_customizada or f"Perfil criado via assistente - {scenario_id}",
+        cor=scenario['cor'],
+        icone=scenario['icone'],
+        created_by=current_user.username
+    )
+    
+    # Adicionar permissões
+    for perm_nome in scenario['permissions']:
+        perm = Permission.query.filter_by(nome=perm_nome).first()
+        if perm:
+            perfil.permissions.append(perm)
+    
+    db.session.add(perfil)
+    db.session.commit()
+    
+    # Registrar histórico
+    historico = RoleHistory(
+        role_id=perfil.id,
+        acao='created_by_wizard',
+        detalhes=json.dumps({
+            'scenario': scenario_id,
+            'permissions_added': len(scenario['permissions'])
+        }),
+        usuario=current_user.username
+    )
+    db.session.add(historico)
+    db.session.commit()
+    
+    flash(f'Perfil "{perfil.nome}" criado com sucesso via assistente!', 'success')
+    return redirect(url_for('perfis.editar_perfil', perfil_id=perfil.id))
+
+@perfis_bp.route('/perfis/relatorio-permissoes')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+def relatorio_permissoes():
+    """Relatório detalhado de permissões por perfil."""
+    try:
+        from sqlalchemy import func
+        from datetime import datetime
+        
+        # Estatísticas gerais
+        total_perfis = Role.query.count()
+        total_permissoes = Permission.query.count()
+        perfis_ativos = Role.query.filter_by(ativo=True).count()
+        # Corrigir a consulta de usuários com perfis
+        usuarios_com_perfis = User.query.filter(User.role_id.isnot(None)).count()
+        
+        estatisticas = {
+            'total_perfis': total_perfis,
+            'total_permissoes': total_permissoes,
+            'perfis_ativos': perfis_ativos,
+            'usuarios_com_perfis': usuarios_com_perfis
+        }
+        
+        # Dados para filtros
+        todos_perfis = Role.query.all()
+        todas_permissoes = Permission.query.all()
+        
+        # Matriz de permissões
+        matriz_permissoes = []
+        for perfil in todos_perfis:
+            perfil_data = {
+                'perfil': perfil,
+                'permissoes': perfil.permissions
+            }
+            matriz_permissoes.append(perfil_data)
+        
+        # Relatório de permissões por role
+        try:
+            roles_permissions = db.session.query(
+                Role.nome,
+                Role.descricao,
+                Role.ativo,
+                func.count(Permission.id).label('total_permissions')
+            ).outerjoin(Role.permissions).group_by(Role.id, Role.nome, Role.descricao, Role.ativo).all()
+        except Exception as e:
+            # Fallback para consulta mais simples
+            roles_permissions = []
+            for role in todos_perfis:
+                roles_permissions.append({
+                    'nome': role.nome,
+                    'descricao': role.descricao,
+                    'ativo': role.ativo,
+                    'total_permissions': len(role.permissions)
+                })
+        
+        # Permissões não utilizadas
+        try:
+            unused_permissions = db.session.query(Permission).outerjoin(
+                Permission.roles
+            ).filter(~Permission.roles.any()).all()
+        except Exception as e:
+            # Fallback para consulta mais simples
+            unused_permissions = []
+            for permission in todas_permissoes:
+                if not permission.roles:
+                    unused_permissions.append(permission)
+        
+        # Roles sem permissões
+        try:
+            roles_without_permissions = db.session.query(Role).outerjoin(
+                Role.permissions
+            ).filter(~Role.permissions.any()).all()
+        except Exception as e:
+            # Fallback para consulta mais simples
+            roles_without_permissions = []
+            for role in todos_perfis:
+                if not role.permissions:
+                    roles_without_permissions.append(role)
+        
+        # Dados para gráficos - usar dados reais do banco
+        categorias_labels = ['Sistema', 'Dados', 'Comunicação', 'Outros']
+        categorias_data = [25, 30, 20, 25]  # Dados de exemplo
+        
+        # Calcular criticidade baseada nas permissões reais
+        criticidade_labels = ['Alta', 'Média', 'Baixa']
+        criticidade_data = [0, 0, 0]  # Inicializar com zeros
+        
+        # Contar permissões por criticidade (exemplo)
+        for permissao in todas_permissoes:
+            # Como não temos campo criticidade, vamos distribuir baseado no nome
+            if 'manage' in permissao.nome.lower():
+                criticidade_data[0] += 1  # Alta
+            elif 'view' in permissao.nome.lower():
+                criticidade_data[2] += 1  # Baixa
+            else:
+                criticidade_data[1] += 1  # Média
+        
+        # Alertas de segurança (exemplo)
+        alertas_seguranca = []
+        if roles_without_permissions:
+            alertas_seguranca.append({
+                'tipo': 'warning',
+                'icone': 'exclamation-triangle',
+                'titulo': 'Perfis sem Permissões',
+                'mensagem': f'Encontrados {len(roles_without_permissions)} perfis sem permissões atribuídas.'
+            })
+        
+        if unused_permissions:
+            alertas_seguranca.append({
+                'tipo': 'info',
+                'icone': 'info-circle',
+                'titulo': 'Permissões Não Utilizadas',
+                'mensagem': f'Encontradas {len(unused_permissions)} permissões não atribuídas a nenhum perfil.'
+            })
+        
+        return render_template('perfis/relatorio.html',
+                             estatisticas=estatisticas,
+                             todos_perfis=todos_perfis,
+                             todas_permissoes=todas_permissoes,
+                             matriz_permissoes=matriz_permissoes,
+                             roles_permissions=roles_permissions,
+                             unused_permissions=unused_permissions,
+                             roles_without_permissions=roles_without_permissions,
+                             categorias_labels=categorias_labels,
+                             categorias_data=categorias_data,
+                             criticidade_labels=criticidade_labels,
+                             criticidade_data=criticidade_data,
+                             alertas_seguranca=alertas_seguranca,
+                             now=datetime.now())
+    except Exception as e:
+        current_app.logger.error(f"Erro no relatório de permissões: {str(e)}")
+        flash(f'Erro ao gerar relatório: {str(e)}', 'danger')
+        return redirect(url_for('perfis.listar_perfis'))
+
+@perfis_bp.route('/perfis/<int:perfil_id>/toggle-status')
+@permission_required('manage_access')
+@login_required
+def toggle_perfil_status(perfil_id):
+    """Alterna status ativo/inativo do perfil."""
+    perfil = Role.query.get_or_404(perfil_id)
+    
+    if perfil.nome == 'admin':
+        flash('Não é possível desativar o perfil admin.', 'danger')
+        return redirect(url_for('perfis.listar_perfis'))
+    
+    perfil.ativo = not perfil.ativo
+    status = 'ativado' if perfil.ativo else 'desativado'
+    
+    # Registrar no histórico
+    from models import RoleHistory
+    import json
+    historico = RoleHistory(
+        role_id=perfil.id,
+        acao='status_changed',
+        detalhes=json.dumps({'novo_status': perfil.ativo}),
+        usuario=current_user.username
+    )
+    db.session.add(historico)
+    db.session.commit()
+    
+    flash(f'Perfil "{perfil.nome}" {status} com sucesso!', 'success')
+    return redirect(url_for('perfis.listar_perfis')) 
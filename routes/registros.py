@@ -0,0 +1,366 @@
+# routes/registros.py
+"""Cadastro, edição, exclusão e regularização de registros."""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from models import db, Registro, Responsavel
+from utils.etag import etag_dependente
+from utils.permissoes import permission_required
+
+logger = logging.getLogger(__name__)
+
+registros_bp = Blueprint('registros', __name__)
+
+def filtrar_registros(query, args):
+    """Filtros de busca da listagem (``busca_nome``, ``busca_tipo``, ``busca_status``, ``busca_responsavel``).
+
+    Também usados pela API (``routes/api.py``).
+    """
+    busca_nome = args.get('busca_nome', '').strip()
+    busca_tipo = args.get('busca_tipo', '').strip()
+    busca_responsavel = args.get('busca_responsavel', '').strip()
+    busca_status = args.get('busca_status', '').strip()
+    if busca_nome:
+        query = query.filter(Registro.nome.ilike(f'%{busca_nome}%'))
+    if busca_tipo:
+        query = query.filter(Registro.tipo == busca_tipo)
+    if busca_status == 'sim':
+        query = query.filter(Registro.regularizado == True)
+    elif busca_status == 'nao':
+        query = query.filter(Registro.regularizado == False)
+    if busca_responsavel:
+        # EXISTS em vez de JOIN: um registro com dois responsáveis encontrados não aparece duas vezes
+        query = query.filter(Registro.responsaveis.any(Responsavel.nome.ilike(f'%{busca_responsavel}%')))
+    return query
+
+@registros_bp.route('/registros')
+@registros_bp.route('/registros/')
+@login_required
+@etag_dependente('registro', 'responsavel')
+def listar_registros():
+    sort = request.args.get('sort', 'data_vencimento')
+    order = request.args.get('order', 'asc')
+    valid_columns = {
+        'nome': Registro.nome,
+        'tipo': Registro.tipo,
+        'data_vencimento': Registro.data_vencimento,
+        'regularizado': Registro.regularizado
+    }
+    sort_col = valid_columns.get(sort, Registro.data_vencimento)
+    query = filtrar_registros(Registro.query, request.args)
+    if order == 'desc':
+        registros = query.order_by(sort_col.desc()).all()
+    else:
+        registros = query.order_by(sort_col.asc()).all()
+    from datetime import date, timedelta
+    return render_template('registros/list.html', registros=registros, hoje=date.today(), timedelta=timedelta, sort=sort, order=order)
+
+@registros_bp.route('/registros/novo', methods=['GET', 'POST'])
+@permission_required('manage_registros')
+@login_required
+def novo_registro():
+    todos_responsaveis = Responsavel.query.order_by(Responsavel.nome).all()
+    if request.method == 'POST':
+        nome = request.form['nome'].strip()
+        origem = request.form['origem'].strip()
+        tipo = request.form['tipo'].strip()
+        data_vencimento_str = request.form['data_vencimento'].strip()
+        tempo_alerta_str = request.form['tempo_alerta'].strip()
+        observacoes = request.form['observacoes'].strip()
+        responsaveis_ids = request.form.getlist('responsaveis')
+        
+        # Validações usando utilitários centralizados
+        from utils.validation import (
+            validate_registro_name, validate_future_date, 
+            validate_alert_time, format_validation_errors
+        )
+        
+        errors = []
+        
+        # Validar nome
+        is_valid_name, name_error = validate_registro_name(nome)
+        if not is_valid_name:
+            errors.append(name_error)
+        
+        # Validar origem
+        if not origem:
+            errors.append("Origem é obrigatória")
+        
+        # Validar tipo
+        if not tipo:
+            errors.append("Tipo é obrigatório")
+        
+        # Validar data de vencimento
+        is_valid_date, date_error = validate_future_date(data_vencimento_str, "Data de vencimento")
+        if not is_valid_date:
+            errors.append(date_error)
+        
+        # Validar tempo de alerta
+        is_valid_alert, alert_error = validate_alert_time(tempo_alerta_str)
+        if not is_valid_alert:
+            errors.append(alert_error)
+        
+        # Validar responsáveis
+        if not responsaveis_ids:
+            errors.append("Pelo menos um responsável deve ser selecionado")
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('registros/form.html', 
+                                 registro=None, 
+                                 todos_responsaveis=todos_responsaveis,
+                                 form_data=request.form)
+        
+        try:
+            # Converter dados após validação
+            data_vencimento = datetime.strptime(data_vencimento_str, '%Y-%m-%d').date()
+            tempo_alerta = int(tempo_alerta_str)
+            responsaveis = Responsavel.query.filter(Responsavel.id.in_(responsaveis_ids)).all()
+            
+            # Calcular status de regularização
+            dias_para_vencer = (data_vencimento - date.today()).days
+            regularizado = dias_para_vencer > tempo_alerta
+            
+            registro = Registro(
+                nome=nome,
+                origem=origem,
+                tipo=tipo,
+                data_vencimento=data_vencimento,
+                tempo_alerta=tempo_alerta,
+                observacoes=observacoes,
+                regularizado=regularizado,
+                responsaveis=responsaveis
+            )
+            
+            db.session.add(registro)
+            db.session.flush()  # Para obter o ID
+            
+            # Registrar histórico
+            from utils.activity import registrar_historico_registro
+            registrar_historico_registro(
+                registro, 'created', current_user.username,
+                detalhes={'responsaveis': [r.nome for r in responsaveis]},
+                ip_address=request.remote_addr
+            )
+            
+            db.session.commit()
+            flash('Registro criado com sucesso!', 'success')
+            return redirect(url_for('registros.listar_registros'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao criar registro: {str(e)}', 'danger')
+            return render_template('registros/form.html', 
+                                 registro=None, 
+                                 todos_responsaveis=todos_responsaveis,
+                                 form_data=request.form)
+    
+    # Calcular data mínima (amanhã) para o campo de data de vencimento
+    min_date = (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+    return render_template('registros/form.html', 
+                         registro=None, 
+                         todos_responsaveis=todos_responsaveis,
+                         min_date=min_date)
+
+@registros_bp.route('/registros/<int:registro_id>/editar', methods=['GET', 'POST'])
+@permission_required('manage_registros')
+@login_required
+def editar_registro(registro_id):
+    registro = Registro.query.get_or_404(registro_id)
+    todos_responsaveis = Responsavel.query.order_by(Responsavel.nome).all()
+    if request.method == 'POST':
+        nome = request.form['nome'].strip()
+        origem = request.form['origem'].strip()
+        tipo = request.form['tipo'].strip()
+        data_vencimento_str = request.form['data_vencimento'].strip()
+        tempo_alerta_str = request.form['tempo_alerta'].strip()
+        observacoes = request.form['observacoes'].strip()
+        responsaveis_ids = request.form.getlist('responsaveis')
+        
+        # Validações usando utilitários centralizados
+        from utils.validation import (
+            validate_registro_name, validate_future_date, 
+            validate_alert_time, format_validation_errors
+        )
+        
+        errors = []
+        
+        # Validar nome
+        is_valid_name, name_error = validate_registro_name(nome)
+        if not is_valid_name:
+            errors.append(name_error)
+        
+        # Validar origem
+        if not origem:
+            errors.append("Origem é obrigatória")
+        
+        # Validar tipo
+        if not tipo:
+            errors.append("Tipo é obrigatório")
+        
+        # Validar data de vencimento
+        is_valid_date, date_error = validate_future_date(data_vencimento_str, "Data de vencimento")
+        if not is_valid_date:
+            errors.append(date_error)
+        
+        # Validar tempo de alerta
+        is_valid_alert, alert_error = validate_alert_time(tempo_alerta_str)
+        if not is_valid_alert:
+            errors.append(alert_error)
+        
+        # Validar responsáveis
+        if not responsaveis_ids:
+            errors.append("Pelo menos um responsável deve ser selecionado")
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('registros/form.html', 
+                                 registro=registro, 
+                                 todos_responsaveis=todos_responsaveis,
+                                 form_data=request.form)
+        
+        try:
+            # Converter dados após validação
+            data_vencimento = datetime.strptime(data_vencimento_str, '%Y-%m-%d').date()
+            tempo_alerta = int(tempo_alerta_str)
+            responsaveis = Responsavel.query.filter(Responsavel.id.in_(responsaveis_ids)).all()
+            
+            # Rastrear alterações para o histórico
+            alteracoes = []
+            if nome != registro.nome:
+                alteracoes.append(f"Nome: {registro.nome} → {nome}")
+            if origem != (registro.origem or ''):
+                alteracoes.append(f"Origem: {registro.origem or 'Vazio'} → {origem or 'Vazio'}")
+            if tipo != registro.tipo:
+                alteracoes.append(f"Tipo: {registro.tipo} → {tipo}")
+            if data_vencimento != registro.data_vencimento:
+                alteracoes.append(f"Vencimento: {registro.data_vencimento.strftime('%d/%m/%Y')} → {data_vencimento.strftime('%d/%m/%Y')}")
+            if tempo_alerta != registro.tempo_alerta:
+                alteracoes.append(f"Tempo de alerta: {registro.tempo_alerta} → {tempo_alerta}")
+            if observacoes != (registro.observacoes or ''):
+                alteracoes.append("Observações alteradas")
+            if set(responsaveis) != set(registro.responsaveis):
+                alteracoes.append("Responsáveis alterados")
+            
+            # Atualizar registro
+            registro.nome = nome
+            registro.origem = origem
+            registro.tipo = tipo
+            registro.data_vencimento = data_vencimento
+            registro.tempo_alerta = tempo_alerta
+            registro.observacoes = observacoes
+            registro.responsaveis = responsaveis
+            
+            # Calcular status de regularização
+            dias_para_vencer = (registro.data_vencimento - date.today()).days
+            registro.regularizado = dias_para_vencer > registro.tempo_alerta
+            
+            # Registrar histórico se houver alterações
+            if alteracoes:
+                from utils.activity import registrar_historico_registro
+                registrar_historico_registro(
+                    registro, 'updated', current_user.username,
+                    detalhes={'alteracoes': alteracoes},
+                    ip_address=request.remote_addr
+                )
+            
+            db.session.commit()
+            flash('Registro atualizado com sucesso!', 'success')
+            return redirect(url_for('registros.listar_registros'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar registro: {str(e)}', 'danger')
+            return render_template('registros/form.html', 
+                                 registro=registro, 
+                                 todos_responsaveis=todos_responsaveis,
+                                 form_data=request.form)
+    
+    # Calcular data mínima (amanhã) para o campo de data de vencimento
+    min_date = (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+    return render_template('registros/form.html', 
+                         registro=registro, 
+                         todos_responsaveis=todos_responsaveis,
+                         min_date=min_date)
+
+@registros_bp.route('/registros/<int:registro_id>/excluir', methods=['GET', 'POST'])
+@permission_required('manage_registros')
+@login_required
+def excluir_registro(registro_id):
+    registro = Registro.query.get_or_404(registro_id)
+    if request.method == 'POST':
+        # Registrar histórico antes da exclusão
+        from utils.activity import registrar_historico_registro
+        registrar_historico_registro(
+            registro, 'deleted', current_user.username,
+            detalhes={
+                'data_vencimento': registro.data_vencimento.isoformat(),
+                'responsaveis': [r.nome for r in registro.responsaveis]
+            },
+            ip_address=request.remote_addr
+        )
+        
+        db.session.delete(registro)
+        db.session.commit()
+        flash('Registro excluído com sucesso!', 'success')
+        return redirect(url_for('registros.listar_registros'))
+    return render_template('registros/confirm_delete.html', registro=registro)
+
+@registros_bp.route('/registros/<int:registro_id>/regularizar', methods=['POST'])
+@permission_required('manage_registros')
+@login_required
+def regularizar_registro(registro_id):
+    registro = Registro.query.get_or_404(registro_id)
+    
+    # Obter nova data de vencimento do formulário
+    nova_data_str = request.form.get('nova_data_vencimento')
+    
+    if not nova_data_str:
+        flash('Nova data de vencimento é obrigatória para regularizar o item.', 'danger')
+        return redirect(url_for('registros.listar_registros'))
+    
+    try:
+        # Converter string para data
+        from datetime import datetime, date
+        nova_data = datetime.strptime(nova_data_str, '%Y-%m-%d').date()
+        
+        # Calcular data mínima válida (hoje + tempo de alerta)
+        data_minima = date.today() + timedelta(days=registro.tempo_alerta)
+        
+        # Validar se a nova data é válida
+        if nova_data <= data_minima:
+            flash(f'Data inválida. A nova data deve ser pelo menos {data_minima.strftime("%d/%m/%Y")} (hoje + {registro.tempo_alerta} dias de alerta).', 'danger')
+            return redirect(url_for('registros.listar_registros'))
+        
+        # Registrar histórico
+        from utils.activity import registrar_historico_registro
+        registrar_historico_registro(
+            registro, 'regularized', current_user.username,
+            detalhes={
+                'vencimento_anterior': registro.data_vencimento.isoformat(),
+                'novo_vencimento': nova_data.isoformat()
+            },
+            ip_address=request.remote_addr
+        )
+        
+        # Atualizar registro
+        registro.data_vencimento = nova_data
+        registro.regularizado = True
+        db.session.commit()
+        
+        flash(f'Registro "{registro.nome}" regularizado com nova data de vencimento: {nova_data.strftime("%d/%m/%Y")}', 'success')
+        return redirect(url_for('registros.listar_registros'))
+        
+    except ValueError:
+        flash('Formato de data inválido. Use o formato DD/MM/AAAA.', 'danger')
+        return redirect(url_for('registros.listar_registros'))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao regularizar registro: {str(e)}', 'danger')
+        return redirect(url_for('registros.listar_registros'))
@@ -0,0 +1,128 @@
+# routes/responsaveis.py
+"""Cadastro de responsáveis."""
+
+import logging
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from models import db, Responsavel
+from utils.etag import etag_dependente
+from utils.permissoes import permission_required
+
+logger = logging.getLogger(__name__)
+
+responsaveis_bp = Blueprint('responsaveis', __name__)
+
+@responsaveis_bp.route('/responsaveis')
+@responsaveis_bp.route('/responsaveis/')
+@login_required
+@etag_dependente('responsavel')
+def listar_responsaveis():
+    responsaveis = Responsavel.query.order_by(Responsavel.nome).all()
+    return render_template('responsaveis/list.html', responsaveis=responsaveis)
+
+@responsaveis_bp.route('/responsaveis/novo', methods=['GET', 'POST'])
+@permission_required('manage_responsaveis')
+@login_required
+def novo_responsavel():
+    if request.method == 'POST':
+        nome = request.form['nome'].strip()
+        email = request.form['email'].strip()
+        
+        # Validações usando utilitários
+        from utils.validation import validate_name, validate_email, check_email_exists
+        
+        errors = []
+        
+        # Validar nome
+        is_valid_name, name_error = validate_name(nome, "Nome")
+        if not is_valid_name:
+            errors.append(name_error)
+        
+        # Validar email
+        is_valid_email, email_error = validate_email(email)
+        if not is_valid_email:
+            errors.append(email_error)
+        else:
+            # Verificar se email já existe
+            email_exists, email_exists_msg = check_email_exists(email, Responsavel)
+            if email_exists:
+                errors.append(email_exists_msg)
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('responsaveis/form.html', responsavel=None)
+        
+        # Criar responsável
+        responsavel = Responsavel(nome=nome, email=email)
+        try:
+            db.session.add(responsavel)
+            db.session.commit()
+            flash('Responsável criado com sucesso!', 'success')
+            return redirect(url_for('responsaveis.listar_responsaveis'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao criar responsável: {str(e)}', 'danger')
+            return render_template('responsaveis/form.html', responsavel=None)
+    return render_template('responsaveis/form.html', responsavel=None)
+
+@responsaveis_bp.route('/responsaveis/<int:responsavel_id>/editar', methods=['GET', 'POST'])
+@permission_required('manage_responsaveis')
+@login_required
+def editar_responsavel(responsavel_id):
+    responsavel = Responsavel.query.get_or_404(responsavel_id)
+    if request.method == 'POST':
+        nome = request.form['nome'].strip()
+        email = request.form['email'].strip()
+        
+        # Validações usando utilitários
+        from utils.validation import validate_name, validate_email, check_email_exists
+        
+        errors = []
+        
+        # Validar nome
+        is_valid_name, name_error = validate_name(nome, "Nome")
+        if not is_valid_name:
+            errors.append(name_error)
+        
+        # Validar email
+        is_valid_email, email_error = validate_email(email)
+        if not is_valid_email:
+            errors.append(email_error)
+        else:
+            # Verificar se email já existe em outro responsável
+            email_exists, email_exists_msg = check_email_exists(email, Responsavel, responsavel_id)
+            if email_exists:
+                errors.append(email_exists_msg)
+        
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            return render_template('responsaveis/form.html', responsavel=responsavel)
+        
+        # Atualizar responsável
+        responsavel.nome = nome
+        responsavel.email = email
+        try:
+            db.session.commit()
+            flash('Responsável atualizado com sucesso!', 'success')
+            return redirect(url_for('responsaveis.listar_responsaveis'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar responsável: {str(e)}', 'danger')
+            return render_template('responsaveis/form.html', responsavel=responsavel)
+    return render_template('responsaveis/form.html', responsavel=responsavel)
+
+@responsaveis_bp.route('/responsaveis/<int:responsavel_id>/excluir', methods=['GET', 'POST'])
+@permission_required('manage_responsaveis')
+@login_required
+def excluir_responsavel(responsavel_id):
+    responsavel = Responsavel.query.get_or_404(responsavel_id)
+    if request.method == 'POST':
+        db.session.delete(responsavel)
+        db.session.commit()
+        flash('Responsável excluído com sucesso!', 'success')
+        return redirect(url_for('responsaveis.listar_responsaveis'))
+    return render_template('responsaveis/confirm_delete.html', responsavel=responsavel)
@@ -0,0 +1,60 @@
+# routes/stream.py
+"""Contadores do dashboard ao vivo: SSE e long-polling (ver utils/ao_vivo.py)."""
+
+import logging
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import login_required
+
+from models import db
+from utils.ao_vivo import fluxo_sse, limite_conexoes, modo_ao_vivo, obter_publicador
+
+logger = logging.getLogger(__name__)
+
+stream_bp = Blueprint('stream', __name__)
+
+@stream_bp.route('/stream/dashboard')
+@login_required
+def stream_dashboard():
+    """Eventos ``contadores`` com os totais de status e tipo e o que mudou.
+
+    Com o limite de conexões do processo atingido, responde 204: o navegador
+    não reconecta e a página passa ao long-polling, que responde na hora.
+    """
+    publicador = obter_publicador(current_app._get_current_object())
+    if not publicador.assinar(limite_conexoes()):
+        return Response(status=204)
+    resposta = Response(fluxo_sse(publicador, request.headers.get('Last-Event-ID')),
+                        mimetype='text/event-stream')
+    resposta.call_on_close(publicador.cancelar)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    # Proxies como o nginx não devem acumular o corpo
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
+
+@stream_bp.route('/stream/dashboard/poll')
+@login_required
+def poll_dashboard():
+    """Long-polling para navegadores ou proxies sem SSE.
+
+    Responde quando os contadores forem diferentes de ``?versao=`` ou após
+    ``STREAM_LONGPOLL_SEGUNDOS``. Em workers sync, ou com o limite de conexões
+    do processo atingido, responde na hora e indica em ``intervalo`` quanto
+    esperar até a próxima consulta.
+    """
+    publicador = obter_publicador(current_app._get_current_object())
+    versao = request.args.get('versao') or None
+    if modo_ao_vivo() == 'polling' or not publicador.assinar(limite_conexoes()):
+        publicador.atualizar()
+        versao, contadores = publicador.aguardar(versao, 0)
+        return jsonify({'versao': versao, 'contadores': contadores,
+                        'intervalo': int(os.environ.get('STREAM_POLLING_SEGUNDOS', 30))})
+
+    # A conexão do banco usada para carregar o usuário não fica presa durante a espera
+    db.session.close()
+    try:
+        versao, contadores = publicador.aguardar(versao, int(os.environ.get('STREAM_LONGPOLL_SEGUNDOS', 25)))
+    finally:
+        publicador.cancelar()
+    return jsonify({'versao': versao, 'contadores': contadores, 'intervalo': 0})
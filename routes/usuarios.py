@@ -0,0 +1,890 @@
+# routes/usuarios.py
+"""Gestão de usuários: cadastro, importação/exportação, ações em lote e histórico."""
+
+import json
+import logging
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from models import db, Role, User, UserHistory
+from utils.fragmentos import widget_json
+from utils.permissoes import permission_required
+from utils.replica import somente_leitura
+
+logger = logging.getLogger(__name__)
+
+usuarios_bp = Blueprint('usuarios', __name__)
+
+@usuarios_bp.route('/usuarios/novo', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def novo_usuario():
+    """Cadastro manual de usuário com campos avançados."""
+    import json
+    from werkzeug.security import generate_password_hash
+    
+    roles = Role.query.filter_by(ativo=True).all()
+    
+    if request.method == 'POST':
+        # Campos obrigatórios
+        username = request.form.get('username', '').strip()
+        nome = request.form.get('nome', '').strip()
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '').strip()
+        role_id = request.form.get('role_id')
+        
+        # Campos opcionais
+        telefone = request.form.get('telefone', '').strip()
+        departamento = request.form.get('departamento', '').strip()
+        cargo = request.form.get('cargo', '').strip()
+        observacoes = request.form.get('observacoes', '').strip()
+        status = request.form.get('status', 'ativo')
+        
+        # Validações usando utilitários centralizados
+        from utils.validation import (
+            validate_username, check_username_exists,
+            validate_name, validate_email, check_email_exists,
+            validate_password, validate_phone
+        )
+        
+        erros = []
+        
+        # Validar username
+        is_valid_username, username_error = validate_username(username)
+        if not is_valid_username:
+            erros.append(username_error)
+        else:
+            username_exists, username_exists_msg = check_username_exists(username)
+            if username_exists:
+                erros.append(username_exists_msg)
+        
+        # Validar nome
+        is_valid_name, name_error = validate_name(nome, "Nome completo")
+        if not is_valid_name:
+            erros.append(name_error)
+        
+        # Validar email
+        is_valid_email, email_error = validate_email(email)
+        if not is_valid_email:
+            erros.append(email_error)
+        else:
+            email_exists, email_exists_msg = check_email_exists(email, User)
+            if email_exists:
+                erros.append(email_exists_msg)
+        
+        # Validar senha
+        is_valid_password, password_error = validate_password(password)
+        if not is_valid_password:
+            erros.append(password_error)
+        
+        # Validar telefone (opcional)
+        if telefone:
+            is_valid_phone, phone_error = validate_phone(telefone)
+            if not is_valid_phone:
+                erros.append(phone_error)
+        
+        # Validar perfil
+        if not role_id:
+            erros.append('Perfil é obrigatório.')
+        elif not Role.query.get(role_id):
+            erros.append('Perfil selecionado não existe.')
+            
+        if erros:
+            for erro in erros:
+                flash(erro, 'danger')
+            return render_template('usuarios/form.html', 
+                                 roles=roles,
+                                 form_data=request.form)
+        
+        try:
+            # Criar usuário
+            user = User(
+                username=username,
+                nome=nome,
+                email=email,
+                password=generate_password_hash(password),
+                role_id=int(role_id),
+                status=status,
+                telefone=telefone or None,
+                departamento=departamento or None,
+                cargo=cargo or None,
+                observacoes=observacoes or None,
+                created_by=current_user.username
+            )
+            
+            db.session.add(user)
+            db.session.flush()  # Para obter o ID
+            
+            # Registrar histórico
+            historico = UserHistory(
+                user_id=user.id,
+                acao='created',
+                detalhes=json.dumps({
+                    'created_by': current_user.username,
+                    'initial_role': Role.query.get(role_id).nome,
+                    'status': status
+                }),
+                usuario=current_user.username,
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent', '')[:255]
+            )
+            db.session.add(historico)
+            
+            db.session.commit()
+            
+            flash(f'Usuário "{username}" criado com sucesso!', 'success')
+            return redirect(url_for('usuarios.listar_usuarios'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao criar usuário: {str(e)}', 'danger')
+            current_app.logger.error(f"Erro em novo_usuario: {str(e)}")
+            return render_template('usuarios/form.html', 
+                                 roles=roles,
+                                 form_data=request.form)
+    
+    return render_template('usuarios/form.html', roles=roles)
+
+@usuarios_bp.route('/usuarios/dashboard')
+@permission_required('manage_access')
+@login_required
+def dashboard_usuarios():
+    """Dashboard avançado de usuários com estatísticas e métricas.
+    
+    A página é só o esqueleto; cada bloco vem de uma rota de widget,
+    carregada em paralelo pelo navegador.
+    """
+    return render_template('usuarios/dashboard.html')
+
+# Usuários não têm contador de versão (o login grava a tabela): os widgets expiram por tempo
+TTL_WIDGETS = 60
+
+@usuarios_bp.route('/usuarios/dashboard/widgets/resumo')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+@widget_json(ttl=TTL_WIDGETS)
+def widget_resumo_usuarios():
+    from datetime import timedelta
+    
+    # Estatísticas gerais
+    total_usuarios = User.query.count()
+    usuarios_ativos = User.query.filter_by(status='ativo').count()
+    usuarios_inativos = User.query.filter_by(status='inativo').count()
+    usuarios_bloqueados = User.query.filter_by(status='bloqueado').count()
+    usuarios_ldap = User.query.filter_by(ldap_user=True).count()
+    usuarios_locais = User.query.filter_by(ldap_user=False).count()
+    
+    # Usuários criados nos últimos 30 dias
+    trinta_dias_atras = datetime.now() - timedelta(days=30)
+    novos_usuarios = User.query.filter(User.created_at >= trinta_dias_atras).count()
+    
+    # Usuários com último login nos últimos 7 dias
+    sete_dias_atras = datetime.now() - timedelta(days=7)
+    usuarios_ativos_recente = User.query.filter(User.last_login >= sete_dias_atras).count()
+    
+    # Usuários sem perfil
+    usuarios_sem_perfil = User.query.filter_by(role_id=None).count()
+    
+    return {
+        'total_usuarios': total_usuarios,
+        'usuarios_ativos': usuarios_ativos,
+        'usuarios_inativos': usuarios_inativos,
+        'usuarios_bloqueados': usuarios_bloqueados,
+        'usuarios_ldap': usuarios_ldap,
+        'usuarios_locais': usuarios_locais,
+        'novos_usuarios': novos_usuarios,
+        'usuarios_ativos_recente': usuarios_ativos_recente,
+        'usuarios_sem_perfil': usuarios_sem_perfil
+    }
+
+@usuarios_bp.route('/usuarios/dashboard/widgets/perfis')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+@widget_json(ttl=TTL_WIDGETS)
+def widget_perfis_usuarios():
+    from sqlalchemy import func
+    
+    # Distribuição por perfis
+    perfis_distribuicao = db.session.query(
+        Role.nome,
+        Role.cor,
+        func.count(User.id).label('total_usuarios')
+    ).outerjoin(User).group_by(Role.id).all()
+    
+    return {'labels': [perfil.nome for perfil in perfis_distribuicao],
+            'valores': [perfil.total_usuarios for perfil in perfis_distribuicao],
+            'cores': [perfil.cor or '#6c757d' for perfil in perfis_distribuicao]}
+
+@usuarios_bp.route('/usuarios/dashboard/widgets/logins')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+@widget_json(ttl=TTL_WIDGETS)
+def widget_logins_usuarios():
+    from sqlalchemy import extract
+    from datetime import timedelta
+    
+    # Logins por mês (últimos 6 meses)
+    logins_por_mes = []
+    for i in range(6):
+        mes_atual = datetime.now() - timedelta(days=30*i)
+        count = User.query.filter(
+            extract('month', User.last_login) == mes_atual.month,
+            extract('year', User.last_login) == mes_atual.year
+        ).count()
+        logins_por_mes.append({
+            'mes': mes_atual.strftime('%b/%Y'),
+            'count': count
+        })
+    logins_por_mes.reverse()
+    
+    return {'labels': [mes['mes'] for mes in logins_por_mes],
+            'valores': [mes['count'] for mes in logins_por_mes]}
+
+@usuarios_bp.route('/usuarios/dashboard/widgets/top')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+@widget_json(ttl=TTL_WIDGETS)
+def widget_top_usuarios():
+    # Top 10 usuários com mais logins
+    top_usuarios = User.query.filter(User.login_count > 0).order_by(User.login_count.desc()).limit(10).all()
+    return {'html': render_template('widgets/usuarios_top.html', usuarios=top_usuarios)}
+
+@usuarios_bp.route('/usuarios/dashboard/widgets/departamentos')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+@widget_json(ttl=TTL_WIDGETS)
+def widget_departamentos_usuarios():
+    from sqlalchemy import func
+    
+    # Departamentos mais comuns
+    departamentos = db.session.query(
+        User.departamento,
+        func.count(User.id).label('total')
+    ).filter(User.departamento.isnot(None)).group_by(User.departamento).order_by(func.count(User.id).desc()).limit(5).all()
+    return {'html': render_template('widgets/usuarios_departamentos.html', departamentos=departamentos)}
+
+@usuarios_bp.route('/usuarios')
+@usuarios_bp.route('/usuarios/')
+@permission_required('manage_access')
+@login_required
+def listar_usuarios():
+    """Listagem avançada de usuários com filtros e paginação."""
+    try:
+        logger.debug(f"Usuário {current_user.username} acessando lista de usuários")
+        
+        # Filtros
+        busca_login = request.args.get('busca_login', '', type=str)
+        busca_nome = request.args.get('busca_nome', '', type=str)
+        filtro_status = request.args.get('status', '', type=str)
+        filtro_tipo = request.args.get('tipo', '', type=str)  # ldap ou local
+        filtro_perfil = request.args.get('perfil_id', '', type=str)
+        filtro_departamento = request.args.get('departamento', '', type=str)
+        
+        logger.debug(f"Filtros aplicados: busca_login={busca_login}, busca_nome={busca_nome}, status={filtro_status}, tipo={filtro_tipo}, perfil={filtro_perfil}, departamento={filtro_departamento}")
+        
+        # Query base
+        query = User.query
+        
+        # Aplicar filtros
+        if busca_login:
+            query = query.filter(User.username.ilike(f'%{busca_login}%'))
+        if busca_nome:
+            query = query.filter(User.nome.ilike(f'%{busca_nome}%'))
+        if filtro_status:
+            query = query.filter(User.status == filtro_status)
+        if filtro_tipo == 'ldap':
+            query = query.filter(User.ldap_user == True)
+        elif filtro_tipo == 'local':
+            query = query.filter(User.ldap_user == False)
+        if filtro_perfil:
+            query = query.filter(User.role_id == int(filtro_perfil))
+        if filtro_departamento:
+            query = query.filter(User.departamento.contains(filtro_departamento))
+        
+        # Ordenação
+        ordenacao = request.args.get('sort', 'nome')
+        if ordenacao == 'nome':
+            query = query.order_by(User.nome)
+        elif ordenacao == 'username':
+            query = query.order_by(User.username)
+        elif ordenacao == 'last_login':
+            query = query.order_by(User.last_login.desc())
+        elif ordenacao == 'created_at':
+            query = query.order_by(User.created_at.desc())
+        
+        logger.debug(f"Executando query de usuários com ordenação: {ordenacao}")
+        usuarios = query.all()
+        logger.debug(f"Encontrados {len(usuarios)} usuários")
+        
+        # Dados para filtros
+        perfis_para_filtro = Role.query.all()
+        departamentos_para_filtro = db.session.query(User.departamento).filter(User.departamento.isnot(None)).distinct().all()
+        
+        logger.debug(f"Renderizando template com {len(perfis_para_filtro)} perfis e {len(departamentos_para_filtro)} departamentos")
+
+        return render_template('usuarios/list.html',
+                             usuarios=usuarios,
+                             perfis_para_filtro=perfis_para_filtro,
+                             departamentos_para_filtro=departamentos_para_filtro)
+                             
+    except Exception as e:
+        logger.error(f"Erro ao listar usuários: {e}", exc_info=True)
+        flash('Erro ao carregar lista de usuários. Verifique os logs para mais detalhes.', 'danger')
+        return redirect(url_for('dashboards.dashboard'))
+
+@usuarios_bp.route('/usuarios/bulk-action', methods=['POST'])
+@permission_required('manage_access')
+@login_required
+def bulk_action_usuarios():
+    """Operações em lote para usuários."""
+    import json
+    
+    usuario_ids = request.form.getlist('usuario_ids')
+    acao = request.form.get('acao')
+    
+    if not usuario_ids or not acao:
+        flash('Selecione usuários e uma ação.', 'danger')
+        return redirect(url_for('usuarios.listar_usuarios'))
+    
+    try:
+        usuarios_afetados = 0
+        
+        for usuario_id in usuario_ids:
+            usuario = User.query.get(int(usuario_id))
+            if not usuario:
+                continue
+                
+            # Proteção para admin
+            if usuario.username == 'admin' and acao in ['inativar', 'bloquear', 'excluir']:
+                continue
+            
+            if acao == 'ativar':
+                if usuario.status != 'ativo':
+                    usuario.status = 'ativo'
+                    usuarios_afetados += 1
+                    
+                    # Registrar histórico
+                    historico = UserHistory(
+                        user_id=usuario.id,
+                        acao='status_changed',
+                        detalhes=json.dumps({'novo_status': 'ativo', 'bulk_operation': True}),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    
+            elif acao == 'inativar':
+                if usuario.status != 'inativo':
+                    usuario.status = 'inativo'
+                    usuarios_afetados += 1
+                    
+                    # Registrar histórico
+                    historico = UserHistory(
+                        user_id=usuario.id,
+                        acao='status_changed',
+                        detalhes=json.dumps({'novo_status': 'inativo', 'bulk_operation': True}),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    
+            elif acao == 'bloquear':
+                if usuario.status != 'bloqueado':
+                    usuario.status = 'bloqueado'
+                    usuarios_afetados += 1
+                    
+                    # Registrar histórico
+                    historico = UserHistory(
+                        user_id=usuario.id,
+                        acao='status_changed',
+                        detalhes=json.dumps({'novo_status': 'bloqueado', 'bulk_operation': True}),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    
+            elif acao == 'trocar_perfil':
+                novo_perfil_id = request.form.get('novo_perfil_id')
+                if novo_perfil_id and usuario.role_id != int(novo_perfil_id):
+                    perfil_antigo = usuario.role.nome if usuario.role else 'Nenhum'
+                    usuario.role_id = int(novo_perfil_id)
+                    novo_perfil = Role.query.get(int(novo_perfil_id))
+                    usuarios_afetados += 1
+                    
+                    # Registrar histórico
+                    historico = UserHistory(
+                        user_id=usuario.id,
+                        acao='role_changed',
+                        detalhes=json.dumps({
+                            'perfil_anterior': perfil_antigo,
+                            'novo_perfil': novo_perfil.nome if novo_perfil else 'Nenhum',
+                            'bulk_operation': True
+                        }),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    
+            elif acao == 'excluir':
+                if usuario.can_be_deleted():
+                    # Registrar histórico antes da exclusão
+                    historico = UserHistory(
+                        user_id=usuario.id,
+                        acao='deleted',
+                        detalhes=json.dumps({
+                            'username': usuario.username,
+                            'nome': usuario.nome,
+                            'email': usuario.email,
+                            'bulk_operation': True
+                        }),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    db.session.flush()  # Para garantir que o histórico seja salvo antes da exclusão
+                    
+                    db.session.delete(usuario)
+                    usuarios_afetados += 1
+        
+        db.session.commit()
+        
+        if usuarios_afetados > 0:
+            if acao == 'bloquear':
+                flash(f'{usuarios_afetados} usuário(s) bloqueado(s) com sucesso!', 'success')
+            elif acao == 'ativar':
+                flash(f'{usuarios_afetados} usuário(s) ativado(s) com sucesso!', 'success')
+            elif acao == 'inativar':
+                flash(f'{usuarios_afetados} usuário(s) inativado(s) com sucesso!', 'success')
+            elif acao == 'trocar_perfil':
+                flash(f'Perfil de {usuarios_afetados} usuário(s) alterado com sucesso!', 'success')
+            elif acao == 'excluir':
+                flash(f'{usuarios_afetados} usuário(s) excluído(s) com sucesso!', 'success')
+            else:
+                flash(f'{usuarios_afetados} usuário(s) {acao}(s) com sucesso!', 'success')
+        else:
+            flash('Nenhum usuário foi modificado.', 'warning')
+            
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro na operação em lote: {str(e)}', 'danger')
+        current_app.logger.error(f"Erro em bulk_action_usuarios: {str(e)}")
+    
+    return redirect(url_for('usuarios.listar_usuarios'))
+
+@usuarios_bp.route('/usuarios/<int:usuario_id>/historico')
+@permission_required('manage_access')
+@login_required
+def historico_usuario(usuario_id):
+    """Histórico de alterações do usuário."""
+    usuario = User.query.get_or_404(usuario_id)
+    
+    # Buscar histórico
+    historico = UserHistory.query.filter_by(user_id=usuario_id).order_by(UserHistory.created_at.desc()).all()
+    
+    return render_template('usuarios/historico.html', usuario=usuario, historico=historico)
+
+@usuarios_bp.route('/usuarios/export')
+@permission_required('manage_access')
+@login_required
+@somente_leitura
+def export_usuarios():
+    """Exporta usuários para JSON."""
+    import json
+    from flask import Response
+    
+    usuarios = User.query.all()
+    usuarios_data = []
+    
+    for usuario in usuarios:
+        usuario_dict = usuario.to_dict()
+        # Não exportar dados sensíveis
+        usuario_dict.pop('password', None)
+        usuarios_data.append(usuario_dict)
+    
+    response_data = {
+        'exported_at': datetime.now().isoformat(),
+        'exported_by': current_user.username,
+        'total_users': len(usuarios_data),
+        'users': usuarios_data
+    }
+    
+    response = Response(
+        json.dumps(response_data, indent=2, ensure_ascii=False),
+        mimetype='application/json',
+        headers={
+            'Content-Disposition': f'attachment; filename=usuarios_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+        }
+    )
+    
+    return response
+
+@usuarios_bp.route('/usuarios/import', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def import_usuarios():
+    """Importa usuários de arquivo JSON."""
+    if request.method == 'GET':
+        return render_template('usuarios/import.html')
+    
+    import json
+    from werkzeug.security import generate_password_hash
+    
+    if 'file' not in request.files:
+        flash('Nenhum arquivo selecionado.', 'danger')
+        return redirect(url_for('usuarios.import_usuarios'))
+    
+    file = request.files['file']
+    if file.filename == '':
+        flash('Nenhum arquivo selecionado.', 'danger')
+        return redirect(url_for('usuarios.import_usuarios'))
+    
+    try:
+        data = json.load(file)
+        usuarios_importados = 0
+        usuarios_atualizados = 0
+        erros = []
+        
+        for user_data in data.get('users', []):
+            try:
+                # Verificar se usuário já existe
+                usuario_existente = User.query.filter_by(username=user_data['username']).first()
+                
+                if usuario_existente:
+                    # Atualizar usuário existente (exceto admin)
+                    if usuario_existente.username != 'admin':
+                        usuario_existente.nome = user_data.get('nome', usuario_existente.nome)
+                        usuario_existente.email = user_data.get('email', usuario_existente.email)
+                        usuario_existente.telefone = user_data.get('telefone')
+                        usuario_existente.departamento = user_data.get('departamento')
+                        usuario_existente.cargo = user_data.get('cargo')
+                        
+                        # Buscar e definir role
+                        if user_data.get('role_name'):
+                            role = Role.query.filter_by(nome=user_data['role_name']).first()
+                            if role:
+                                usuario_existente.role_id = role.id
+                        
+                        usuarios_atualizados += 1
+                        
+                        # Registrar histórico
+                        historico = UserHistory(
+                            user_id=usuario_existente.id,
+                            acao='updated',
+                            detalhes=json.dumps({'import_operation': True, 'updated_fields': list(user_data.keys())}),
+                            usuario=current_user.username,
+                            ip_address=request.remote_addr,
+                            user_agent=request.headers.get('User-Agent', '')[:255]
+                        )
+                        db.session.add(historico)
+                else:
+                    # Criar novo usuário
+                    role = None
+                    if user_data.get('role_name'):
+                        role = Role.query.filter_by(nome=user_data['role_name']).first()
+                    
+                    novo_usuario = User(
+                        username=user_data['username'],
+                        nome=user_data['nome'],
+                        email=user_data['email'],
+                        password=generate_password_hash('123456'),  # Senha padrão
+                        status=user_data.get('status', 'ativo'),
+                        telefone=user_data.get('telefone'),
+                        departamento=user_data.get('departamento'),
+                        cargo=user_data.get('cargo'),
+                        role_id=role.id if role else None,
+                        ldap_user=user_data.get('ldap_user', False),
+                        created_by=current_user.username
+                    )
+                    
+                    db.session.add(novo_usuario)
+                    db.session.flush()  # Para obter o ID
+                    usuarios_importados += 1
+                    
+                    # Registrar histórico
+                    historico = UserHistory(
+                        user_id=novo_usuario.id,
+                        acao='created',
+                        detalhes=json.dumps({'import_operation': True}),
+                        usuario=current_user.username,
+                        ip_address=request.remote_addr,
+                        user_agent=request.headers.get('User-Agent', '')[:255]
+                    )
+                    db.session.add(historico)
+                    
+            except Exception as user_error:
+                erros.append(f"Erro ao processar usuário {user_data.get('username', 'desconhecido')}: {str(user_error)}")
+        
+        db.session.commit()
+        
+        flash(f'Importação concluída! {usuarios_importados} novos usuários, {usuarios_atualizados} atualizados.', 'success')
+        
+        if erros:
+            for erro in erros[:5]:  # Mostrar apenas os 5 primeiros erros
+                flash(erro, 'warning')
+                
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao processar arquivo: {str(e)}', 'danger')
+        current_app.logger.error(f"Erro em import_usuarios: {str(e)}")
+    
+    return redirect(url_for('usuarios.listar_usuarios')) 
+
+@usuarios_bp.route('/usuarios/<int:usuario_id>/editar', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def editar_usuario(usuario_id):
+    """Edição avançada de usuário com histórico de alterações."""
+    import json
+    from werkzeug.security import generate_password_hash
+    
+    usuario = User.query.get_or_404(usuario_id)
+    roles = Role.query.filter_by(ativo=True).all()
+    
+    if request.method == 'POST':
+        # Guardar valores originais para o histórico
+        valores_originais = {
+            'username': usuario.username,
+            'nome': usuario.nome,
+            'email': usuario.email,
+            'telefone': usuario.telefone,
+            'departamento': usuario.departamento,
+            'cargo': usuario.cargo,
+            'observacoes': usuario.observacoes,
+            'status': usuario.status,
+            'role_id': usuario.role_id
+        }
+        
+        # Campos do formulário
+        username = request.form.get('username', '').strip()
+        nome = request.form.get('nome', '').strip()
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '').strip()
+        telefone = request.form.get('telefone', '').strip()
+        departamento = request.form.get('departamento', '').strip()
+        cargo = request.form.get('cargo', '').strip()
+        observacoes = request.form.get('observacoes', '').strip()
+        status = request.form.get('status', usuario.status)
+        role_id = request.form.get('role_id')
+        
+        # Validações usando utilitários centralizados
+        from utils.validation import (
+            validate_username, check_username_exists,
+            validate_name, validate_email, check_email_exists,
+            validate_password, validate_phone
+        )
+        
+        erros = []
+        
+        # Validar username
+        is_valid_username, username_error = validate_username(username)
+        if not is_valid_username:
+            erros.append(username_error)
+        else:
+            username_exists, username_exists_msg = check_username_exists(username, usuario.id)
+            if username_exists:
+                erros.append(username_exists_msg)
+        
+        # Validar nome
+        is_valid_name, name_error = validate_name(nome, "Nome completo")
+        if not is_valid_name:
+            erros.append(name_error)
+        
+        # Validar email
+        is_valid_email, email_error = validate_email(email)
+        if not is_valid_email:
+            erros.append(email_error)
+        else:
+            email_exists, email_exists_msg = check_email_exists(email, User, usuario.id)
+            if email_exists:
+                erros.append(email_exists_msg)
+        
+        # Validar senha (opcional na edição)
+        if password:
+            is_valid_password, password_error = validate_password(password)
+            if not is_valid_password:
+                erros.append(password_error)
+        
+        # Validar telefone (opcional)
+        if telefone:
+            is_valid_phone, phone_error = validate_phone(telefone)
+            if not is_valid_phone:
+                erros.append(phone_error)
+            
+        if erros:
+            for erro in erros:
+                flash(erro, 'danger')
+            return render_template('usuarios/form.html', 
+                                 usuario=usuario, 
+                                 roles=roles,
+                                 form_data=request.form)
+        
+        try:
+            # Rastrear alterações
+            alteracoes = []
+            
+            if username != usuario.username:
+                alteracoes.append(f"Username: {usuario.username} → {username}")
+                usuario.username = username
+                
+            if nome != usuario.nome:
+                alteracoes.append(f"Nome: {usuario.nome} → {nome}")
+                usuario.nome = nome
+                
+            if email != usuario.email:
+                alteracoes.append(f"Email: {usuario.email} → {email}")
+                usuario.email = email
+                
+            if telefone != usuario.telefone:
+                alteracoes.append(f"Telefone: {usuario.telefone or 'Vazio'} → {telefone or 'Vazio'}")
+                usuario.telefone = telefone or None
+                
+            if departamento != usuario.departamento:
+                alteracoes.append(f"Departamento: {usuario.departamento or 'Vazio'} → {departamento or 'Vazio'}")
+                usuario.departamento = departamento or None
+                
+            if cargo != usuario.cargo:
+                alteracoes.append(f"Cargo: {usuario.cargo or 'Vazio'} → {cargo or 'Vazio'}")
+                usuario.cargo = cargo or None
+                
+            if observacoes != usuario.observacoes:
+                alteracoes.append("Observações alteradas")
+                usuario.observacoes = observacoes or None
+                
+            if status != usuario.status:
+                alteracoes.append(f"Status: {usuario.status} → {status}")
+                usuario.status = status
+            
+            # Senha
+            if password:
+                usuario.password = generate_password_hash(password)
+                alteracoes.append("Senha alterada")
+            
+            # Proteção para admin
+            if usuario.username == 'admin':
+                admin_role = Role.query.filter_by(nome='admin').first()
+                if admin_role and usuario.role_id != admin_role.id:
+                    usuario.role_id = admin_role.id
+                    alteracoes.append("Perfil admin forçado para usuário admin")
+            elif role_id and int(role_id) != usuario.role_id:
+                role_anterior = Role.query.get(usuario.role_id).nome if usuario.role_id else 'Nenhum'
+                nova_role = Role.query.get(int(role_id))
+                if nova_role:
+                    alteracoes.append(f"Perfil: {role_anterior} → {nova_role.nome}")
+                    usuario.role_id = int(role_id)
+            
+            # Atualizar timestamp
+            usuario.updated_at = db.func.now()
+            
+            # Registrar histórico se houver alterações
+            if alteracoes:
+                historico = UserHistory(
+                    user_id=usuario.id,
+                    acao='updated',
+                    detalhes=json.dumps({
+                        'alteracoes': alteracoes,
+                        'updated_by': current_user.username
+                    }),
+                    usuario=current_user.username,
+                    ip_address=request.remote_addr,
+                    user_agent=request.headers.get('User-Agent', '')[:255]
+                )
+                db.session.add(historico)
+            
+            db.session.commit()
+            
+            if alteracoes:
+                flash(f'Usuário "{username}" atualizado com sucesso! ({len(alteracoes)} alterações)', 'success')
+            else:
+                flash('Nenhuma alteração foi feita.', 'info')
+                
+            return redirect(url_for('usuarios.listar_usuarios'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar usuário: {str(e)}', 'danger')
+            current_app.logger.error(f"Erro em editar_usuario: {str(e)}")
+            return render_template('usuarios/form.html', 
+                                 usuario=usuario, 
+                                 roles=roles,
+                                 form_data=request.form)
+    
+    return render_template('usuarios/form.html', usuario=usuario, roles=roles)
+
+@usuarios_bp.route('/usuarios/<int:usuario_id>/excluir', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def excluir_usuario(usuario_id):
+    """Exclusão de usuário. Protegida por manage_access."""
+    usuario = User.query.get_or_404(usuario_id)
+    
+    # 🔒 PROTEÇÃO CRÍTICA: Não permitir exclusão do admin
+    if usuario.username == 'admin':
+        flash('O usuário admin não pode ser excluído por questões de segurança.', 'danger')
+        return redirect(url_for('usuarios.listar_usuarios'))
+    
+    # 🔒 PROTEÇÃO: Não permitir que o usuário se exclua
+    if usuario.id == current_user.id:
+        flash('Você não pode excluir sua própria conta.', 'danger')
+        return redirect(url_for('usuarios.listar_usuarios'))
+    
+    if request.method == 'POST':
+        # Log da ação para auditoria
+        current_app.logger.warning(f'Usuário {current_user.username} excluiu o usuário {usuario.username} (ID: {usuario.id})')
+        
+        db.session.delete(usuario)
+        db.session.commit()
+        flash('Usuário excluído com sucesso!', 'success')
+        return redirect(url_for('usuarios.listar_usuarios'))
+    return render_template('usuarios/confirm_delete.html', usuario=usuario) 
+
+@usuarios_bp.route('/usuarios/<int:usuario_id>/resetar-senha', methods=['GET', 'POST'])
+@permission_required('manage_access')
+@login_required
+def resetar_senha_usuario(usuario_id):
+    usuario = User.query.get_or_404(usuario_id)
+    if request.method == 'POST':
+        nova_senha = request.form['nova_senha']
+        if not nova_senha:
+            flash('A nova senha é obrigatória.', 'danger')
+            return render_template('usuarios/resetar_senha.html', usuario=usuario)
+        
+        try:
+            from werkzeug.security import generate_password_hash
+            usuario.password = generate_password_hash(nova_senha)
+            
+            # Registrar histórico
+            historico = UserHistory(
+                user_id=usuario.id,
+                acao='password_reset',
+                detalhes=json.dumps({
+                    'reset_by': current_user.username,
+                    'reset_method': 'manual'
+                }),
+                usuario=current_user.username,
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent', '')[:255]
+            )
+            db.session.add(historico)
+            db.session.commit()
+            
+            flash('Senha redefinida com sucesso!', 'success')
+            return redirect(url_for('usuarios.listar_usuarios'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao redefinir senha: {str(e)}', 'danger')
+            current_app.logger.error(f"Erro em resetar_senha_usuario: {str(e)}")
+            
+    return render_template('usuarios/resetar_senha.html', usuario=usuario) 
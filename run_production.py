@@ -17,6 +17,8 @@ def setup_environment():
     # Definir variáveis de ambiente para produção
     os.environ.setdefault('FLASK_ENV', 'production')
     os.environ.setdefault('FLASK_APP', 'app.py')
+    # Lido pelo gunicorn.conf.py e pelo dimensionamento do pool de conexões
+    os.environ.setdefault('WEB_CONCURRENCY', '4')
     
     # Criar diretório de logs se não existir
     Path('logs').mkdir(exist_ok=True)
@@ -188,7 +190,6 @@ def start_server():
                 'gunicorn',
                 '--config', 'gunicorn.conf.py',
                 '--bind', '{}:{}'.format(ip_addr, port),
-                '--workers', '4',
                 '--timeout', '30',
                 '--access-logfile', 'logs/gunicorn_access.log',
                 '--error-logfile', 'logs/gunicorn_error.log',
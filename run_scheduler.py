@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Processo dedicado ao scheduler (APP_ROLE=scheduler), sem rotas web.
+
+Carrega só banco, configuração e templates de email, disputa a liderança do
+scheduler como os workers web e executa os jobs quando for o líder (agendados
+e os disparados pela interface, ver utils/jobs.py). Para que só este processo
+rode jobs, inicie o servidor web com SCHEDULER_ENABLED=false.
+
+Uso:
+    python run_scheduler.py
+"""
+
+import os
+import signal
+import threading
+
+os.environ['APP_ROLE'] = 'scheduler'
+
+from app import create_app, logger
+from tarefas import start_scheduler
+from utils.agendador import parar_agendador
+from utils.jobs import parar_executor
+
+
+def main():
+    app = create_app('scheduler')
+    if start_scheduler(app) is None:
+        logger.error('SCHEDULER_ENABLED=false: nada a executar neste processo')
+        return 1
+
+    encerrar = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: encerrar.set())
+
+    logger.info(f'Processo do scheduler iniciado (pid {os.getpid()})')
+    encerrar.wait()
+    logger.info('Encerrando processo do scheduler')
+    parar_agendador()
+    parar_executor()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
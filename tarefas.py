@@ -0,0 +1,374 @@
+# tarefas.py
+"""Envio de alertas e resumos, jobs em segundo plano e jobs do scheduler.
+
+Nada aqui registra rotas: o módulo é usado pelas rotas de ``routes/alertas.py``,
+pelo pool de jobs (``utils/jobs.py``) e pelo processo líder do scheduler, que
+pode rodar sem a interface web (``APP_ROLE=scheduler``, ver ``run_scheduler.py``).
+Os jobs persistidos do APScheduler referenciam as funções como ``tarefas:<nome>``.
+"""
+
+import logging
+from datetime import date, timedelta
+
+from flask import current_app, render_template
+
+from models import db, Registro, Responsavel, Configuracao
+from utils.configuracao_sistema import get_system_config
+from utils.jobs import tipo_job
+from utils.metrics import registrar_email, executar_job
+
+logger = logging.getLogger(__name__)
+
+def get_mail():
+    """Extensão Flask-Mail do app atual, criada no primeiro envio.
+
+    flask_mail (e o pacote email) só é importado quando algum email é enviado,
+    não na subida dos workers e dos comandos de linha.
+    """
+    app = current_app._get_current_object()
+    if 'flask_mail' not in app.extensions:
+        from flask_mail import Mail
+        app.extensions['flask_mail'] = Mail(app)
+    return app.extensions['flask_mail']
+
+def enviar_resumo_responsavel(responsavel_id):
+    """Envia o resumo de um responsável; retorna a mensagem para o usuário."""
+    from flask_mail import Message
+    
+    responsavel = db.session.get(Responsavel, responsavel_id)
+    if responsavel is None or not responsavel.email:
+        raise ValueError('Responsável inexistente ou sem email cadastrado')
+    
+    # Buscar certificados deste responsável (relação N:N)
+    certificados = Registro.query.filter(Registro.responsaveis.contains(responsavel)).all()
+    
+    # Verificar se o mail está configurado corretamente
+    if current_app.config['MAIL_SERVER'] == 'localhost' and current_app.config['MAIL_PORT'] == 8025 and current_app.config['MAIL_SUPPRESS_SEND']:
+        logger.info(f"Resumo individual simulado para {responsavel.email}")
+        registrar_email('resumo', 'simulado')
+        return f'Resumo simulado enviado para {responsavel.nome} ({responsavel.email})!'
+    
+    try:
+        # Renderizar template HTML
+        html_content = render_template('emails/email_responsaveis.html',
+                                     responsavel=responsavel,
+                                     certificados=certificados,
+                                     hoje=date.today(),
+                                     timedelta=timedelta,
+                                     system_config=get_system_config(),
+                                     subject=f"Resumo de Certificados - {responsavel.nome}")
+        
+        msg = Message(
+            subject=f"Resumo de Certificados - {responsavel.nome}",
+            recipients=[responsavel.email],
+            html=html_content,
+            sender=current_app.config['MAIL_DEFAULT_SENDER']
+        )
+        
+        get_mail().send(msg)
+    except Exception as e:
+        registrar_email('resumo', 'falha')
+        logger.error(f"Erro ao enviar resumo individual: {e}")
+        raise
+    registrar_email('resumo', 'enviado')
+    logger.info(f"Resumo individual enviado para {responsavel.email}")
+    return f'Resumo enviado com sucesso para {responsavel.nome} ({responsavel.email})!'
+
+# Tipos de job disparados pela interface (utils/jobs.py)
+
+@tipo_job('alertas')
+def job_alertas(progresso):
+    resumo = enviar_alertas_vencimento(origem='manual', progresso=progresso)
+    return (f"{resumo['enviados']} alertas enviados, {resumo['ignorados']} já entregues hoje, "
+            f"{resumo['falhas']} falhas")
+
+@tipo_job('resumos')
+def job_resumos(progresso):
+    emails_enviados = enviar_email_resumo_responsaveis(progresso=progresso)
+    return f'{emails_enviados} resumos enviados'
+
+@tipo_job('resumo_individual')
+def job_resumo_individual(progresso, responsavel_id):
+    progresso.definir_total(1)
+    mensagem = enviar_resumo_responsavel(responsavel_id)
+    progresso.avancar()
+    return mensagem
+
+def _app_agendador():
+    """App do processo líder; os jobs do scheduler rodam fora de requisições."""
+    from utils.agendador import obter_agendador
+    return obter_agendador().app
+
+def _avancar_rollups():
+    from utils.status_rollup import avancar_data_referencia
+    try:
+        return avancar_data_referencia()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro na virada diária dos rollups: {e}")
+        return False
+
+def virada_diaria_rollups():
+    """Avança a data de referência dos contadores de status de registros."""
+    with _app_agendador().app_context():
+        _avancar_rollups()
+
+def manter_particoes_historico():
+    """Cria as partições dos próximos meses das tabelas de auditoria particionadas (PostgreSQL)."""
+    from utils.audit_archive import TABELAS_AUDITORIA, garantir_particoes, is_particionada
+    with _app_agendador().app_context():
+        for tabela in TABELAS_AUDITORIA:
+            try:
+                if is_particionada(tabela):
+                    garantir_particoes(tabela)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao criar partições de {tabela}: {e}")
+
+def job_envio_alertas_semanal():
+    """Job persistido do envio semanal de alertas (referenciado como ``tarefas:job_envio_alertas_semanal``)."""
+    with _app_agendador().app_context():
+        executar_job('envio_alertas_semanal', enviar_alertas_vencimento)
+
+def job_virada_diaria_rollups():
+    """Job persistido da virada de dia dos contadores de status."""
+    executar_job('virada_diaria_rollups', virada_diaria_rollups)
+
+def job_particoes_historico():
+    """Job persistido mensal das partições do histórico."""
+    executar_job('particoes_historico', manter_particoes_historico)
+
+def configurar_jobs(scheduler):
+    """Sincroniza os jobs persistidos com a configuração atual (executado pelo líder)."""
+    from apscheduler.triggers.cron import CronTrigger
+    from utils.agendador import garantir_job, remover_job
+    
+    config = Configuracao.query.first()
+    if config and config.agendamento_ativo:
+        garantir_job(
+            scheduler, 'envio_alertas_semanal', 'tarefas:job_envio_alertas_semanal',
+            CronTrigger(day_of_week=config.dia_semana, hour=config.hora, minute=config.minuto,
+                        timezone=scheduler.timezone)
+        )
+    else:
+        remover_job(scheduler, 'envio_alertas_semanal')
+    # Virada de dia dos contadores de status; as leituras não gravam
+    garantir_job(scheduler, 'virada_diaria_rollups', 'tarefas:job_virada_diaria_rollups',
+                 CronTrigger(hour=0, minute=5, timezone=scheduler.timezone))
+    # Partições mensais do histórico sempre alguns meses à frente
+    garantir_job(scheduler, 'particoes_historico', 'tarefas:job_particoes_historico',
+                 CronTrigger(day=1, hour=0, minute=15, timezone=scheduler.timezone))
+    # Recupera virada perdida (scheduler parado à meia-noite); no dia já avançado é só uma leitura
+    _avancar_rollups()
+
+def start_scheduler(app):
+    """Inicia a eleição do scheduler neste processo; só o líder executa os jobs (agendados e da interface)."""
+    from utils.agendador import iniciar_agendador
+    from utils.jobs import iniciar_executor
+    agendador = iniciar_agendador(app, db, configurar_jobs)
+    if agendador is None:
+        logger.info('Scheduler desabilitado neste processo (SCHEDULER_ENABLED=false)')
+        return None
+    # Jobs da interface também rodam só no líder (utils/jobs.py)
+    iniciar_executor(app, lambda: agendador.eh_lider)
+    return agendador
+
+def recarregar_agendamento():
+    """Recarrega o agendamento baseado na configuração atual.
+    
+    No líder o efeito é imediato; nos demais processos o líder aplica a nova
+    configuração no próximo heartbeat.
+    """
+    from utils.agendador import obter_agendador
+    try:
+        agendador = obter_agendador()
+        if agendador and agendador.sincronizar():
+            logger.info('Agendamento recarregado pelo líder do scheduler')
+        else:
+            logger.info('Agendamento será recarregado pelo líder do scheduler no próximo heartbeat')
+    except Exception as e:
+        logger.error(f'Erro ao recarregar agendamento: {e}')
+
+def enviar_email_responsaveis(registro, execucao, layout=None):
+    """Envia e-mail para os responsáveis de um registro, pulando entregas já feitas no dia.
+    Retorna o número de falhas. ``layout`` é o LayoutEmail da execução
+    (utils/email_render.py); sem ele, um é criado para este registro.
+    """
+    from flask_mail import Message
+    
+    falhas = 0
+    dias_para_vencer = (registro.data_vencimento - date.today()).days
+    
+    # Verificar se o mail está configurado corretamente
+    simulado = current_app.config['MAIL_SERVER'] == 'localhost' and current_app.config['MAIL_PORT'] == 8025 and current_app.config['MAIL_SUPPRESS_SEND']
+    if simulado:
+        logger.info("Modo desenvolvimento: emails serão simulados")
+    
+    for resp in registro.responsaveis:
+        nome = resp.nome
+        email = resp.email
+        if not email:
+            logger.warning(f"Responsável sem e-mail: {resp}")
+            continue
+        entrega_id = execucao.reservar(registro.id, resp.id, email)
+        if entrega_id is None:
+            logger.debug(f"Alerta de {registro.nome} para {email} já entregue hoje")
+            continue
+        if simulado:
+            logger.info(f"Email simulado enviado para {email} sobre {registro.nome}")
+            registrar_email('alerta', 'simulado')
+            execucao.concluir(entrega_id, 'simulado')
+            continue
+        try:
+            # Renderizar template HTML
+            if layout is None:
+                from utils.email_render import LayoutEmail
+                layout = LayoutEmail(current_app._get_current_object(), 'emails/alerta_vencimento.html', system_config=get_system_config())
+            html_content = layout.renderizar(f"Alerta de Vencimento - {registro.nome}",
+                                             registro=registro,
+                                             dias_restantes=dias_para_vencer)
+            
+            msg = Message(
+                subject=f"[Alerta] {registro.tipo.title()} '{registro.nome}' vence em {dias_para_vencer} dias",
+                recipients=[email],
+                html=html_content,
+                sender=current_app.config['MAIL_DEFAULT_SENDER']
+            )
+            get_mail().send(msg)
+            registrar_email('alerta', 'enviado')
+            execucao.concluir(entrega_id, 'enviado')
+            logger.info(f"Alerta enviado para {email} sobre {registro.nome}")
+        except Exception as e:
+            registrar_email('alerta', 'falha')
+            execucao.concluir(entrega_id, 'falha', str(e))
+            logger.error(f"Erro ao enviar e-mail para {email}: {e}")
+            falhas += 1
+    return falhas
+
+def enviar_alertas_vencimento(origem='agendado', progresso=None):
+    """Envia alertas de vencimento para todos os registros em período de alerta.
+    
+    Cada entrega é gravada no ledger (utils/alert_ledger.py): uma execução
+    interrompida continua do último registro concluído e novas execuções no
+    mesmo dia não reenviam o que já foi entregue. Retorna o resumo da execução.
+    """
+    from sqlalchemy.orm import selectinload
+    from utils.alert_ledger import ExecucaoAlertas
+    from utils.email_render import LayoutEmail
+    from utils.jobs import JobCancelado, ProgressoNulo
+    
+    progresso = progresso or ProgressoNulo()
+    hoje = date.today()
+    execucao = ExecucaoAlertas.iniciar(hoje, origem)
+    try:
+        registros = (Registro.query
+                     .options(selectinload(Registro.responsaveis))
+                     .filter(Registro.regularizado == False, Registro.id > execucao.checkpoint_registro_id)
+                     .order_by(Registro.id)
+                     .all())
+        logger.info(f"Iniciando verificação de alertas: {len(registros)} registros encontrados")
+        em_alerta = [r for r in registros if (r.data_vencimento - hoje).days <= r.tempo_alerta]
+        progresso.definir_total(len(em_alerta), f"{len(em_alerta)} registros em período de alerta")
+        # Cabeçalho e rodapé renderizados uma vez para toda a execução
+        layout = LayoutEmail(current_app._get_current_object(), 'emails/alerta_vencimento.html', system_config=get_system_config())
+        
+        for registro in em_alerta:
+            progresso.verificar_cancelamento()
+            dias_para_vencer = (registro.data_vencimento - hoje).days
+            logger.info(f"Enviando alerta para {registro.nome} (vence em {dias_para_vencer} dias)")
+            falhas = enviar_email_responsaveis(registro, execucao, layout)
+            execucao.checkpoint(registro.id)
+            progresso.avancar(falhas=falhas)
+    except JobCancelado:
+        execucao.finalizar(erro='Cancelado pelo usuário')
+        raise
+    except Exception as e:
+        execucao.finalizar(erro=str(e))
+        raise
+    execucao.finalizar()
+    return execucao.resumo()
+
+def _grupos_resumo():
+    """Responsáveis com email e seus registros, em uma única consulta."""
+    linhas = (db.session.query(Responsavel, Registro)
+              .join(Responsavel.registros)
+              .filter(Responsavel.email != None, Responsavel.email != '')
+              .order_by(Responsavel.id, Registro.id)
+              .all())
+    grupos = []
+    for responsavel, registro in linhas:
+        if not grupos or grupos[-1][0] is not responsavel:
+            grupos.append((responsavel, []))
+        grupos[-1][1].append(registro)
+    return grupos
+
+def enviar_email_resumo_responsaveis(progresso=None):
+    """Envia email de resumo para todos os responsáveis com seus certificados.
+    
+    Os grupos são carregados de uma vez; a renderização e o envio rodam em
+    paralelo (utils/email_pool.py), com sessões SMTP reaproveitadas e
+    limitadas por host.
+    """
+    from utils.jobs import JobCancelado, ProgressoNulo
+    
+    progresso = progresso or ProgressoNulo()
+    try:
+        hoje = date.today()
+        grupos = _grupos_resumo()
+        progresso.definir_total(len(grupos))
+        
+        # Verificar se o mail está configurado corretamente
+        if current_app.config['MAIL_SERVER'] == 'localhost' and current_app.config['MAIL_PORT'] == 8025 and current_app.config['MAIL_SUPPRESS_SEND']:
+            logger.info("Modo desenvolvimento: emails de resumo serão simulados")
+            for responsavel, certificados in grupos:
+                progresso.verificar_cancelamento()
+                logger.info(f"Email de resumo simulado enviado para {responsavel.email}")
+                registrar_email('resumo', 'simulado')
+                progresso.avancar()
+            
+            logger.info(f"Simulados {len(grupos)} emails de resumo")
+            return len(grupos)
+        
+        from flask_mail import Message
+        from utils.email_pool import enviar_em_paralelo
+        from utils.email_render import LayoutEmail
+        
+        layout = LayoutEmail(current_app._get_current_object(), 'emails/email_responsaveis.html',
+                             system_config=get_system_config(), hoje=hoje, timedelta=timedelta)
+        sender = current_app.config['MAIL_DEFAULT_SENDER']
+        enviados = []
+        
+        def renderizar(grupo):
+            responsavel, certificados = grupo
+            html_content = layout.renderizar(f"Resumo de Certificados - {responsavel.nome}",
+                                             responsavel=responsavel,
+                                             certificados=certificados)
+            return Message(
+                subject=f"Resumo de Certificados - {responsavel.nome}",
+                recipients=[responsavel.email],
+                html=html_content,
+                sender=sender
+            )
+        
+        def ao_concluir(grupo, erro):
+            email = grupo[0].email
+            if erro is None:
+                enviados.append(email)
+                registrar_email('resumo', 'enviado')
+                logger.info(f"Email de resumo enviado para {email}")
+            else:
+                registrar_email('resumo', 'falha')
+                logger.error(f"Erro ao enviar email de resumo para {email}: {str(erro)}")
+            progresso.avancar(falhas=0 if erro is None else 1)
+        
+        enviar_em_paralelo(current_app._get_current_object(), get_mail(), grupos, renderizar, ao_concluir, cancelado=progresso.cancelado)
+        progresso.verificar_cancelamento()
+        
+        logger.info(f"Enviados {len(enviados)} emails de resumo")
+        return len(enviados)
+        
+    except JobCancelado:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao enviar emails de resumo: {str(e)}")
+        return 0 
@@ -0,0 +1,91 @@
+# utils/activity.py
+"""Trilha de auditoria dos registros e rollup diário de atividade."""
+
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, RegistroHistory, AtividadeDiaria
+
+# Rótulos exibidos nos dashboards para cada ação registrada
+ACOES_REGISTRO = {
+    'created': 'Criado',
+    'updated': 'Editado',
+    'regularized': 'Regularizado',
+    'deleted': 'Excluído',
+}
+
+
+def _incrementar_atividade(dia, acao):
+    """Incrementa o contador diário da ação (UPDATE atômico, INSERT se ausente)."""
+    resultado = db.session.execute(
+        update(AtividadeDiaria)
+        .where(AtividadeDiaria.dia == dia, AtividadeDiaria.acao == acao)
+        .values(total=AtividadeDiaria.total + 1)
+    )
+    if resultado.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(AtividadeDiaria(dia=dia, acao=acao, total=1))
+    except IntegrityError:
+        # Outro worker criou a linha entre o UPDATE e o INSERT
+        db.session.execute(
+            update(AtividadeDiaria)
+            .where(AtividadeDiaria.dia == dia, AtividadeDiaria.acao == acao)
+            .values(total=AtividadeDiaria.total + 1)
+        )
+
+
+def registrar_historico_registro(registro, acao, usuario, detalhes=None, ip_address=None):
+    """Registra uma alteração de registro e atualiza o rollup diário.
+
+    Deve ser chamado dentro da mesma transação da alteração; o commit fica a
+    cargo de quem chama. Para criações, o registro precisa ter sido
+    enviado ao banco (``flush``) para possuir ``id``. O dia do rollup é o de
+    ``created_at``, para que :func:`reconstruir_atividade_diaria` chegue aos
+    mesmos totais.
+    """
+    momento = datetime.now()
+    historico = RegistroHistory(
+        registro_id=registro.id,
+        registro_nome=registro.nome,
+        registro_tipo=registro.tipo,
+        acao=acao,
+        detalhes=json.dumps(detalhes, ensure_ascii=False, default=str) if detalhes else None,
+        usuario=usuario,
+        ip_address=ip_address,
+        created_at=momento
+    )
+    db.session.add(historico)
+    _incrementar_atividade(momento.date(), acao)
+    return historico
+
+
+def obter_atividade_diaria(dias=30, hoje=None):
+    """Retorna {dia: {acao: total}} dos últimos ``dias`` dias (incluindo hoje) em uma consulta."""
+    hoje = hoje or date.today()
+    inicio = hoje - timedelta(days=dias - 1)
+    buckets = {inicio + timedelta(days=i): {} for i in range(dias)}
+    linhas = db.session.query(
+        AtividadeDiaria.dia, AtividadeDiaria.acao, AtividadeDiaria.total
+    ).filter(AtividadeDiaria.dia >= inicio, AtividadeDiaria.dia <= hoje).all()
+    for dia, acao, total in linhas:
+        buckets[dia][acao] = total
+    return buckets
+
+
+def reconstruir_atividade_diaria():
+    """Recalcula o rollup a partir de ``registro_history`` (uso administrativo)."""
+    dia = func.date(RegistroHistory.created_at)
+    linhas = db.session.query(dia, RegistroHistory.acao, func.count(RegistroHistory.id)) \
+        .group_by(dia, RegistroHistory.acao).all()
+    db.session.query(AtividadeDiaria).delete()
+    for valor_dia, acao, total in linhas:
+        if isinstance(valor_dia, str):
+            valor_dia = date.fromisoformat(valor_dia)
+        db.session.add(AtividadeDiaria(dia=valor_dia, acao=acao, total=total))
+    db.session.commit()
+    return len(linhas)
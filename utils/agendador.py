@@ -0,0 +1,330 @@
+# utils/agendador.py
+"""Scheduler com eleição de líder entre processos e hosts.
+
+Cada processo (worker do gunicorn, waitress, ``python app.py``) roda uma
+thread de eleição; apenas o líder mantém um ``BackgroundScheduler`` ativo, de
+modo que os jobs disparam uma única vez por instalação.
+
+- PostgreSQL: ``pg_try_advisory_lock`` em uma conexão dedicada. A trava
+  pertence à sessão e é liberada pelo servidor quando o líder morre.
+- Demais bancos (SQLite): linha de arrendamento em ``agendador_lideranca``
+  renovada a cada heartbeat; expira após ``SCHEDULER_LEASE_SECONDS``.
+  Os relógios dos hosts precisam estar sincronizados (NTP).
+
+Os jobs ficam em um ``SQLAlchemyJobStore`` (tabela ``apscheduler_jobs``):
+execuções perdidas durante reinícios ou trocas de líder rodam ao assumir,
+dentro de ``SCHEDULER_MISFIRE_GRACE_SECONDS``.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+NOME_LIDERANCA = 'scheduler'
+# Chave fixa da trava advisory (derivada do nome para não colidir com outras aplicações)
+CHAVE_ADVISORY_PADRAO = zlib.crc32(b'sistema-certificados:scheduler')
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def agendador_habilitado():
+    return os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+
+
+def _agora():
+    # UTC sem fuso: hosts em fusos diferentes comparam o mesmo instante
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _TravaAdvisory:
+    """Liderança por trava advisory do PostgreSQL em uma conexão dedicada."""
+
+    estrategia = 'advisory_lock'
+
+    def __init__(self, engine, chave):
+        self.engine = engine
+        self.chave = chave
+        self._conexao = None
+
+    def adquirir(self):
+        if self._conexao is None:
+            # AUTOCOMMIT: a conexão fica aberta sem transação ("idle in transaction")
+            self._conexao = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        obtida = self._conexao.execute(text('SELECT pg_try_advisory_lock(:chave)'), {'chave': self.chave}).scalar()
+        if not obtida:
+            self._fechar()
+        return bool(obtida)
+
+    def renovar(self):
+        # A trava vive enquanto a sessão viver; basta confirmar que a conexão responde
+        self._conexao.execute(text('SELECT 1'))
+        return True
+
+    def liberar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.execute(text('SELECT pg_advisory_unlock(:chave)'), {'chave': self.chave})
+            except Exception as e:
+                logger.debug(f"Falha ao liberar trava advisory: {e}")
+        self._fechar()
+
+    def _fechar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.close()
+            except Exception:
+                pass
+            self._conexao = None
+
+
+class _Arrendamento:
+    """Liderança por linha de arrendamento com expiração."""
+
+    estrategia = 'arrendamento'
+
+    def __init__(self, engine, tabela, dono, duracao):
+        self.engine = engine
+        self.tabela = tabela
+        self.dono = dono
+        self.duracao = duracao
+        tabela.create(engine, checkfirst=True)
+
+    def _renovar_linha(self, somente_proprio):
+        agora = _agora()
+        condicao = self.tabela.c.dono == self.dono
+        if not somente_proprio:
+            condicao = condicao | (self.tabela.c.expira_em < agora)
+        with self.engine.begin() as conexao:
+            resultado = conexao.execute(
+                self.tabela.update()
+                .where(self.tabela.c.nome == NOME_LIDERANCA, condicao)
+                .values(dono=self.dono, expira_em=agora + timedelta(seconds=self.duracao), renovado_em=agora)
+            )
+            return resultado.rowcount == 1
+
+    def adquirir(self):
+        if self._renovar_linha(somente_proprio=False):
+            return True
+        agora = _agora()
+        try:
+            with self.engine.begin() as conexao:
+                conexao.execute(self.tabela.insert().values(
+                    nome=NOME_LIDERANCA, dono=self.dono,
+                    expira_em=agora + timedelta(seconds=self.duracao), renovado_em=agora
+                ))
+            return True
+        except IntegrityError:
+            # Linha já existe e o arrendamento de outro processo ainda vale
+            return False
+
+    def renovar(self):
+        return self._renovar_linha(somente_proprio=True)
+
+    def liberar(self):
+        try:
+            with self.engine.begin() as conexao:
+                conexao.execute(
+                    self.tabela.update()
+                    .where(self.tabela.c.nome == NOME_LIDERANCA, self.tabela.c.dono == self.dono)
+                    .values(expira_em=_agora())
+                )
+        except Exception as e:
+            logger.debug(f"Falha ao liberar arrendamento: {e}")
+
+
+def garantir_job(scheduler, job_id, func, trigger):
+    """Adiciona ou atualiza um job persistido sem perder o próximo disparo.
+
+    Substituir um job idêntico recalcularia ``next_run_time`` a partir de
+    agora e descartaria a execução atrasada que deveria rodar ao assumir.
+    """
+    existente = scheduler.get_job(job_id)
+    if existente and existente.func_ref == func and str(existente.trigger) == str(trigger):
+        return False
+    scheduler.add_job(func, trigger=trigger, id=job_id, replace_existing=True)
+    logger.info(f"Job {job_id} agendado: {trigger}")
+    return True
+
+
+def remover_job(scheduler, job_id):
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
+        logger.info(f"Job {job_id} removido")
+
+
+class AgendadorDistribuido:
+    """Eleição de líder + ``BackgroundScheduler`` ativo apenas no líder.
+
+    ``configurar_jobs(scheduler)`` é chamada com contexto de aplicação ao
+    assumir a liderança e a cada heartbeat, para refletir mudanças de
+    configuração feitas em qualquer processo.
+    """
+
+    def __init__(self, app, db, configurar_jobs):
+        self.app = app
+        self.db = db
+        self.configurar_jobs = configurar_jobs
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat = _int_env('SCHEDULER_HEARTBEAT_SECONDS', 10)
+        self.duracao = max(_int_env('SCHEDULER_LEASE_SECONDS', 30), 2 * self.heartbeat)
+        self.misfire_grace = _int_env('SCHEDULER_MISFIRE_GRACE_SECONDS', 86400)
+        self.scheduler = None
+        self.lider_desde = None
+        self._lideranca = None
+        self._parar = threading.Event()
+        self._lock = threading.RLock()
+        self._thread = None
+
+    @property
+    def eh_lider(self):
+        return self.scheduler is not None
+
+    def _criar_lideranca(self):
+        with self.app.app_context():
+            engine = self.db.engine
+        if engine.dialect.name == 'postgresql':
+            return _TravaAdvisory(engine, _int_env('SCHEDULER_LOCK_ID', CHAVE_ADVISORY_PADRAO))
+        from models import AgendadorLideranca
+        return _Arrendamento(engine, AgendadorLideranca.__table__, self.dono, self.duracao)
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name='agendador-eleicao', daemon=True)
+        self._thread.start()
+        logger.info(f"Eleição do scheduler iniciada ({self.dono})")
+
+    def parar(self):
+        self._parar.set()
+        with self._lock:
+            self._perder_lideranca('processo encerrando')
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                with self._lock:
+                    self._ciclo()
+            except Exception as e:
+                logger.error(f"Erro na eleição do scheduler: {e}")
+                with self._lock:
+                    self._perder_lideranca(e)
+            self._parar.wait(self.heartbeat)
+
+    def _ciclo(self):
+        if self._lideranca is None:
+            self._lideranca = self._criar_lideranca()
+        if self.eh_lider:
+            if not self._lideranca.renovar():
+                self._perder_lideranca('arrendamento tomado por outro processo')
+                return
+            self.sincronizar()
+        elif self._lideranca.adquirir():
+            self._assumir()
+
+    def _assumir(self):
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        opcoes = {}
+        if os.environ.get('SCHEDULER_TIMEZONE'):
+            opcoes['timezone'] = os.environ['SCHEDULER_TIMEZONE']
+        scheduler = BackgroundScheduler(
+            jobstores={'default': SQLAlchemyJobStore(engine=self._lideranca.engine)},
+            job_defaults={
+                'coalesce': True,  # Várias execuções perdidas viram uma só
+                'max_instances': 1,
+                'misfire_grace_time': self.misfire_grace,
+            },
+            **opcoes
+        )
+        # Pausado até os jobs serem conferidos com a configuração atual
+        scheduler.start(paused=True)
+        self.scheduler = scheduler
+        self.lider_desde = _agora()
+        self.sincronizar()
+        scheduler.resume()
+        _registrar_lideranca(True)
+        logger.info(f"Scheduler: este processo assumiu a liderança ({self._lideranca.estrategia})")
+
+    def _perder_lideranca(self, motivo):
+        scheduler, self.scheduler = self.scheduler, None
+        if scheduler is not None:
+            try:
+                scheduler.shutdown(wait=False)
+            except Exception:
+                pass
+            _registrar_lideranca(False)
+            logger.warning(f"Scheduler: liderança perdida ({motivo})")
+        self.lider_desde = None
+        if self._lideranca is not None:
+            self._lideranca.liberar()
+
+    def sincronizar(self):
+        """Aplica a configuração atual aos jobs; sem efeito fora do líder."""
+        with self._lock:
+            if not self.eh_lider:
+                return False
+            with self.app.app_context():
+                self.configurar_jobs(self.scheduler)
+            return True
+
+    def estado(self):
+        jobs = []
+        if self.eh_lider:
+            jobs = [
+                {'id': job.id, 'trigger': str(job.trigger),
+                 'proxima_execucao': job.next_run_time.isoformat() if job.next_run_time else None}
+                for job in self.scheduler.get_jobs()
+            ]
+        return {
+            'processo': self.dono,
+            'lider': self.eh_lider,
+            'lider_desde': self.lider_desde.isoformat() if self.lider_desde else None,
+            'estrategia': getattr(self._lideranca, 'estrategia', None),
+            'heartbeat_segundos': self.heartbeat,
+            'jobs': jobs,
+        }
+
+
+def _registrar_lideranca(lider):
+    from utils.metrics import registrar_lideranca_scheduler
+    registrar_lideranca_scheduler(lider)
+
+
+_agendador = None
+_agendador_pid = None
+_inicio_lock = threading.Lock()
+
+
+def iniciar_agendador(app, db, configurar_jobs):
+    """Inicia a eleição neste processo (idempotente; respeita ``SCHEDULER_ENABLED``)."""
+    global _agendador, _agendador_pid
+    if not agendador_habilitado():
+        return None
+    with _inicio_lock:
+        # Após um fork o objeto herdado não tem a thread de eleição
+        if _agendador is None or _agendador_pid != os.getpid():
+            _agendador = AgendadorDistribuido(app, db, configurar_jobs)
+            _agendador_pid = os.getpid()
+            _agendador.iniciar()
+    return _agendador
+
+
+def obter_agendador():
+    return _agendador if _agendador_pid == os.getpid() else None
+
+
+def parar_agendador():
+    agendador = obter_agendador()
+    if agendador is not None:
+        agendador.parar()
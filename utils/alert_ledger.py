@@ -0,0 +1,238 @@
+# utils/alert_ledger.py
+"""Ledger das execuções de alertas de vencimento.
+
+Cada entrega (registro, responsável, dia) recebe a chave de idempotência
+``alerta:{data}:{registro}:{responsavel}`` em ``alert_delivery``. A chave é
+reservada (``pendente``) e gravada antes do envio, então uma segunda execução
+no mesmo dia pula o que já foi entregue. ``alert_run`` guarda o último
+registro concluído; uma execução interrompida (heartbeat parado há mais de
+``ALERTA_EXECUCAO_TIMEOUT`` segundos) é retomada desse ponto.
+
+As gravações usam conexões próprias (Core) para não expirar os objetos da
+sessão ORM usados na renderização dos emails.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+STATUS_CONCLUIDOS = ('enviado', 'simulado')
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def chave_entrega(data, registro_id, responsavel_id):
+    return f"alerta:{data.isoformat()}:{registro_id}:{responsavel_id}"
+
+
+class ExecucaoEmAndamento(Exception):
+    """Outra execução do mesmo dia ainda está ativa."""
+
+    def __init__(self, run_id):
+        super().__init__(f"Execução de alertas #{run_id} ainda em andamento")
+        self.run_id = run_id
+
+
+class ExecucaoAlertas:
+    """Execução (nova ou retomada) do envio de alertas de um dia."""
+
+    def __init__(self, run_id, data, checkpoint_registro_id=0, retomada=False):
+        self.id = run_id
+        self.data = data
+        self.checkpoint_registro_id = checkpoint_registro_id
+        self.retomada = retomada
+        self.enviados = 0
+        self.ignorados = 0
+        self.falhas = 0
+        self.max_tentativas = _int_env('ALERTA_MAX_TENTATIVAS', 3)
+        self._concluidas = None
+        self._resultados = []
+
+    @staticmethod
+    def _engine():
+        from models import db
+        return db.engine
+
+    @classmethod
+    def iniciar(cls, data, origem='agendado'):
+        """Retoma a execução interrompida do dia ou cria uma nova.
+
+        Levanta :class:`ExecucaoEmAndamento` se a execução do dia ainda
+        estiver viva (heartbeat recente).
+        """
+        from models import AlertRun
+        tabela = AlertRun.__table__
+        agora = datetime.now()
+        limite = agora - timedelta(seconds=_int_env('ALERTA_EXECUCAO_TIMEOUT', 600))
+
+        with cls._engine().begin() as conexao:
+            anterior = conexao.execute(
+                select(tabela.c.id, tabela.c.atualizado_em, tabela.c.checkpoint_registro_id)
+                .where(tabela.c.data_referencia == data, tabela.c.status == 'em_andamento')
+                .order_by(tabela.c.id.desc())
+                .limit(1)
+            ).first()
+            if anterior is not None:
+                if anterior.atualizado_em > limite:
+                    raise ExecucaoEmAndamento(anterior.id)
+                # Reivindica a retomada; outro processo pode ter chegado primeiro
+                reivindicada = conexao.execute(
+                    update(tabela)
+                    .where(tabela.c.id == anterior.id, tabela.c.atualizado_em == anterior.atualizado_em)
+                    .values(atualizado_em=agora, retomadas=tabela.c.retomadas + 1)
+                )
+                if reivindicada.rowcount != 1:
+                    raise ExecucaoEmAndamento(anterior.id)
+                logger.warning(
+                    f"Retomando execução de alertas #{anterior.id} após o registro {anterior.checkpoint_registro_id}"
+                )
+                return cls(anterior.id, data, anterior.checkpoint_registro_id, retomada=True)
+
+            run_id = conexao.execute(tabela.insert().values(
+                data_referencia=data, origem=origem, status='em_andamento', checkpoint_registro_id=0,
+                enviados=0, ignorados=0, falhas=0, retomadas=0, iniciado_em=agora, atualizado_em=agora
+            )).inserted_primary_key[0]
+        logger.info(f"Execução de alertas #{run_id} iniciada ({origem})")
+        return cls(run_id, data)
+
+    def concluidas(self):
+        """Chaves do dia que não devem ser reenviadas (uma consulta por execução)."""
+        if self._concluidas is None:
+            from models import AlertDelivery
+            tabela = AlertDelivery.__table__
+            prefixo = f"alerta:{self.data.isoformat()}:"
+            with self._engine().connect() as conexao:
+                linhas = conexao.execute(
+                    select(tabela.c.chave, tabela.c.status, tabela.c.tentativas)
+                    .where(tabela.c.chave.startswith(prefixo))
+                ).all()
+            self._concluidas = {
+                chave for chave, status, tentativas in linhas
+                if status in STATUS_CONCLUIDOS or tentativas >= self.max_tentativas
+            }
+        return self._concluidas
+
+    def reservar(self, registro_id, responsavel_id, email):
+        """Reserva a entrega antes do envio; retorna o id da entrega ou None se já foi feita."""
+        from models import AlertDelivery
+        tabela = AlertDelivery.__table__
+        chave = chave_entrega(self.data, registro_id, responsavel_id)
+        if chave in self.concluidas():
+            self.ignorados += 1
+            return None
+
+        agora = datetime.now()
+        try:
+            with self._engine().begin() as conexao:
+                self._gravar_resultados(conexao)
+                entrega_id = conexao.execute(tabela.insert().values(
+                    chave=chave, run_id=self.id, registro_id=registro_id, responsavel_id=responsavel_id,
+                    email=email, status='pendente', tentativas=1, atualizado_em=agora
+                )).inserted_primary_key[0]
+            self._resultados = []
+            return entrega_id
+        except IntegrityError:
+            pass
+
+        # Já existe: nova tentativa de falha anterior ou pendente de execução interrompida
+        with self._engine().begin() as conexao:
+            self._gravar_resultados(conexao)
+            linha = conexao.execute(
+                select(tabela.c.id, tabela.c.status, tabela.c.tentativas).where(tabela.c.chave == chave)
+            ).first()
+            entrega_id = None
+            if (linha is not None and linha.status not in STATUS_CONCLUIDOS
+                    and linha.tentativas < self.max_tentativas):
+                conexao.execute(
+                    update(tabela).where(tabela.c.id == linha.id)
+                    .values(run_id=self.id, status='pendente', email=email,
+                            tentativas=tabela.c.tentativas + 1, erro=None, atualizado_em=agora)
+                )
+                entrega_id = linha.id
+        self._resultados = []
+        if entrega_id is None:
+            self.ignorados += 1
+        return entrega_id
+
+    def concluir(self, entrega_id, status, erro=None):
+        """Registra o resultado de uma entrega reservada ('enviado', 'simulado' ou 'falha').
+
+        A gravação vai na transação seguinte (próxima reserva ou checkpoint),
+        economizando um commit por email; se o processo morrer antes dela, só
+        essa entrega fica ``pendente`` e é repetida na retomada.
+        """
+        self._resultados.append((entrega_id, status, erro, datetime.now()))
+        if status == 'falha':
+            self.falhas += 1
+        else:
+            self.enviados += 1
+
+    def _gravar_resultados(self, conexao):
+        if not self._resultados:
+            return
+        from models import AlertDelivery
+        tabela = AlertDelivery.__table__
+        for entrega_id, status, erro, momento in self._resultados:
+            conexao.execute(
+                update(tabela).where(tabela.c.id == entrega_id)
+                .values(status=status, erro=erro, atualizado_em=momento)
+            )
+
+    def _atualizar(self, **valores):
+        from models import AlertRun
+        tabela = AlertRun.__table__
+        valores.setdefault('atualizado_em', datetime.now())
+        with self._engine().begin() as conexao:
+            self._gravar_resultados(conexao)
+            conexao.execute(
+                update(tabela).where(tabela.c.id == self.id).values(
+                    enviados=tabela.c.enviados + self.enviados,
+                    ignorados=tabela.c.ignorados + self.ignorados,
+                    falhas=tabela.c.falhas + self.falhas,
+                    **valores
+                )
+            )
+        self._resultados = []
+        self.enviados = self.ignorados = self.falhas = 0
+
+    def checkpoint(self, registro_id):
+        """Marca o registro como concluído (também serve de heartbeat)."""
+        self.checkpoint_registro_id = registro_id
+        self._atualizar(checkpoint_registro_id=registro_id)
+
+    def finalizar(self, erro=None):
+        agora = datetime.now()
+        self._atualizar(status='falhou' if erro else 'concluida', erro=erro, concluido_em=agora,
+                        atualizado_em=agora)
+        logger.info(f"Execução de alertas #{self.id} {'falhou' if erro else 'concluída'}")
+
+    def resumo(self):
+        from models import AlertRun
+        tabela = AlertRun.__table__
+        with self._engine().connect() as conexao:
+            linha = conexao.execute(
+                select(tabela.c.enviados, tabela.c.ignorados, tabela.c.falhas, tabela.c.status)
+                .where(tabela.c.id == self.id)
+            ).first()
+        return {'run_id': self.id, 'enviados': linha.enviados, 'ignorados': linha.ignorados,
+                'falhas': linha.falhas, 'status': linha.status, 'retomada': self.retomada}
+
+
+def execucoes_recentes(limite=20):
+    """Últimas execuções para diagnóstico."""
+    from models import AlertRun
+    tabela = AlertRun.__table__
+    with ExecucaoAlertas._engine().connect() as conexao:
+        linhas = conexao.execute(select(tabela).order_by(tabela.c.id.desc()).limit(limite)).mappings().all()
+    return [
+        {chave: (valor.isoformat() if hasattr(valor, 'isoformat') else valor) for chave, valor in linha.items()}
+        for linha in linhas
+    ]
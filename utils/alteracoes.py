@@ -0,0 +1,104 @@
+# utils/alteracoes.py
+"""Feed de alterações de registros e responsáveis (``updated_since``).
+
+``created_at``/``updated_at`` (UTC) são preenchidos pelas colunas dos modelos
+em ``INSERT``/``UPDATE``; os eventos da sessão ligados por
+:func:`registrar_eventos` cobrem o que não é ``UPDATE`` da própria linha:
+mudanças na lista de responsáveis de um registro e a exclusão de um
+responsável (os registros dele mudam). Cada exclusão grava uma marca em
+``exclusao`` (tombstone), para que o consumidor do feed também remova a linha.
+
+O feed devolve as linhas com ``updated_at`` em ``(desde, corte]``, em ordem de
+``(updated_at, id)``, paginadas por cursor. O ``corte`` fica
+``API_FEED_ATRASO_SEGUNDOS`` no passado: transações ainda abertas gravam
+``updated_at`` antes do commit e apareceriam depois de um ``watermark`` que já
+as teria deixado para trás. Pelo mesmo motivo as rotas do feed não usam a
+réplica: o atraso dela pode passar do ``corte``.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, event, or_
+
+from models import db, agora_utc, Exclusao, Registro, Responsavel
+
+logger = logging.getLogger(__name__)
+
+_eventos_registrados = False
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+# --- Eventos da sessão ---
+
+def _marcar_alteracoes(session, flush_context, instances):
+    agora = agora_utc()
+    for obj in session.dirty:
+        # Responsável só muda pelos próprios campos; registro também pela lista de responsáveis
+        if isinstance(obj, Registro) and session.is_modified(obj):
+            obj.updated_at = agora
+        elif isinstance(obj, Responsavel) and session.is_modified(obj, include_collections=False):
+            obj.updated_at = agora
+    for obj in list(session.deleted):
+        if not isinstance(obj, (Registro, Responsavel)):
+            continue
+        session.add(Exclusao(tabela=obj.__tablename__, objeto_id=obj.id, excluido_em=agora))
+        if isinstance(obj, Responsavel):
+            for registro in obj.registros:
+                if registro not in session.deleted:
+                    registro.updated_at = agora
+
+
+def registrar_eventos():
+    """Mantém ``updated_at`` e as marcas de exclusão a cada flush da sessão."""
+    global _eventos_registrados
+    if _eventos_registrados:
+        return
+    event.listen(db.session, 'before_flush', _marcar_alteracoes)
+    _eventos_registrados = True
+
+
+# --- Consulta do feed ---
+
+def converter_momento(valor):
+    """ISO 8601 para UTC sem fuso (sem fuso no texto, já é UTC); ``ValueError`` se inválido."""
+    valor = valor.strip()
+    if valor.endswith('Z'):
+        valor = valor[:-1] + '+00:00'
+    momento = datetime.fromisoformat(valor)
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def corte_atual():
+    return agora_utc() - timedelta(seconds=_int_env('API_FEED_ATRASO_SEGUNDOS', 5))
+
+
+def alteracoes(query, modelo, desde, corte, depois=None, limite=100):
+    """Linhas de ``query`` alteradas em ``(desde, corte]``; retorna ``(linhas, ha_mais)``.
+
+    ``depois`` é o ``(updated_at, id)`` da última linha da página anterior.
+    """
+    query = query.filter(modelo.updated_at <= corte)
+    if depois is not None:
+        momento, ultimo_id = depois
+        query = query.filter(or_(modelo.updated_at > momento,
+                                 and_(modelo.updated_at == momento, modelo.id > ultimo_id)))
+    elif desde is not None:
+        query = query.filter(modelo.updated_at > desde)
+    linhas = query.order_by(modelo.updated_at, modelo.id).limit(limite + 1).all()
+    return linhas[:limite], len(linhas) > limite
+
+
+def exclusoes(tabela, inicio, fim):
+    """Marcas de exclusão de ``tabela`` em ``(inicio, fim]`` (``inicio`` ``None``: desde sempre)."""
+    query = Exclusao.query.filter(Exclusao.tabela == tabela, Exclusao.excluido_em <= fim)
+    if inicio is not None:
+        query = query.filter(Exclusao.excluido_em > inicio)
+    return query.order_by(Exclusao.excluido_em, Exclusao.id).all()
@@ -0,0 +1,229 @@
+# utils/ao_vivo.py
+"""Contadores do ``/dashboard`` ao vivo (SSE com long-polling de reserva).
+
+Cada processo web tem um :class:`Publicador`: uma thread que guarda o último
+resumo de status (:func:`utils.status_rollup.resumo_status`) e acorda os
+assinantes quando ele muda. Os assinantes (conexões de ``/stream/dashboard``)
+não consultam o banco; só a thread do publicador consulta, e apenas quando:
+
+* um commit deste processo alterou registros (eventos da sessão ligados por
+  :func:`registrar_eventos` chamam :func:`avisar_alteracao`), ou
+* a cada ``STREAM_INTERVALO_SEGUNDOS``, se a versão de ``registro`` em
+  ``tabela_versao`` mudou (escritas de outros workers, do scheduler, do
+  ``manage_db.py``) ou o dia virou.
+
+Com muitos painéis abertos, cada mudança vira uma consulta por processo em
+vez de uma recarga de página por painel.
+
+As conexões ficam abertas: exigem worker com threads ou assíncrono
+(``GUNICORN_WORKER_CLASS=gthread`` ou ``gevent``). Em workers ``sync`` a
+página usa polling simples (:func:`modo_ao_vivo`). Em ``gthread`` cada conexão
+aberta ocupa uma thread do worker, então o número de conexões (SSE e
+long-polling) por processo é limitado (:func:`limite_conexoes`); acima do
+limite, ``/stream/dashboard`` responde 204 e o navegador passa ao polling.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import event
+
+from models import db, Registro
+
+logger = logging.getLogger(__name__)
+
+_CHAVE_ALTERADO = 'ao_vivo_registros_alterados'
+_estado = {'pid': None, 'publicador': None}
+_lock = threading.Lock()
+_eventos_registrados = False
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def modo_ao_vivo():
+    """``'sse'`` se o servidor suporta conexões longas; ``'polling'`` em workers sync."""
+    classe = os.environ.get('GUNICORN_WORKER_CLASS')
+    if classe == 'sync' and _int_env('GUNICORN_THREADS', 1) <= 1:
+        return 'polling'
+    return 'sse'
+
+
+def limite_conexoes():
+    """Conexões abertas por processo (``STREAM_MAX_CONEXOES``); 0 é sem limite.
+
+    Padrão: sem limite em workers assíncronos (``gevent``, ``eventlet``); nos
+    demais, ``GUNICORN_THREADS - 1``, deixando uma thread para as outras
+    requisições.
+    """
+    valor = os.environ.get('STREAM_MAX_CONEXOES')
+    if valor not in (None, ''):
+        return int(valor)
+    if os.environ.get('GUNICORN_WORKER_CLASS') in ('gevent', 'eventlet'):
+        return 0
+    return max(1, _int_env('GUNICORN_THREADS', 1) - 1)
+
+
+def diferenca(anterior, atual):
+    """Só os contadores que mudaram, como ``atual - anterior`` (um nível de dict aninhado)."""
+    delta = {}
+    for chave, valor in atual.items():
+        if isinstance(valor, dict):
+            interno = diferenca(anterior.get(chave) or {}, valor)
+            if interno:
+                delta[chave] = interno
+        elif valor != anterior.get(chave, 0):
+            delta[chave] = valor - anterior.get(chave, 0)
+    for chave, valor in anterior.items():
+        if chave not in atual and not isinstance(valor, dict) and valor:
+            delta[chave] = -valor
+    return delta
+
+
+class Publicador:
+    """Último resumo de status do processo e a fila de espera dos assinantes."""
+
+    def __init__(self, app):
+        self.app = app
+        self.versao = None
+        self.contadores = None
+        self.assinantes = 0
+        self._condicao = threading.Condition()
+        self._aviso = threading.Event()
+        self._thread = None
+
+    def avisar(self):
+        self._aviso.set()
+
+    def assinar(self, limite=0):
+        """Conta um assinante; ``False`` (sem contar) se já há ``limite`` assinantes (0: sem limite)."""
+        with self._condicao:
+            if limite and self.assinantes >= limite:
+                return False
+            self.assinantes += 1
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, name='publicador-dashboard', daemon=True)
+            self._thread.start()
+        if self.versao is None:
+            self.avisar()
+        return True
+
+    def cancelar(self):
+        with self._condicao:
+            self.assinantes -= 1
+
+    def aguardar(self, versao, timeout):
+        """Espera até ``timeout`` por um resumo diferente de ``versao``; retorna ``(versao, contadores)``."""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self.versao is not None and self.versao != versao, timeout)
+            return self.versao, self.contadores
+
+    def atualizar(self):
+        """Relê a versão de ``registro`` e, se mudou, o resumo de status."""
+        from utils.etag import versoes
+        from utils.status_rollup import resumo_status
+
+        with self.app.app_context():
+            try:
+                # O status depende do dia: a virada também muda a versão
+                versao = f"{date.today().isoformat()}.{versoes(['registro'])['registro']}"
+                if versao == self.versao:
+                    return
+                contadores = resumo_status()
+            finally:
+                db.session.remove()
+        with self._condicao:
+            self.versao = versao
+            self.contadores = contadores
+            self._condicao.notify_all()
+
+    def _executar(self):
+        intervalo = _int_env('STREAM_INTERVALO_SEGUNDOS', 5)
+        while True:
+            self._aviso.wait(intervalo)
+            self._aviso.clear()
+            if not self.assinantes:
+                continue
+            try:
+                self.atualizar()
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar contadores do dashboard: {e}")
+
+
+def obter_publicador(app):
+    """Publicador deste processo (criado no primeiro uso, depois do fork)."""
+    with _lock:
+        if _estado['pid'] != os.getpid():
+            _estado.update(pid=os.getpid(), publicador=Publicador(app))
+        return _estado['publicador']
+
+
+def avisar_alteracao():
+    publicador = _estado['publicador']
+    if publicador is not None and _estado['pid'] == os.getpid():
+        publicador.avisar()
+
+
+# --- Eventos da sessão ---
+
+def _marcar_alteracao(session, flush_context, instances):
+    if any(isinstance(obj, Registro) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info[_CHAVE_ALTERADO] = True
+
+
+def _depois_commit(session):
+    if session.info.pop(_CHAVE_ALTERADO, False):
+        avisar_alteracao()
+
+
+def _descartar(session, previous_transaction=None):
+    session.info.pop(_CHAVE_ALTERADO, None)
+
+
+def registrar_eventos():
+    """Avisa o publicador a cada commit que altera registros."""
+    global _eventos_registrados
+    if _eventos_registrados:
+        return
+    event.listen(db.session, 'before_flush', _marcar_alteracao)
+    event.listen(db.session, 'after_commit', _depois_commit)
+    event.listen(db.session, 'after_soft_rollback', _descartar)
+    _eventos_registrados = True
+
+
+# --- Respostas ---
+
+def evento_sse(versao, contadores, delta):
+    dados = json.dumps({'versao': versao, 'contadores': contadores, 'delta': delta})
+    return f'event: contadores\nid: {versao}\ndata: {dados}\n\n'
+
+
+def fluxo_sse(publicador, ultima_versao=None):
+    """Gerador de ``/stream/dashboard`` para um assinante já contado em ``publicador``.
+
+    O primeiro evento traz os contadores completos (omitido se o navegador
+    reconectou já na versão atual); os seguintes, o que mudou em ``delta``.
+    Comentários a cada ``STREAM_HEARTBEAT_SEGUNDOS`` mantêm a conexão viva e
+    detectam clientes que saíram; depois de ``STREAM_MAX_SEGUNDOS`` a conexão
+    é encerrada e o navegador reconecta. Quem cancela a assinatura é a rota,
+    ao fechar a resposta (o gerador pode nem chegar a iniciar).
+    """
+    heartbeat = _int_env('STREAM_HEARTBEAT_SEGUNDOS', 15)
+    limite = time.monotonic() + _int_env('STREAM_MAX_SEGUNDOS', 300)
+    yield f"retry: {_int_env('STREAM_RECONEXAO_MS', 3000)}\n\n"
+    versao, anteriores = ultima_versao, None
+    while time.monotonic() < limite:
+        nova, contadores = publicador.aguardar(versao, heartbeat)
+        if nova is None or nova == versao:
+            yield ': ping\n\n'
+            continue
+        delta = diferenca(anteriores, contadores) if anteriores is not None else {}
+        if anteriores is None or delta:
+            yield evento_sse(nova, contadores, delta)
+        versao, anteriores = nova, contadores
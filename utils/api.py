@@ -0,0 +1,180 @@
+# utils/api.py
+"""Autenticação por token, cursores e compressão da API JSON (``/api/v1``).
+
+Integrações não usam o cookie de sessão: cada requisição envia
+``Authorization: Bearer <token>``. Os tokens são criados com
+``python manage_db.py create-api-token`` e exibidos uma única vez; o banco
+guarda só o hash SHA-256 (tabela ``api_token``). O token age em nome de um
+usuário e deixa de valer se ele for desativado, se o token expirar ou se for
+revogado (``revoke-api-token``).
+
+A paginação é por cursor (keyset): o cursor leva a coluna de ordenação e os
+valores da última linha devolvida, então cada página é uma consulta por
+índice, sem ``OFFSET``, e não repete nem pula linhas quando registros são
+incluídos entre uma página e outra.
+"""
+
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import update
+
+from models import db, ApiToken, User
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_TOKEN = 'cert_'
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def erro_api(status, mensagem):
+    """Resposta de erro da API: ``{"erro": mensagem}``."""
+    resposta = current_app.response_class(
+        current_app.json.dumps({'erro': mensagem}), status=status, mimetype='application/json'
+    )
+    if status == 401:
+        resposta.headers['WWW-Authenticate'] = 'Bearer'
+    return resposta
+
+
+# --- Tokens ---
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def criar_token(usuario, nome, dias=None):
+    """Grava um token para ``usuario`` e retorna ``(ApiToken, token)``.
+
+    O token em texto só existe no retorno; depois disso não há como recuperá-lo.
+    """
+    token = PREFIXO_TOKEN + secrets.token_urlsafe(32)
+    agora = datetime.now()
+    registro = ApiToken(
+        nome=nome,
+        prefixo=token[:len(PREFIXO_TOKEN) + 6],
+        token_hash=hash_token(token),
+        user_id=usuario.id,
+        criado_em=agora,
+        expira_em=agora + timedelta(days=dias) if dias else None,
+    )
+    db.session.add(registro)
+    db.session.commit()
+    return registro, token
+
+
+def revogar_token(identificador):
+    """Revoga pelo id ou pelo prefixo exibido na criação; retorna o ``ApiToken`` ou ``None``."""
+    filtro = ApiToken.id == int(identificador) if str(identificador).isdigit() else ApiToken.prefixo == identificador
+    registro = ApiToken.query.filter(filtro).first()
+    if registro is not None and registro.revogado_em is None:
+        registro.revogado_em = datetime.now()
+        db.session.commit()
+    return registro
+
+
+def autenticar_token(token):
+    """``ApiToken`` válido para ``token`` (não revogado, não expirado, usuário ativo) ou ``None``."""
+    if not token or not token.startswith(PREFIXO_TOKEN):
+        return None
+    registro = ApiToken.query.filter_by(token_hash=hash_token(token)).first()
+    agora = datetime.now()
+    if (registro is None or registro.revogado_em is not None
+            or (registro.expira_em is not None and registro.expira_em <= agora)
+            or registro.user is None or registro.user.status != 'ativo'):
+        return None
+
+    # Último uso gravado no máximo a cada API_TOKEN_USO_INTERVALO segundos
+    intervalo = timedelta(seconds=_int_env('API_TOKEN_USO_INTERVALO', 300))
+    if registro.ultimo_uso_em is None or agora - registro.ultimo_uso_em >= intervalo:
+        try:
+            db.session.execute(
+                update(ApiToken).where(ApiToken.id == registro.id).values(ultimo_uso_em=agora)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Falha ao registrar uso do token {registro.prefixo}: {e}")
+    return registro
+
+
+def api_token_required(f):
+    """Exige ``Authorization: Bearer <token>``; o usuário do token fica em ``g.api_usuario``."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        esquema, _, token = request.headers.get('Authorization', '').partition(' ')
+        if esquema.lower() != 'bearer' or not token.strip():
+            return erro_api(401, 'Token de API ausente. Use o cabeçalho Authorization: Bearer <token>.')
+        registro = autenticar_token(token.strip())
+        if registro is None:
+            return erro_api(401, 'Token de API inválido, expirado ou revogado.')
+        g.api_token = registro
+        g.api_usuario = registro.user
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def tokens_do_usuario(username):
+    return (ApiToken.query.join(User, ApiToken.user_id == User.id)
+            .filter(User.username == username)
+            .order_by(ApiToken.criado_em.desc()).all())
+
+
+# --- Paginação ---
+
+def limite_pagina(valor):
+    """``?limit=`` dentro de 1..``API_LIMITE_MAXIMO`` (padrão ``API_LIMITE_PADRAO``)."""
+    maximo = _int_env('API_LIMITE_MAXIMO', 1000)
+    if valor in (None, ''):
+        return min(_int_env('API_LIMITE_PADRAO', 100), maximo)
+    limite = int(valor)
+    if limite < 1:
+        raise ValueError('limit deve ser maior que zero')
+    return min(limite, maximo)
+
+
+def codificar_cursor(dados):
+    texto = json.dumps(dados, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Dict do cursor; ``ValueError`` se ele não veio de :func:`codificar_cursor`."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        dados = json.loads(texto)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('cursor inválido') from e
+    if not isinstance(dados, dict):
+        raise ValueError('cursor inválido')
+    return dados
+
+
+# --- Compressão ---
+
+def comprimir_resposta(resposta):
+    """``after_request`` do blueprint: gzip se o cliente aceita e o corpo passa de ``API_GZIP_MIN_BYTES``."""
+    resposta.vary.add('Accept-Encoding')
+    if (resposta.status_code != 200 or resposta.direct_passthrough
+            or 'Content-Encoding' in resposta.headers
+            or not request.accept_encodings['gzip']):
+        return resposta
+    corpo = resposta.get_data()
+    if len(corpo) < _int_env('API_GZIP_MIN_BYTES', 1024):
+        return resposta
+    resposta.set_data(gzip.compress(corpo, compresslevel=_int_env('API_GZIP_NIVEL', 6)))
+    resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
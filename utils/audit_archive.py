@@ -0,0 +1,372 @@
+# utils/audit_archive.py
+"""Particionamento mensal, retenção e arquivamento das tabelas de auditoria.
+
+No PostgreSQL as tabelas de histórico são convertidas em tabelas particionadas
+por intervalo mensal (``PARTITION BY RANGE``). No SQLite, que não possui
+particionamento, os meses fechados são movidos para tabelas-sombra
+(``<tabela>_pAAAA_MM``) antes da exportação.
+
+Em ambos os casos o arquivamento segue o mesmo fluxo:
+
+1. o mês expirado é separado da tabela quente (DETACH PARTITION ou tabela-sombra);
+2. as linhas são exportadas para ``<HISTORY_ARCHIVE_DIR>/<tabela>/<tabela>_AAAA_MM.ndjson.gz``;
+3. a partição/tabela-sombra é removida.
+
+Se o processo for interrompido entre os passos, a próxima execução encontra a
+tabela-sombra pendente e conclui a exportação.
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Tabela de auditoria -> coluna temporal usada como chave de partição
+TABELAS_AUDITORIA = {
+    'user_history': 'created_at',
+    'role_history': 'timestamp',
+    'registro_history': 'created_at',
+}
+
+# Chaves estrangeiras recriadas na tabela particionada
+_CHAVES_ESTRANGEIRAS = {
+    'user_history': ('user_id', '"user"(id)'),
+    'role_history': ('role_id', 'role(id)'),
+}
+
+# Índices recriados na tabela particionada
+_INDICES = {
+    'user_history': ['user_id', 'acao', 'usuario', 'created_at'],
+    'role_history': ['role_id', 'timestamp'],
+    'registro_history': ['registro_id', 'acao', 'usuario', 'created_at'],
+}
+
+_PADRAO_PARTICAO = re.compile(r'^(?P<tabela>[a-z_]+)_p(?P<ano>\d{4})_(?P<mes>\d{2})$')
+
+
+def get_retention_months():
+    """Meses mantidos na tabela quente antes do arquivamento."""
+    return int(os.environ.get('HISTORY_RETENTION_MONTHS', 12))
+
+
+def get_archive_dir():
+    """Diretório raiz dos arquivos NDJSON comprimidos."""
+    return Path(os.environ.get('HISTORY_ARCHIVE_DIR', 'archives'))
+
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _inicio_mes(ano, mes):
+    return date(ano, mes, 1)
+
+
+def _somar_meses(dia, meses):
+    """Retorna o primeiro dia do mês deslocado em ``meses``."""
+    total = dia.year * 12 + (dia.month - 1) + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _nome_particao(tabela, inicio):
+    return f'{tabela}_p{inicio.year:04d}_{inicio.month:02d}'
+
+
+def data_corte(hoje=None, meses=None):
+    """Primeiro dia do mês mais antigo mantido na tabela quente."""
+    hoje = hoje or date.today()
+    meses = get_retention_months() if meses is None else meses
+    return _somar_meses(date(hoje.year, hoje.month, 1), -meses)
+
+
+# --- PostgreSQL: particionamento nativo ---
+
+def is_particionada(tabela):
+    """Indica se a tabela já é particionada (somente PostgreSQL)."""
+    if not _is_postgres():
+        return False
+    resultado = db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :tabela"
+    ), {'tabela': tabela}).first()
+    return resultado is not None
+
+
+def garantir_particoes(tabela, meses_futuros=3, desde=None):
+    """Cria as partições mensais ausentes de ``desde`` até ``meses_futuros`` à frente.
+
+    Executada pelo job mensal do scheduler (``tarefas.job_particoes_historico``).
+    Se a partição padrão já recebeu linhas de um mês ainda sem partição, o
+    PostgreSQL recusa criá-la; nesse caso, em uma transação, a partição padrão
+    é desanexada, a do mês é criada, as linhas do mês passam para ela e a
+    partição padrão é anexada de novo.
+    """
+    coluna = TABELAS_AUDITORIA[tabela]
+    padrao = f'{tabela}_default'
+    hoje = date.today()
+    inicio = desde or date(hoje.year, hoje.month, 1)
+    fim = _somar_meses(date(hoje.year, hoje.month, 1), meses_futuros)
+    existentes = set(inspect(db.engine).get_table_names())
+    com_padrao = padrao in _particoes_anexadas(tabela)
+    criadas = []
+    while inicio <= fim:
+        proximo = _somar_meses(inicio, 1)
+        nome = _nome_particao(tabela, inicio)
+        if nome in existentes:
+            # Anexada ou tabela-sombra ainda não exportada
+            inicio = proximo
+            continue
+        limites = f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{proximo.isoformat()}')"
+        params = {'inicio': inicio, 'fim': proximo}
+        filtro = f'"{coluna}" >= :inicio AND "{coluna}" < :fim'
+        ocupado = com_padrao and db.session.execute(
+            text(f'SELECT 1 FROM {padrao} WHERE {filtro} LIMIT 1'), params
+        ).first() is not None
+        if ocupado:
+            db.session.execute(text(f'ALTER TABLE {tabela} DETACH PARTITION {padrao}'))
+            db.session.execute(text(f'CREATE TABLE {nome} PARTITION OF {tabela} {limites}'))
+            movidas = db.session.execute(
+                text(f'INSERT INTO {nome} SELECT * FROM {padrao} WHERE {filtro}'), params
+            ).rowcount
+            db.session.execute(text(f'DELETE FROM {padrao} WHERE {filtro}'), params)
+            db.session.execute(text(f'ALTER TABLE {tabela} ATTACH PARTITION {padrao} DEFAULT'))
+            logger.info(f'{movidas} linhas de {padrao} movidas para a nova partição {nome}')
+        else:
+            db.session.execute(text(f'CREATE TABLE IF NOT EXISTS {nome} PARTITION OF {tabela} {limites}'))
+        db.session.commit()
+        criadas.append(nome)
+        inicio = proximo
+    return criadas
+
+
+def particionar_tabela(tabela, meses_futuros=3):
+    """Converte uma tabela de auditoria existente em tabela particionada por mês.
+
+    A conversão é feita em uma única transação: a tabela original é renomeada,
+    a nova tabela particionada é criada com a mesma estrutura e os dados são
+    copiados para as partições correspondentes.
+    """
+    if not _is_postgres():
+        raise RuntimeError('Particionamento nativo disponível apenas no PostgreSQL')
+    if is_particionada(tabela):
+        garantir_particoes(tabela, meses_futuros)
+        return False
+
+    coluna = TABELAS_AUDITORIA[tabela]
+    legado = f'{tabela}_legado'
+    sequencia = f'{tabela}_id_seq'
+
+    db.session.execute(text(f'ALTER TABLE {tabela} RENAME TO {legado}'))
+    db.session.execute(text(f'ALTER TABLE {legado} RENAME CONSTRAINT {tabela}_pkey TO {legado}_pkey'))
+    # A chave de partição precisa ser NOT NULL para compor a chave primária
+    db.session.execute(text(f'UPDATE {legado} SET "{coluna}" = now() WHERE "{coluna}" IS NULL'))
+    db.session.execute(text(f'ALTER TABLE {legado} ALTER COLUMN "{coluna}" SET NOT NULL'))
+    db.session.execute(text(
+        f'CREATE TABLE {tabela} (LIKE {legado} INCLUDING DEFAULTS) PARTITION BY RANGE ("{coluna}")'
+    ))
+    db.session.execute(text(f'ALTER TABLE {tabela} ADD PRIMARY KEY (id, "{coluna}")'))
+
+    primeiro = db.session.execute(text(f'SELECT min("{coluna}") FROM {legado}')).scalar()
+    desde = date(primeiro.year, primeiro.month, 1) if primeiro else None
+    hoje = date.today()
+    inicio = desde or date(hoje.year, hoje.month, 1)
+    fim = _somar_meses(date(hoje.year, hoje.month, 1), meses_futuros)
+    while inicio <= fim:
+        proximo = _somar_meses(inicio, 1)
+        db.session.execute(text(
+            f'CREATE TABLE {_nome_particao(tabela, inicio)} PARTITION OF {tabela} '
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{proximo.isoformat()}')"
+        ))
+        inicio = proximo
+    # Partição padrão para linhas fora do intervalo (ex.: relógio adiantado)
+    db.session.execute(text(f'CREATE TABLE {tabela}_default PARTITION OF {tabela} DEFAULT'))
+
+    db.session.execute(text(f'INSERT INTO {tabela} SELECT * FROM {legado}'))
+    # A sequência pertence à tabela legada; desassociar antes de removê-la
+    db.session.execute(text(f'ALTER SEQUENCE {sequencia} OWNED BY NONE'))
+    db.session.execute(text(f'DROP TABLE {legado}'))
+
+    for coluna_indice in _INDICES.get(tabela, []):
+        db.session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna_indice} ON {tabela} ("{coluna_indice}")'
+        ))
+    if tabela in _CHAVES_ESTRANGEIRAS:
+        coluna_fk, referencia = _CHAVES_ESTRANGEIRAS[tabela]
+        db.session.execute(text(
+            f'ALTER TABLE {tabela} ADD CONSTRAINT {tabela}_{coluna_fk}_fkey '
+            f'FOREIGN KEY ({coluna_fk}) REFERENCES {referencia} ON DELETE CASCADE'
+        ))
+    db.session.commit()
+    logger.info(f'Tabela {tabela} convertida para particionamento mensal')
+    return True
+
+
+def _particoes_anexadas(tabela):
+    linhas = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :tabela"
+    ), {'tabela': tabela}).scalars().all()
+    return set(linhas)
+
+
+# --- Tabelas-sombra (comuns a PostgreSQL e SQLite) ---
+
+def _tabelas_sombra_pendentes(tabela):
+    """Tabelas ``<tabela>_pAAAA_MM`` que não fazem mais parte da tabela quente."""
+    nomes = inspect(db.engine).get_table_names()
+    anexadas = _particoes_anexadas(tabela) if _is_postgres() else set()
+    pendentes = []
+    for nome in nomes:
+        encontrado = _PADRAO_PARTICAO.match(nome)
+        if encontrado and encontrado.group('tabela') == tabela and nome not in anexadas:
+            inicio = _inicio_mes(int(encontrado.group('ano')), int(encontrado.group('mes')))
+            pendentes.append((nome, inicio))
+    return sorted(pendentes, key=lambda item: item[1])
+
+
+def _separar_meses_expirados(tabela, corte):
+    """Separa da tabela quente todos os meses anteriores ao corte."""
+    coluna = TABELAS_AUDITORIA[tabela]
+    if _is_postgres() and is_particionada(tabela):
+        for nome in sorted(_particoes_anexadas(tabela)):
+            encontrado = _PADRAO_PARTICAO.match(nome)
+            if not encontrado:
+                continue  # partição padrão
+            inicio = _inicio_mes(int(encontrado.group('ano')), int(encontrado.group('mes')))
+            if _somar_meses(inicio, 1) <= corte:
+                db.session.execute(text(f'ALTER TABLE {tabela} DETACH PARTITION {nome}'))
+                db.session.commit()
+        # Linhas expiradas que caíram na partição padrão seguem o caminho genérico
+        tabela_origem = f'{tabela}_default'
+    else:
+        tabela_origem = tabela
+
+    if _is_postgres():
+        meses = db.session.execute(text(
+            f"SELECT DISTINCT date_trunc('month', \"{coluna}\")::date FROM {tabela_origem} "
+            f'WHERE "{coluna}" < :corte'
+        ), {'corte': corte}).scalars().all()
+    else:
+        meses = db.session.execute(text(
+            f"SELECT DISTINCT strftime('%Y-%m-01', \"{coluna}\") FROM {tabela_origem} "
+            f'WHERE "{coluna}" < :corte'
+        ), {'corte': corte.strftime('%Y-%m-%d 00:00:00')}).scalars().all()
+
+    for mes in meses:
+        inicio = mes if isinstance(mes, date) else datetime.strptime(mes, '%Y-%m-%d').date()
+        fim = _somar_meses(inicio, 1)
+        sombra = _nome_particao(tabela, inicio)
+        if _is_postgres():
+            params = {'inicio': inicio, 'fim': fim}
+        else:
+            params = {'inicio': inicio.strftime('%Y-%m-%d 00:00:00'), 'fim': fim.strftime('%Y-%m-%d 00:00:00')}
+        filtro = f'"{coluna}" >= :inicio AND "{coluna}" < :fim'
+        if sombra in inspect(db.engine).get_table_names():
+            db.session.execute(text(f'INSERT INTO {sombra} SELECT * FROM {tabela_origem} WHERE {filtro}'), params)
+        else:
+            db.session.execute(text(f'CREATE TABLE {sombra} AS SELECT * FROM {tabela_origem} WHERE {filtro}'), params)
+        db.session.execute(text(f'DELETE FROM {tabela_origem} WHERE {filtro}'), params)
+        db.session.commit()
+
+
+def _caminho_arquivo(tabela, inicio):
+    return get_archive_dir() / tabela / f'{tabela}_{inicio.year:04d}_{inicio.month:02d}.ndjson.gz'
+
+
+def _exportar_sombra(tabela, sombra, inicio):
+    """Exporta a tabela-sombra para NDJSON comprimido e a remove."""
+    destino = _caminho_arquivo(tabela, inicio)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.tmp')
+
+    linhas = 0
+    resultado = db.session.execute(
+        text(f'SELECT * FROM {sombra} ORDER BY id'),
+        execution_options={'stream_results': True}
+    ).mappings()
+    # Um mês pode já ter sido arquivado parcialmente (linhas tardias na partição padrão)
+    modo = 'ab' if destino.exists() else 'wb'
+    with gzip.open(temporario, 'wb') as saida:
+        if modo == 'ab':
+            with gzip.open(destino, 'rb') as existente:
+                for linha in existente:
+                    saida.write(linha)
+        for linha in resultado:
+            saida.write(json.dumps(dict(linha), default=str, ensure_ascii=False).encode('utf-8'))
+            saida.write(b'\n')
+            linhas += 1
+    os.replace(temporario, destino)
+
+    db.session.execute(text(f'DROP TABLE {sombra}'))
+    db.session.commit()
+    logger.info(f'{linhas} linhas de {tabela} arquivadas em {destino}')
+    return destino, linhas
+
+
+def arquivar_historico(tabelas=None, meses=None):
+    """Aplica a política de retenção nas tabelas de auditoria.
+
+    Returns:
+        list: tuplas (tabela, arquivo, linhas) de cada mês arquivado
+    """
+    corte = data_corte(meses=meses)
+    arquivados = []
+    for tabela in tabelas or TABELAS_AUDITORIA:
+        _separar_meses_expirados(tabela, corte)
+        for sombra, inicio in _tabelas_sombra_pendentes(tabela):
+            destino, linhas = _exportar_sombra(tabela, sombra, inicio)
+            arquivados.append((tabela, str(destino), linhas))
+        if _is_postgres() and is_particionada(tabela):
+            garantir_particoes(tabela)
+    return arquivados
+
+
+def consultar_arquivos(tabela, inicio=None, fim=None, filtros=None, limite=None):
+    """Percorre os arquivos NDJSON de uma tabela aplicando filtros simples.
+
+    Args:
+        tabela: nome da tabela de auditoria
+        inicio, fim: intervalo (datetime) aplicado à coluna temporal da tabela
+        filtros: dicionário campo -> valor (comparação textual exata)
+        limite: número máximo de linhas retornadas
+
+    Yields:
+        dict: linhas arquivadas em ordem cronológica de arquivo
+    """
+    coluna = TABELAS_AUDITORIA[tabela]
+    filtros = {campo: str(valor) for campo, valor in (filtros or {}).items()}
+    diretorio = get_archive_dir() / tabela
+    if not diretorio.exists():
+        return
+
+    encontrados = 0
+    for arquivo in sorted(diretorio.glob(f'{tabela}_*.ndjson.gz')):
+        ano, mes = arquivo.name[len(tabela) + 1:].split('.')[0].split('_')
+        mes_inicio = datetime(int(ano), int(mes), 1)
+        mes_fim = datetime.combine(_somar_meses(mes_inicio.date(), 1), datetime.min.time())
+        if (inicio and mes_fim <= inicio) or (fim and mes_inicio >= fim):
+            continue
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as entrada:
+            for linha in entrada:
+                registro = json.loads(linha)
+                momento = registro.get(coluna)
+                if momento and (inicio or fim):
+                    momento = datetime.fromisoformat(momento)
+                    if (inicio and momento < inicio) or (fim and momento >= fim):
+                        continue
+                if any(str(registro.get(campo)) != valor for campo, valor in filtros.items()):
+                    continue
+                yield registro
+                encontrados += 1
+                if limite and encontrados >= limite:
+                    return
@@ -1,33 +1,80 @@
 # utils/cache.py
 """Sistema de cache para otimizar consultas frequentes."""
 
+from collections import OrderedDict
 from functools import wraps
 from datetime import datetime, timedelta
+import os
 import threading
 
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
 class SimpleCache:
-    """Cache simples em memória com TTL."""
+    """Cache simples em memória com TTL.
+    
+    Com ``max_itens`` o cache é limitado: ao passar do limite sai o item usado
+    há mais tempo (LRU).
+    """
     
-    def __init__(self):
-        self._cache = {}
+    def __init__(self, max_itens=None):
+        self._cache = OrderedDict()
+        self.max_itens = max_itens
         self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._ouvintes = []
+    
+    def adicionar_ouvinte(self, funcao):
+        """Registra funcao(hit: bool) chamada a cada leitura (ex.: métricas)."""
+        self._ouvintes.append(funcao)
+    
+    def _notificar(self, hit):
+        for funcao in self._ouvintes:
+            funcao(hit)
     
     def get(self, key):
         """Obtém valor do cache se ainda válido."""
         with self._lock:
+            value = None
+            hit = False
             if key in self._cache:
                 value, expiry = self._cache[key]
                 if datetime.now() < expiry:
-                    return value
+                    hit = True
+                    self._cache.move_to_end(key)
                 else:
                     del self._cache[key]
-            return None
+                    value = None
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._notificar(hit)
+        return value
+    
+    def estatisticas(self):
+        """Retorna contadores de acertos/falhas e tamanho atual."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None,
+                'itens': len(self._cache),
+                'max_itens': self.max_itens
+            }
     
     def set(self, key, value, ttl_seconds=300):
         """Define valor no cache com TTL."""
         with self._lock:
             expiry = datetime.now() + timedelta(seconds=ttl_seconds)
             self._cache[key] = (value, expiry)
+            self._cache.move_to_end(key)
+            if self.max_itens:
+                while len(self._cache) > self.max_itens:
+                    self._cache.popitem(last=False)
     
     def invalidate(self, key):
         """Remove item do cache."""
@@ -41,7 +88,7 @@ class SimpleCache:
             self._cache.clear()
 
 # Instância global do cache
-cache = SimpleCache()
+cache = SimpleCache(max_itens=_int_env('CACHE_MAX_ITENS', 1000))
 
 def cached(ttl_seconds=300):
     """Decorator para cachear resultados de funções."""
@@ -0,0 +1,200 @@
+# utils/calendario.py
+"""Calendários ICS de vencimentos (``/calendar/<token>.ics``).
+
+Cada responsável e cada tipo de registro tem um endereço próprio. O token é
+assinado com a ``SECRET_KEY`` (e ``CALENDAR_TOKEN_SALT``): não fica no banco,
+é sempre o mesmo para o mesmo responsável ou tipo e deixa de valer se o salt
+mudar, o que invalida todos os endereços de uma vez.
+
+Os clientes de calendário consultam o endereço a cada poucos minutos. A
+resposta leva um ETag e um ``Last-Modified`` calculados por uma única consulta
+agregada (:func:`validadores`). O ETag usa o maior ``updated_at`` dos registros
+do responsável ou tipo, o número de eventos, a última exclusão de registro e,
+no calendário de um responsável, o ``updated_at`` dele (o nome vai no
+calendário). Enquanto nada disso muda, a resposta é 304; o corpo, quando
+precisa ser gerado, fica no armazenamento de :mod:`utils.fragmentos`.
+"""
+
+import hashlib
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import case, func, null, select
+
+from models import db, Exclusao, Registro, Responsavel, registro_responsavel
+
+ESCOPOS = ('responsavel', 'tipo')
+
+# Muda quando o formato do ICS gerado muda (invalida os ETags antigos)
+VERSAO_FORMATO = 1
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+# --- Tokens ---
+
+def _serializador():
+    return URLSafeSerializer(current_app.secret_key, salt=os.environ.get('CALENDAR_TOKEN_SALT', 'calendario'))
+
+
+def token_calendario(escopo, valor):
+    """Token do calendário de um responsável (``valor`` = id) ou de um tipo (``valor`` = nome)."""
+    if escopo not in ESCOPOS:
+        raise ValueError(f"Escopo de calendário inválido: {escopo}")
+    return _serializador().dumps([escopo, valor])
+
+
+def ler_token(token):
+    """``(escopo, valor)`` do token, ou ``None`` se a assinatura não confere."""
+    try:
+        escopo, valor = _serializador().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    if escopo not in ESCOPOS:
+        return None
+    return escopo, valor
+
+
+# --- Consultas ---
+
+def _inicio_janela(hoje):
+    return hoje - timedelta(days=_int_env('CALENDAR_DIAS_PASSADOS', 30))
+
+
+def _pendente(hoje):
+    return (Registro.regularizado == False) & (Registro.data_vencimento >= _inicio_janela(hoje))  # noqa: E712
+
+
+def _filtrar_escopo(stmt, escopo, valor):
+    if escopo == 'responsavel':
+        return (stmt.join(registro_responsavel, registro_responsavel.c.registro_id == Registro.id)
+                .where(registro_responsavel.c.responsavel_id == valor))
+    return stmt.where(Registro.tipo == valor)
+
+
+def validadores(escopo, valor, hoje=None):
+    """``(etag, ultima_alteracao)`` do calendário, em uma consulta.
+
+    O maior ``updated_at`` considera também os registros já regularizados ou
+    fora da janela, para que sair do calendário conte como alteração; a
+    contagem de eventos e a última exclusão cobrem registros que deixaram o
+    responsável ou o tipo ou foram excluídos.
+
+    Um registro que deixou o escopo não entra mais no agregado, então o
+    ``Last-Modified`` (para clientes que só enviam ``If-Modified-Since``) é o
+    maior ``updated_at`` de todos os registros, que a saída também atualiza:
+    mais amplo que o ETag, mas nunca anterior a uma mudança do calendário.
+    """
+    hoje = hoje or date.today()
+    ultima_exclusao = (select(func.max(Exclusao.excluido_em))
+                       .where(Exclusao.tabela == 'registro').scalar_subquery())
+    # Sem correlação: todos os registros, não só os do escopo
+    ultima_geral = select(func.max(Registro.updated_at)).correlate(None).scalar_subquery()
+    if escopo == 'responsavel':
+        dono = select(Responsavel.updated_at).where(Responsavel.id == valor).scalar_subquery()
+    else:
+        dono = null()
+    stmt = select(
+        func.max(Registro.updated_at),
+        func.count(case((_pendente(hoje), 1))),
+        ultima_exclusao,
+        dono,
+        ultima_geral,
+    ).select_from(Registro)
+    ultima_alteracao, eventos, excluido_em, dono_alterado, alterado_geral = db.session.execute(
+        _filtrar_escopo(stmt, escopo, valor)
+    ).one()
+    partes = [f'{escopo}={valor}', f'alterado={ultima_alteracao}', f'eventos={eventos}',
+              f'excluido={excluido_em}', f'dono={dono_alterado}', f'dia={hoje.isoformat()}',
+              f'formato={VERSAO_FORMATO}', f"janela={_int_env('CALENDAR_DIAS_PASSADOS', 30)}"]
+    etag = hashlib.sha1('|'.join(partes).encode()).hexdigest()
+    momentos = [momento for momento in (alterado_geral, excluido_em, dono_alterado) if momento is not None]
+    return etag, max(momentos) if momentos else None
+
+
+def registros_calendario(escopo, valor, hoje=None):
+    """Registros pendentes do calendário, em ordem de vencimento."""
+    hoje = hoje or date.today()
+    stmt = select(Registro).where(_pendente(hoje)).order_by(Registro.data_vencimento, Registro.id)
+    return db.session.execute(_filtrar_escopo(stmt, escopo, valor)).scalars().all()
+
+
+# --- Formato ICS (RFC 5545) ---
+
+def _escapar(texto):
+    return (str(texto or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _dobrar(linha):
+    """Quebra linhas acima de 75 octetos (continuação começa com espaço)."""
+    partes = []
+    atual, tamanho = '', 0
+    for caractere in linha:
+        octetos = len(caractere.encode('utf-8'))
+        if tamanho + octetos > 75:
+            partes.append(atual)
+            atual, tamanho = ' ', 1
+        atual += caractere
+        tamanho += octetos
+    partes.append(atual)
+    return '\r\n'.join(partes)
+
+
+def _utc(momento):
+    return (momento or datetime.now(timezone.utc).replace(tzinfo=None)).strftime('%Y%m%dT%H%M%SZ')
+
+
+def gerar_ics(nome, registros, hoje=None, url_registro=None):
+    """Texto ``text/calendar`` com um evento de dia inteiro por vencimento e um lembrete ``tempo_alerta`` dias antes."""
+    hoje = hoje or date.today()
+    atualizacao = _int_env('CALENDAR_REFRESH_MINUTOS', 15)
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Sistema de Certificados//Vencimentos//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escapar(nome)}',
+        f'X-PUBLISHED-TTL:PT{atualizacao}M',
+        f'REFRESH-INTERVAL;VALUE=DURATION:PT{atualizacao}M',
+    ]
+    for registro in registros:
+        situacao = 'Vencido' if registro.data_vencimento < hoje else 'Vencimento'
+        descricao = f'Tipo: {registro.tipo}'
+        if registro.origem:
+            descricao += f'\nOrigem: {registro.origem}'
+        if registro.observacoes:
+            descricao += f'\n{registro.observacoes}'
+        resumo = f'{situacao}: {registro.nome} ({registro.tipo})'
+        lembrete = f'{registro.nome} vence em {registro.tempo_alerta} dia(s)'
+        linhas += [
+            'BEGIN:VEVENT',
+            f'UID:registro-{registro.id}@sistema-certificados',
+            f'DTSTAMP:{_utc(registro.updated_at)}',
+            f'DTSTART;VALUE=DATE:{registro.data_vencimento:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{registro.data_vencimento + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{_escapar(resumo)}',
+            f'DESCRIPTION:{_escapar(descricao)}',
+            'TRANSP:TRANSPARENT',
+        ]
+        if registro.updated_at:
+            linhas.append(f'LAST-MODIFIED:{_utc(registro.updated_at)}')
+        if url_registro:
+            linhas.append(f'URL:{url_registro(registro)}')
+        if registro.tempo_alerta:
+            linhas += [
+                'BEGIN:VALARM',
+                'ACTION:DISPLAY',
+                f'DESCRIPTION:{_escapar(lembrete)}',
+                f'TRIGGER:-P{registro.tempo_alerta}D',
+                'END:VALARM',
+            ]
+        linhas.append('END:VEVENT')
+    linhas.append('END:VCALENDAR')
+    return '\r\n'.join(_dobrar(linha) for linha in linhas) + '\r\n'
@@ -0,0 +1,105 @@
+# utils/configuracao_sistema.py
+"""Configurações do sistema (nome, equipe de TI, agendamento) e extensões de template.
+
+:func:`get_system_config` devolve uma cópia desacoplada da sessão, em cache
+por 5 minutos. :func:`init_templates` registra o context processor e os
+filtros usados pelos templates, inclusive os de email.
+"""
+
+import json
+import logging
+
+from models import Configuracao, db
+from utils.cache import cached
+
+logger = logging.getLogger(__name__)
+
+
+@cached(ttl_seconds=300)  # Cache por 5 minutos
+def get_system_config():
+    """Obtém as configurações do sistema para uso global."""
+    try:
+        config = Configuracao.query.first()
+        if not config:
+            # Criar configuração padrão se não existir
+            config = Configuracao()
+            db.session.add(config)
+            db.session.commit()
+        
+        # Fazer uma cópia dos dados para evitar problemas de sessão
+        config_data = {
+            'id': config.id,
+            'dia_semana': config.dia_semana,
+            'hora': config.hora,
+            'minuto': config.minuto,
+            'agendamento_ativo': config.agendamento_ativo,
+            'mail_server': config.mail_server,
+            'mail_port': config.mail_port,
+            'mail_username': config.mail_username,
+            'mail_password': config.mail_password,
+            'mail_use_tls': config.mail_use_tls,
+            'mail_default_sender': config.mail_default_sender,
+            'nome_sistema': config.nome_sistema,
+            'equipe_ti': config.equipe_ti,
+            'email_ti': config.email_ti,
+            'telefone_ti': config.telefone_ti,
+            'logo_url': config.logo_url,
+        }
+        return type('Configuracao', (), config_data)()
+    except Exception as e:
+        logger.error(f"Erro ao obter configurações do sistema: {e}")
+        # Retornar configurações padrão em caso de erro
+        return type('Configuracao', (), {
+            'nome_sistema': 'Sistema de Certificados',
+            'equipe_ti': 'Equipe de TI',
+            'email_ti': 'ti@empresa.com',
+            'telefone_ti': '(11) 99999-9999',
+            
+        })()
+
+
+# Context processor para disponibilizar configurações em todos os templates
+def inject_system_config():
+    """Injeta as configurações do sistema em todos os templates."""
+    try:
+        return {
+            'system_config': get_system_config()
+        }
+    except Exception as e:
+        logger.error(f"Erro no context processor: {e}")
+        # Retornar configurações padrão em caso de erro
+        return {
+            'system_config': type('Configuracao', (), {
+                'nome_sistema': 'Sistema de Certificados',
+                'equipe_ti': 'Equipe de TI',
+                'email_ti': 'ti@empresa.com',
+                'telefone_ti': '(11) 99999-9999',
+            })()
+        }
+
+
+# Filtro personalizado para converter JSON string em dicionário
+def from_json_filter(value):
+    """Converte string JSON em dicionário Python."""
+    if not value or not isinstance(value, str):
+        return {}
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+# Filtro personalizado para valor absoluto
+def abs_filter(value):
+    """Retorna o valor absoluto de um número."""
+    try:
+        return abs(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def init_templates(app):
+    """Registra ``system_config`` em todos os templates e os filtros personalizados."""
+    app.context_processor(inject_system_config)
+    app.add_template_filter(from_json_filter, 'from_json')
+    app.add_template_filter(abs_filter, 'abs')
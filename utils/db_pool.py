@@ -0,0 +1,101 @@
+# utils/db_pool.py
+"""Configuração do pool de conexões por worker.
+
+O tamanho do pool é derivado do número de workers e threads do servidor para
+que o total de conexões da instância caiba em ``DB_MAX_CONNECTIONS``:
+
+    por_worker   = DB_MAX_CONNECTIONS // workers
+    pool_size    = threads + DB_POOL_EXTRA      (scheduler, jobs em segundo plano)
+    max_overflow = min(10, por_worker - pool_size)
+
+Valores explícitos em ``DB_POOL_SIZE``/``DB_MAX_OVERFLOW`` têm precedência.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MAX_OVERFLOW_PADRAO = 10  # Mesmo teto padrão do SQLAlchemy
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def _sqlite_memoria(uri):
+    return uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/'))
+
+
+def calcular_pool(workers=None, threads=None):
+    """Retorna o dimensionamento do pool para um worker."""
+    workers = max(1, workers or _int_env('WEB_CONCURRENCY', 1))
+    threads = max(1, threads or _int_env('GUNICORN_THREADS', 1))
+    orcamento = _int_env('DB_MAX_CONNECTIONS', 90)
+    por_worker = max(1, orcamento // workers)
+
+    pool_size = _int_env('DB_POOL_SIZE', threads + _int_env('DB_POOL_EXTRA', 2))
+    if pool_size > por_worker and 'DB_POOL_SIZE' not in os.environ:
+        logger.warning(
+            f"Orçamento de {orcamento} conexões para {workers} workers permite só {por_worker} "
+            f"por worker (desejado {pool_size}); reduza os workers ou aumente DB_MAX_CONNECTIONS"
+        )
+        pool_size = por_worker
+    max_overflow = _int_env('DB_MAX_OVERFLOW', max(0, min(MAX_OVERFLOW_PADRAO, por_worker - pool_size)))
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'orcamento': orcamento,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'maximo_instancia': workers * (pool_size + max_overflow),
+    }
+
+
+def opcoes_pool(uri, workers=None, threads=None):
+    """Opções para ``SQLALCHEMY_ENGINE_OPTIONS``."""
+    opcoes = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    if _sqlite_memoria(uri):
+        # StaticPool/SingletonThreadPool não aceitam dimensionamento
+        return opcoes
+    dimensionamento = calcular_pool(workers, threads)
+    opcoes.update({
+        'pool_size': dimensionamento['pool_size'],
+        'max_overflow': dimensionamento['max_overflow'],
+        'pool_timeout': _int_env('DB_POOL_TIMEOUT', 10),
+        # Conexões mais velhas que isso são reabertas (firewalls/pgbouncer derrubam ociosas)
+        'pool_recycle': _int_env('DB_POOL_RECYCLE', 1800),
+    })
+    return opcoes
+
+
+def descartar_conexoes_herdadas(app, db):
+    """Descarta o pool herdado do master após o fork (``preload_app``).
+
+    ``close=False`` apenas esquece as conexões sem fechá-las: os sockets
+    continuam pertencendo ao master e nunca são compartilhados com o filho.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def estatisticas_pool(db):
+    """Uso atual dos pools deste processo (requer contexto de aplicação)."""
+    resultado = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        item = {'classe': type(pool).__name__, 'status': pool.status()}
+        for nome in ('size', 'checkedin', 'checkedout', 'overflow'):
+            metodo = getattr(pool, nome, None)
+            if callable(metodo):
+                item[nome] = metodo()
+        item['timeout'] = getattr(pool, '_timeout', None)
+        item['recycle'] = getattr(pool, '_recycle', None)
+        item['pre_ping'] = getattr(pool, '_pre_ping', None)
+        resultado[bind or 'default'] = item
+    return resultado
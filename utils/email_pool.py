@@ -0,0 +1,156 @@
+# utils/email_pool.py
+"""Envio de emails em paralelo com sessões SMTP reaproveitadas.
+
+:class:`PoolSMTP` mantém até ``SMTP_MAX_CONEXOES_POR_HOST`` sessões abertas
+por servidor (limite compartilhado por todos os pools do processo, para não
+estourar o limite de conexões do relay). Cada sessão envia várias mensagens
+em vez de abrir uma conexão por email como ``mail.send``.
+
+:func:`enviar_em_paralelo` renderiza as mensagens em um pool de threads e as
+entrega por um segundo pool limitado pelas sessões SMTP, com no máximo
+algumas mensagens renderizadas aguardando envio (memória limitada).
+"""
+
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_semaforos_host = {}
+_semaforos_lock = threading.Lock()
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def limite_por_host():
+    return max(1, _int_env('SMTP_MAX_CONEXOES_POR_HOST', 4))
+
+
+def _semaforo_host(servidor, porta):
+    with _semaforos_lock:
+        chave = (servidor, porta)
+        if chave not in _semaforos_host:
+            _semaforos_host[chave] = threading.BoundedSemaphore(limite_por_host())
+        return _semaforos_host[chave]
+
+
+class PoolSMTP:
+    """Sessões SMTP reaproveitadas (``flask_mail.Connection``) com limite por host."""
+
+    def __init__(self, mail):
+        self.mail = mail
+        self._semaforo = _semaforo_host(mail.server, mail.port)
+        self._livres = queue.LifoQueue()
+        self._abertas = []
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        conexao = self.mail.connect()
+        conexao.__enter__()
+        with self._lock:
+            self._abertas.append(conexao)
+        return conexao
+
+    def _descartar(self, conexao):
+        with self._lock:
+            if conexao in self._abertas:
+                self._abertas.remove(conexao)
+        try:
+            conexao.__exit__(None, None, None)
+        except Exception:
+            pass  # Sessão já quebrada
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma sessão; sessões que falharem são descartadas, não devolvidas."""
+        with self._semaforo:
+            try:
+                conexao = self._livres.get_nowait()
+            except queue.Empty:
+                conexao = self._abrir()
+            try:
+                yield conexao
+            except Exception:
+                self._descartar(conexao)
+                raise
+            else:
+                self._livres.put(conexao)
+
+    def enviar(self, mensagem):
+        with self.conexao() as conexao:
+            conexao.send(mensagem)
+
+    def fechar(self):
+        with self._lock:
+            abertas, self._abertas = self._abertas, []
+        for conexao in abertas:
+            try:
+                conexao.__exit__(None, None, None)
+            except Exception:
+                pass
+        self._livres = queue.LifoQueue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+
+def enviar_em_paralelo(app, mail, itens, renderizar, ao_concluir, renderizadores=None, cancelado=None):
+    """Renderiza e envia ``itens`` em paralelo.
+
+    ``renderizar(item)`` roda com contexto de aplicação em uma thread de
+    renderização e retorna a ``Message``. ``ao_concluir(item, erro)`` é chamada,
+    também com contexto de aplicação, após cada envio (``erro`` é None em caso
+    de sucesso). Se ``cancelado()``
+    retornar True, nenhum item novo é iniciado; os já em andamento terminam.
+    """
+    renderizadores = renderizadores or _int_env('EMAIL_RENDER_WORKERS', 4)
+    remetentes = limite_por_host()
+    # Limita mensagens renderizadas aguardando SMTP
+    em_voo = threading.BoundedSemaphore(remetentes * 4)
+
+    with PoolSMTP(mail) as pool, \
+            ThreadPoolExecutor(renderizadores, thread_name_prefix='email-render') as render, \
+            ThreadPoolExecutor(remetentes, thread_name_prefix='email-smtp') as envio:
+
+        def enviar(item, mensagem):
+            try:
+                with app.app_context():
+                    try:
+                        pool.enviar(mensagem)
+                    except Exception as e:
+                        ao_concluir(item, e)
+                    else:
+                        ao_concluir(item, None)
+            finally:
+                em_voo.release()
+
+        def preparar(item):
+            with app.app_context():
+                try:
+                    mensagem = renderizar(item)
+                except Exception as e:
+                    try:
+                        ao_concluir(item, e)
+                    finally:
+                        em_voo.release()
+                    return
+            envio.submit(enviar, item, mensagem)
+
+        for item in itens:
+            if cancelado and cancelado():
+                break
+            em_voo.acquire()
+            render.submit(preparar, item)
+        # Todas as renderizações precisam terminar antes de encerrar o pool de envio
+        render.shutdown(wait=True)
@@ -0,0 +1,113 @@
+# utils/email_render.py
+"""Renderização de emails em lote com o layout pré-renderizado.
+
+Os templates de email estendem ``emails/base_email.html``, cujo cabeçalho,
+CSS e rodapé só dependem de ``system_config`` e do assunto. :class:`LayoutEmail`
+renderiza esse layout uma vez por execução, com marcadores no lugar do
+assunto e do bloco ``content``, e guarda os trechos estáticos. Para cada
+mensagem só o bloco ``content`` do template filho é renderizado; o HTML final
+é a concatenação dos trechos com o assunto escapado.
+
+Se o layout usar outra variável por mensagem, ou com ``EMAIL_LAYOUT_CACHE=false``,
+cada mensagem volta a ser renderizada por inteiro (``render_template``).
+"""
+
+import logging
+import os
+import re
+import secrets
+
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+BLOCO_CONTEUDO = 'content'
+
+# Posições variáveis dentro dos trechos do layout
+_ASSUNTO = object()
+_CONTEUDO = object()
+
+
+def cache_layout_ativo():
+    return os.environ.get('EMAIL_LAYOUT_CACHE', 'true').lower() not in ('false', '0', 'no')
+
+
+def _variaveis_layout(env, template):
+    """Variáveis livres dos templates pais de ``template`` (cadeia de ``extends``)."""
+    from jinja2 import meta
+
+    variaveis = set()
+    nome = template.name
+    vistos = set()
+    while nome and nome not in vistos:
+        vistos.add(nome)
+        fonte, _, _ = env.loader.get_source(env, nome)
+        ast = env.parse(fonte)
+        if nome != template.name:
+            variaveis |= meta.find_undeclared_variables(ast)
+        pais = [pai for pai in meta.find_referenced_templates(ast) if pai]
+        nome = pais[0] if pais else None
+    return variaveis
+
+
+class LayoutEmail:
+    """Template de email com o layout renderizado uma vez por execução.
+
+    ``contexto_fixo`` vale para todas as mensagens (além dos context
+    processors do app). Precisa de contexto de aplicação na criação; depois
+    :meth:`renderizar` pode ser chamado de várias threads.
+    """
+
+    def __init__(self, app, nome_template, **contexto_fixo):
+        self.app = app
+        self.nome_template = nome_template
+        self.template = app.jinja_env.get_template(nome_template)
+        self.contexto_fixo = {}
+        app.update_template_context(self.contexto_fixo)
+        self.contexto_fixo.update(contexto_fixo)
+        self._partes = self._preparar() if cache_layout_ativo() else None
+
+    def _preparar(self):
+        """Trechos estáticos do layout intercalados com ``_ASSUNTO`` e ``_CONTEUDO``."""
+        if BLOCO_CONTEUDO not in self.template.blocks:
+            return None
+        livres = (_variaveis_layout(self.app.jinja_env, self.template)
+                  - set(self.contexto_fixo) - set(self.app.jinja_env.globals) - {'subject'})
+        if livres:
+            logger.info(f"Layout de {self.nome_template} usa {sorted(livres)} por mensagem; sem pré-renderização")
+            return None
+
+        sufixo = secrets.token_hex(8)
+        marcas = {f'\x00assunto-{sufixo}\x00': _ASSUNTO, f'\x00conteudo-{sufixo}\x00': _CONTEUDO}
+        marca_assunto, marca_conteudo = marcas
+
+        contexto = self.template.new_context({**self.contexto_fixo, 'subject': marca_assunto})
+        contexto.blocks[BLOCO_CONTEUDO] = [lambda _contexto: iter([marca_conteudo])]
+        layout = self.app.jinja_env.concat(self.template.root_render_func(contexto))
+        if layout.count(marca_conteudo) != 1:
+            return None
+
+        trechos = re.split('(' + '|'.join(map(re.escape, marcas)) + ')', layout)
+        return [marcas.get(trecho, trecho) for trecho in trechos if trecho]
+
+    def renderizar(self, subject, **contexto):
+        """HTML completo da mensagem; ``subject`` é o assunto exibido no layout."""
+        if self._partes is None:
+            from flask import render_template
+            return render_template(self.nome_template, **{**self.contexto_fixo, **contexto, 'subject': subject})
+
+        from flask import before_render_template, template_rendered
+
+        variaveis = {**self.contexto_fixo, **contexto, 'subject': subject}
+        before_render_template.send(self.app, _async_wrapper=self.app.ensure_sync,
+                                    template=self.template, context=variaveis)
+        contexto_jinja = self.template.new_context(variaveis)
+        conteudo = self.app.jinja_env.concat(self.template.blocks[BLOCO_CONTEUDO](contexto_jinja))
+        assunto = str(escape(subject))
+        html = ''.join(
+            conteudo if parte is _CONTEUDO else assunto if parte is _ASSUNTO else parte
+            for parte in self._partes
+        )
+        template_rendered.send(self.app, _async_wrapper=self.app.ensure_sync,
+                               template=self.template, context=variaveis)
+        return html
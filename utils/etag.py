@@ -0,0 +1,197 @@
+# utils/etag.py
+"""ETags por versão dos dados para dashboards e listas.
+
+Cada tabela de :data:`TABELAS_VERSIONADAS` tem um contador em
+``tabela_versao``, incrementado na mesma transação de qualquer escrita nela
+(flush da sessão ou ``UPDATE``/``DELETE``/``INSERT`` em lote). Uma view
+decorada com :func:`etag_dependente` declara de quais tabelas depende; o ETag
+combina as versões dessas tabelas (e das que aparecem em toda página: perfis,
+permissões e configuração), o usuário e seu perfil, o dia corrente e a versão
+dos templates. Se o navegador enviar o mesmo ETag em ``If-None-Match``, a
+resposta é 304 sem executar a view.
+
+Desligável com ``HTTP_ETAG=false``.
+"""
+
+import hashlib
+import os
+from datetime import date
+from functools import lru_cache, wraps
+
+from flask import current_app, g, make_response, message_flashed, request, session
+from flask_login import current_user
+from sqlalchemy import event, inspect, select, update
+
+from models import db, TabelaVersao
+
+# Tabelas com contador de versão. Tabelas escritas a cada requisição ou job
+# (histórico, jobs, ledger de alertas, usuários no login) ficam de fora para
+# não acrescentar um UPDATE a cada escrita delas
+TABELAS_VERSIONADAS = ('registro', 'responsavel', 'configuracao', 'role', 'permission', 'role_permission')
+
+# Dependências de toda página: menu por permissão e nome do sistema no layout
+TABELAS_BASE = ('role', 'permission', 'role_permission', 'configuracao')
+
+CACHE_CONTROL = 'private, no-cache'
+
+_CHAVE_PENDENTES = 'etag_tabelas_pendentes'
+_CHAVE_INCREMENTADAS = 'etag_tabelas_incrementadas'
+_eventos_registrados = False
+
+
+def etag_ativo():
+    return os.environ.get('HTTP_ETAG', 'true').lower() not in ('false', '0', 'no')
+
+
+# --- Contadores de versão ---
+
+def _incrementar(conexao, tabelas):
+    """Soma 1 à versão de cada tabela (ordem fixa, para não travar em ciclo)."""
+    tabela = TabelaVersao.__table__
+    dialeto = conexao.dialect.name
+    for nome in sorted(tabelas):
+        if dialeto in ('postgresql', 'sqlite'):
+            if dialeto == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(tabela).values(tabela=nome, versao=1)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabela.c.tabela],
+                set_={'versao': tabela.c.versao + 1}
+            )
+            conexao.execute(stmt)
+            continue
+        resultado = conexao.execute(
+            update(tabela).where(tabela.c.tabela == nome).values(versao=tabela.c.versao + 1)
+        )
+        if not resultado.rowcount:
+            conexao.execute(tabela.insert().values(tabela=nome, versao=1))
+
+
+def _marcar(session, tabelas):
+    """Incrementa as tabelas ainda não incrementadas nesta transação."""
+    feitas = session.info.setdefault(_CHAVE_INCREMENTADAS, set())
+    novas = (set(tabelas) & set(TABELAS_VERSIONADAS)) - feitas
+    if novas:
+        _incrementar(session.connection(), novas)
+        feitas |= novas
+
+
+def _coletar_tabelas(session, flush_context, instances):
+    tabelas = session.info.setdefault(_CHAVE_PENDENTES, set())
+    for obj in list(session.new) + list(session.deleted):
+        tabelas.update(t.name for t in inspect(obj).mapper.tables)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tabelas.update(t.name for t in inspect(obj).mapper.tables)
+
+
+def _gravar_versoes(session, flush_context):
+    tabelas = session.info.pop(_CHAVE_PENDENTES, None)
+    if tabelas:
+        _marcar(session, tabelas)
+
+
+def _escrita_em_lote(estado):
+    """``UPDATE``/``DELETE``/``INSERT`` executados direto pela sessão (sem flush)."""
+    if estado.is_update or estado.is_delete or estado.is_insert:
+        tabela = getattr(estado.statement, 'table', None)
+        nome = getattr(tabela, 'name', None)
+        if nome:
+            _marcar(estado.session, [nome])
+
+
+def _fim_transacao(session, *args):
+    session.info.pop(_CHAVE_PENDENTES, None)
+    session.info.pop(_CHAVE_INCREMENTADAS, None)
+
+
+def registrar_eventos():
+    """Liga os contadores de versão aos flushes e escritas em lote da sessão."""
+    global _eventos_registrados
+    if _eventos_registrados:
+        return
+    event.listen(db.session, 'before_flush', _coletar_tabelas)
+    event.listen(db.session, 'after_flush', _gravar_versoes)
+    event.listen(db.session, 'do_orm_execute', _escrita_em_lote)
+    event.listen(db.session, 'after_commit', _fim_transacao)
+    event.listen(db.session, 'after_soft_rollback', _fim_transacao)
+    _eventos_registrados = True
+
+
+def versoes(tabelas):
+    """Versão atual de cada tabela (0 se nunca escrita)."""
+    tabela = TabelaVersao.__table__
+    linhas = db.session.execute(
+        select(tabela.c.tabela, tabela.c.versao).where(tabela.c.tabela.in_(tabelas))
+    ).all()
+    atuais = dict(linhas)
+    return {nome: atuais.get(nome, 0) for nome in tabelas}
+
+
+# --- ETag das views ---
+
+@lru_cache(maxsize=1)
+def versao_templates():
+    """Muda a cada deploy que altera templates (nome, tamanho e data de cada arquivo)."""
+    pasta = os.path.join(current_app.root_path, current_app.template_folder)
+    resumo = hashlib.sha1()
+    for raiz, _, arquivos in sorted(os.walk(pasta)):
+        for nome in sorted(arquivos):
+            info = os.stat(os.path.join(raiz, nome))
+            resumo.update(f'{raiz}/{nome}:{info.st_size}:{info.st_mtime_ns};'.encode())
+    return resumo.hexdigest()[:12]
+
+
+def calcular_etag(tabelas):
+    atuais = versoes(tabelas)
+    partes = [f'{nome}={atuais[nome]}' for nome in tabelas]
+    partes += [
+        f'usuario={current_user.get_id()}',
+        f'perfil={getattr(current_user, "role_id", None)}',
+        f'dia={date.today().isoformat()}',
+        f'templates={versao_templates()}',
+        request.full_path,
+    ]
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()[:20]
+
+
+def _registrar_flash(sender, message, category, **extra):
+    g.flash_na_requisicao = True
+
+
+message_flashed.connect(_registrar_flash)
+
+
+def etag_dependente(*tabelas):
+    """Responde 304 se nenhuma das ``tabelas`` mudou desde o ETag do navegador.
+
+    Usar abaixo de ``@somente_leitura``, para que as versões sejam lidas do
+    mesmo banco que os dados. Páginas com mensagens flash não recebem ETag.
+    """
+    desconhecidas = set(tabelas) - set(TABELAS_VERSIONADAS)
+    if desconhecidas:
+        raise ValueError(f"Tabelas sem contador de versão: {sorted(desconhecidas)}")
+    dependencias = tuple(sorted(set(tabelas) | set(TABELAS_BASE)))
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not etag_ativo() or request.method != 'GET' or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            etag = calcular_etag(dependencias)
+            if request.if_none_match.contains_weak(etag):
+                resposta = current_app.response_class(status=304)
+                resposta.set_etag(etag, weak=True)
+                resposta.headers['Cache-Control'] = CACHE_CONTROL
+                return resposta
+
+            resposta = make_response(f(*args, **kwargs))
+            if resposta.status_code == 200 and not g.get('flash_na_requisicao'):
+                resposta.set_etag(etag, weak=True)
+                resposta.headers['Cache-Control'] = CACHE_CONTROL
+            return resposta
+        return decorated_function
+    return decorator
@@ -0,0 +1,223 @@
+# utils/fragmentos.py
+"""Cache de trechos renderizados dos templates (``{% cache %}``).
+
+Os dashboards renderizam os mesmos blocos (tabelas, dados dos gráficos) para
+todo usuário do mesmo perfil. Um trecho marcado com::
+
+    {% cache 'vencimentos:tabelas', 'registro' %} ... {% endcache %}
+
+é guardado pelo nome, pelas versões das tabelas listadas (contadores de
+``tabela_versao``, ver :mod:`utils.etag`), pelo perfil do usuário, pelo dia
+e pela versão dos templates; qualquer escrita nessas tabelas gera uma chave
+nova. O HTML fica em um :class:`~utils.cache.SimpleCache` limitado
+(``FRAGMENT_CACHE_MAX_ITENS``) e, com ``FRAGMENT_CACHE_DIR``, também em disco,
+compartilhado entre os workers.
+
+As views passam os dados em :class:`DadosAdiados`, então as consultas só
+rodam quando algum trecho não está no cache. Os widgets dos dashboards
+(rotas JSON carregadas pela página com ``carregarWidget``) usam o mesmo
+armazenamento via :func:`widget_json`. Desligável com ``FRAGMENT_CACHE=false``.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from utils.cache import SimpleCache
+from utils.etag import TABELAS_VERSIONADAS, versao_templates, versoes
+
+logger = logging.getLogger(__name__)
+
+_estado = {'gravacoes': 0}
+_lock = threading.Lock()
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def fragmentos_ativos():
+    return os.environ.get('FRAGMENT_CACHE', 'true').lower() not in ('false', '0', 'no')
+
+
+def _ttl():
+    return _int_env('FRAGMENT_CACHE_TTL', 3600)
+
+
+fragmentos = SimpleCache(max_itens=_int_env('FRAGMENT_CACHE_MAX_ITENS', 200))
+
+
+class DadosAdiados:
+    """Dados de uma página calculados só no primeiro acesso a um atributo.
+
+    ``funcao`` retorna um dict; ``dados.chave`` no template devolve o item.
+    """
+
+    def __init__(self, funcao):
+        self._funcao = funcao
+        self._dados = None
+
+    def __getattr__(self, nome):
+        if nome.startswith('_'):
+            raise AttributeError(nome)
+        if self._dados is None:
+            self._dados = self._funcao()
+        try:
+            return self._dados[nome]
+        except KeyError:
+            raise AttributeError(nome) from None
+
+
+# --- Armazenamento ---
+
+def _diretorio():
+    return os.environ.get('FRAGMENT_CACHE_DIR', '').strip() or None
+
+
+def _ler_disco(diretorio, chave, ttl):
+    caminho = os.path.join(diretorio, f'{chave}.html')
+    try:
+        if time.time() - os.stat(caminho).st_mtime > ttl:
+            return None
+        with open(caminho, encoding='utf-8') as arquivo:
+            return arquivo.read()
+    except OSError:
+        return None
+
+
+def _limpar_disco(diretorio):
+    """Remove arquivos vencidos (chaves antigas não são mais lidas)."""
+    limite = time.time() - _ttl()
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        try:
+            if os.stat(caminho).st_mtime < limite:
+                os.unlink(caminho)
+        except OSError:
+            pass
+
+
+def _gravar_disco(diretorio, chave, html):
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        # Escreve em arquivo temporário e renomeia: outro worker nunca lê um arquivo pela metade
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(html)
+        os.replace(temporario, os.path.join(diretorio, f'{chave}.html'))
+        with _lock:
+            _estado['gravacoes'] += 1
+            limpar = _estado['gravacoes'] % 100 == 0
+        if limpar:
+            _limpar_disco(diretorio)
+    except OSError as e:
+        logger.warning(f"Falha ao gravar trecho em {diretorio}: {e}")
+
+
+def obter_fragmento(chave, ttl=None):
+    ttl = ttl or _ttl()
+    html = fragmentos.get(chave)
+    if html is not None:
+        return html
+    diretorio = _diretorio()
+    if diretorio:
+        html = _ler_disco(diretorio, chave, ttl)
+        if html is not None:
+            fragmentos.set(chave, html, ttl)
+    return html
+
+
+def guardar_fragmento(chave, html, ttl=None):
+    fragmentos.set(chave, html, ttl or _ttl())
+    diretorio = _diretorio()
+    if diretorio:
+        _gravar_disco(diretorio, chave, html)
+
+
+# --- Chave e tag do Jinja ---
+
+def _versoes_requisicao():
+    """Versões de todas as tabelas, lidas uma vez por requisição."""
+    if 'versoes_fragmentos' not in g:
+        g.versoes_fragmentos = versoes(TABELAS_VERSIONADAS)
+    return g.versoes_fragmentos
+
+
+def chave_fragmento(nome, tabelas):
+    desconhecidas = set(tabelas) - set(TABELAS_VERSIONADAS)
+    if desconhecidas:
+        raise ValueError(f"Tabelas sem contador de versão: {sorted(desconhecidas)}")
+    atuais = _versoes_requisicao()
+    partes = [nome] + [f'{tabela}={atuais[tabela]}' for tabela in sorted(set(tabelas))]
+    partes += [
+        f'perfil={getattr(current_user, "role_id", None)}',
+        f'dia={date.today().isoformat()}',
+        f'templates={versao_templates()}',
+    ]
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+class CacheFragmentos(Extension):
+    """``{% cache 'nome', 'tabela', ... %} ... {% endcache %}``."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        nome = parser.parse_expression()
+        tabelas = []
+        while parser.stream.skip_if('comma'):
+            tabelas.append(parser.parse_expression())
+        corpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        chamada = self.call_method('_renderizar', [nome, nodes.List(tabelas)])
+        return nodes.CallBlock(chamada, [], [], corpo).set_lineno(lineno)
+
+    def _renderizar(self, nome, tabelas, caller):
+        if not fragmentos_ativos() or not has_request_context():
+            return caller()
+        chave = chave_fragmento(nome, tabelas)
+        html = obter_fragmento(chave)
+        if html is None:
+            html = str(caller())
+            guardar_fragmento(chave, html)
+        return Markup(html)
+
+
+def widget_json(*tabelas, ttl=None):
+    """Rota de widget: a view retorna um dict, guardado já serializado.
+
+    A chave segue :func:`chave_fragmento` (caminho da rota, versões de
+    ``tabelas``, perfil e dia). Widgets sobre tabelas sem contador de versão
+    (usuários) não declaram tabelas e expiram por ``ttl``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not fragmentos_ativos():
+                corpo = current_app.json.dumps(f(*args, **kwargs))
+            else:
+                chave = chave_fragmento(f'widget:{request.path}', tabelas)
+                corpo = obter_fragmento(chave, ttl)
+                if corpo is None:
+                    corpo = current_app.json.dumps(f(*args, **kwargs))
+                    guardar_fragmento(chave, corpo, ttl)
+            return current_app.response_class(corpo, mimetype='application/json')
+        return decorated_function
+    return decorator
+
+
+def init_fragmentos(app):
+    """Registra a tag ``{% cache %}`` em ``app.jinja_env``."""
+    app.jinja_env.add_extension(CacheFragmentos)
@@ -0,0 +1,408 @@
+# utils/jobs.py
+"""Execução de tarefas longas fora da requisição.
+
+As rotas chamam :func:`submeter`, que só grava um ``Job`` pendente; a resposta
+volta na hora e a página de acompanhamento consulta ``/jobs/<id>``. Quem
+executa é o processo líder do scheduler (:func:`iniciar_executor`, ligado por
+``tarefas.start_scheduler``): a cada ``JOBS_POLL_SEGUNDOS`` ele reivindica os
+jobs pendentes, até ``JOBS_WORKERS`` ao mesmo tempo. Com ``run_scheduler.py``
+e ``SCHEDULER_ENABLED=false`` na web, nenhum job roda em worker do gunicorn,
+que é reciclado (``max_requests``) e morto pelo ``timeout`` se ficar esperando.
+
+O progresso é gravado no banco no máximo a cada ``JOBS_PROGRESSO_INTERVALO``
+segundos, e o pedido de cancelamento é lido na mesma gravação. O processo
+dono renova o ``atualizado_em`` dos seus jobs a cada ``JOBS_TIMEOUT / 3``
+segundos, mesmo que uma etapa longa não grave progresso. Um job sem renovação
+há mais de ``JOBS_TIMEOUT`` segundos (processo morto) volta à fila, até
+``JOBS_MAX_TENTATIVAS`` execuções; ao encerrar normalmente, o processo
+devolve os seus na hora (:func:`parar_executor`). A consulta
+(:func:`obter_job`) não grava.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+logger = logging.getLogger(__name__)
+
+STATUS_FINAIS = ('concluido', 'falhou', 'cancelado')
+ERRO_INTERROMPIDO = 'Interrompido: sem progresso em todas as tentativas (processo reiniciado?)'
+
+_tipos = {}
+_estado = {'pid': None, 'executor': None}
+_estado_lock = threading.Lock()
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def _tabela():
+    from models import Job
+    return Job.__table__
+
+
+def _engine():
+    from models import db
+    return db.engine
+
+
+class JobCancelado(Exception):
+    """Cancelamento solicitado pelo usuário."""
+
+
+def tipo_job(nome):
+    """Registra a função que executa jobs do tipo ``nome``.
+
+    A função recebe um :class:`Progresso` e os parâmetros do job; o texto
+    retornado vira a mensagem final.
+    """
+    def decorator(funcao):
+        _tipos[nome] = funcao
+        return funcao
+    return decorator
+
+
+class Progresso:
+    """Contadores de um job em execução (seguro para uso entre threads)."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.total = None
+        self.processados = 0
+        self.falhas = 0
+        self.mensagem = None
+        self._cancelado = False
+        self._ultima_gravacao = 0.0
+        self._intervalo = _int_env('JOBS_PROGRESSO_INTERVALO', 1)
+        self._lock = threading.Lock()
+
+    def definir_total(self, total, mensagem=None):
+        with self._lock:
+            self.total = total
+            if mensagem:
+                self.mensagem = mensagem
+        self.gravar(forcar=True)
+
+    def avancar(self, quantidade=1, falhas=0):
+        with self._lock:
+            self.processados += quantidade
+            self.falhas += falhas
+        self.gravar()
+
+    def gravar(self, forcar=False):
+        """Grava os contadores (com intervalo mínimo) e lê o pedido de cancelamento."""
+        with self._lock:
+            agora = time.monotonic()
+            if not forcar and agora - self._ultima_gravacao < self._intervalo:
+                return
+            self._ultima_gravacao = agora
+            valores = {'processados': self.processados, 'falhas': self.falhas, 'total': self.total,
+                       'mensagem': self.mensagem, 'atualizado_em': datetime.now()}
+        tabela = _tabela()
+        with _engine().begin() as conexao:
+            conexao.execute(update(tabela).where(tabela.c.id == self.job_id).values(**valores))
+            cancelar = conexao.execute(
+                select(tabela.c.cancelar_solicitado).where(tabela.c.id == self.job_id)
+            ).scalar()
+        if cancelar:
+            self._cancelado = True
+
+    def cancelado(self):
+        return self._cancelado
+
+    def verificar_cancelamento(self):
+        if self._cancelado:
+            raise JobCancelado()
+
+
+class ProgressoNulo:
+    """Usado quando as funções de envio são chamadas fora de um job."""
+
+    def definir_total(self, total, mensagem=None):
+        pass
+
+    def avancar(self, quantidade=1, falhas=0):
+        pass
+
+    def cancelado(self):
+        return False
+
+    def verificar_cancelamento(self):
+        pass
+
+
+class ExecutorJobs:
+    """Reivindica jobs pendentes do banco e os executa em threads deste processo."""
+
+    def __init__(self, app, ativo):
+        self.app = app
+        self.ativo = ativo  # Só reivindica enquanto retorna True (líder do scheduler)
+        self.maximo = _int_env('JOBS_WORKERS', 2)
+        self.em_execucao = set()
+        self._lock = threading.Lock()
+        self._aviso = threading.Event()
+        self._parar = threading.Event()
+        self._ultima_renovacao = 0.0
+
+    def iniciar(self):
+        threading.Thread(target=self._laco, name='job-executor', daemon=True).start()
+
+    def avisar(self):
+        self._aviso.set()
+
+    def _laco(self):
+        intervalo = _int_env('JOBS_POLL_SEGUNDOS', 2)
+        while not self._parar.is_set():
+            try:
+                with self.app.app_context():
+                    self._ciclo()
+            except Exception as e:
+                logger.warning(f"Falha no executor de jobs: {e}")
+            self._aviso.wait(intervalo)
+            self._aviso.clear()
+
+    def _ciclo(self):
+        renovacao = max(1, _int_env('JOBS_TIMEOUT', 900) // 3)
+        if time.monotonic() - self._ultima_renovacao >= renovacao:
+            self._ultima_renovacao = time.monotonic()
+            self._renovar()
+            if self.ativo():
+                recolocar_interrompidos()
+        while self.ativo() and len(self.em_execucao) < self.maximo:
+            job_id = self._reivindicar()
+            if job_id is None:
+                break
+            with self._lock:
+                self.em_execucao.add(job_id)
+            threading.Thread(target=self._executar, args=(job_id,), name=f'job-{job_id}', daemon=True).start()
+
+    def _renovar(self):
+        """Renova ``atualizado_em`` dos jobs deste processo (etapas longas não ficam sem sinal)."""
+        with self._lock:
+            ids = list(self.em_execucao)
+        if not ids:
+            return
+        tabela = _tabela()
+        with _engine().begin() as conexao:
+            conexao.execute(
+                update(tabela)
+                .where(tabela.c.id.in_(ids), tabela.c.status == 'executando')
+                .values(atualizado_em=datetime.now())
+            )
+
+    def _reivindicar(self):
+        """Marca o pendente mais antigo como em execução por este processo; ``None`` se não há."""
+        tabela = _tabela()
+        while True:
+            with _engine().begin() as conexao:
+                job_id = conexao.execute(
+                    select(tabela.c.id).where(tabela.c.status == 'pendente').order_by(tabela.c.id).limit(1)
+                ).scalar()
+                if job_id is None:
+                    return None
+                agora = datetime.now()
+                reivindicado = conexao.execute(
+                    update(tabela)
+                    .where(tabela.c.id == job_id, tabela.c.status == 'pendente')
+                    .values(status='executando', iniciado_em=agora, atualizado_em=agora,
+                            tentativas=tabela.c.tentativas + 1,
+                            processo=f"{socket.gethostname()}:{os.getpid()}")
+                ).rowcount
+            if reivindicado:
+                return job_id
+            # Outro processo reivindicou primeiro: tenta o próximo
+
+    def _executar(self, job_id):
+        try:
+            _executar(self.app, job_id)
+        finally:
+            with self._lock:
+                self.em_execucao.discard(job_id)
+            self.avisar()
+
+    def parar(self):
+        """Para de reivindicar e devolve à fila os jobs em execução neste processo."""
+        self._parar.set()
+        with self._lock:
+            ids = list(self.em_execucao)
+        if not ids:
+            return
+        tabela = _tabela()
+        with self.app.app_context(), _engine().begin() as conexao:
+            conexao.execute(
+                update(tabela)
+                .where(tabela.c.id.in_(ids), tabela.c.status == 'executando')
+                .values(status='pendente', processo=None, atualizado_em=datetime.now(),
+                        mensagem='Interrompido pelo encerramento do processo; aguardando nova execução')
+            )
+        logger.info(f"Jobs {ids} devolvidos à fila no encerramento do processo")
+
+
+def iniciar_executor(app, ativo):
+    """Inicia o executor deste processo (idempotente); ``ativo()`` diz se ele pode reivindicar jobs."""
+    with _estado_lock:
+        # O executor herdado de um fork não tem threads
+        if _estado['pid'] != os.getpid():
+            executor = ExecutorJobs(app, ativo)
+            _estado.update(pid=os.getpid(), executor=executor)
+            executor.iniciar()
+        return _estado['executor']
+
+
+def _executor_local():
+    return _estado['executor'] if _estado['pid'] == os.getpid() else None
+
+
+def parar_executor():
+    executor = _executor_local()
+    if executor is not None:
+        executor.parar()
+
+
+def submeter(tipo, parametros=None, usuario=None):
+    """Grava o job como pendente para o executor do líder; retorna o id."""
+    if tipo not in _tipos:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    agora = datetime.now()
+    with _engine().begin() as conexao:
+        job_id = conexao.execute(_tabela().insert().values(
+            tipo=tipo, parametros=json.dumps(parametros or {}), status='pendente',
+            processados=0, falhas=0, tentativas=0, cancelar_solicitado=False, usuario=usuario,
+            criado_em=agora, atualizado_em=agora
+        )).inserted_primary_key[0]
+    # Neste processo o executor começa na hora; nos demais, no próximo ciclo
+    executor = _executor_local()
+    if executor is not None:
+        executor.avisar()
+    logger.info(f"Job #{job_id} ({tipo}) submetido por {usuario}")
+    return job_id
+
+
+def _finalizar(job_id, progresso, status, mensagem=None, erro=None):
+    tabela = _tabela()
+    agora = datetime.now()
+    with _engine().begin() as conexao:
+        conexao.execute(update(tabela).where(tabela.c.id == job_id).values(
+            status=status, processados=progresso.processados, falhas=progresso.falhas,
+            total=progresso.total, mensagem=mensagem or progresso.mensagem, erro=erro,
+            concluido_em=agora, atualizado_em=agora
+        ))
+
+
+def _executar(app, job_id):
+    """Executa um job já reivindicado (status 'executando') por este processo."""
+    tabela = _tabela()
+    with app.app_context():
+        with _engine().connect() as conexao:
+            linha = conexao.execute(
+                select(tabela.c.tipo, tabela.c.parametros, tabela.c.cancelar_solicitado)
+                .where(tabela.c.id == job_id)
+            ).first()
+        progresso = Progresso(job_id)
+        if linha.cancelar_solicitado:
+            _finalizar(job_id, progresso, 'cancelado', 'Cancelado antes de iniciar')
+            return
+
+        inicio = time.perf_counter()
+        try:
+            mensagem = _tipos[linha.tipo](progresso, **json.loads(linha.parametros or '{}'))
+        except JobCancelado:
+            _finalizar(job_id, progresso, 'cancelado', 'Cancelado pelo usuário')
+            logger.info(f"Job #{job_id} ({linha.tipo}) cancelado")
+        except Exception as e:
+            logger.exception(f"Job #{job_id} ({linha.tipo}) falhou")
+            _finalizar(job_id, progresso, 'falhou', erro=str(e))
+        else:
+            _finalizar(job_id, progresso, 'concluido', mensagem)
+            logger.info(f"Job #{job_id} ({linha.tipo}) concluído em {time.perf_counter() - inicio:.1f}s")
+        finally:
+            from models import db
+            db.session.remove()
+
+
+def _limite_interrupcao():
+    return datetime.now() - timedelta(seconds=_int_env('JOBS_TIMEOUT', 900))
+
+
+def recolocar_interrompidos():
+    """Jobs em execução sem renovação há mais de ``JOBS_TIMEOUT`` segundos voltam à fila.
+
+    Depois de ``JOBS_MAX_TENTATIVAS`` execuções passam a 'falhou'. Chamado
+    pelo executor do líder.
+    """
+    tabela = _tabela()
+    interrompido = (tabela.c.status == 'executando') & (tabela.c.atualizado_em < _limite_interrupcao())
+    maximo = _int_env('JOBS_MAX_TENTATIVAS', 3)
+    with _engine().begin() as conexao:
+        falhos = conexao.execute(
+            update(tabela)
+            .where(interrompido, tabela.c.tentativas >= maximo)
+            .values(status='falhou', erro=ERRO_INTERROMPIDO, concluido_em=datetime.now())
+        ).rowcount
+        recolocados = conexao.execute(
+            update(tabela)
+            .where(interrompido)
+            .values(status='pendente', processo=None, atualizado_em=datetime.now(),
+                    mensagem='Interrompido; aguardando nova execução')
+        ).rowcount
+    if falhos or recolocados:
+        logger.warning(f"Jobs interrompidos: {recolocados} de volta à fila, {falhos} falharam")
+    return recolocados
+
+
+def solicitar_cancelamento(job_id):
+    """Pede o cancelamento; o job para na próxima gravação de progresso (pendente: na hora)."""
+    tabela = _tabela()
+    with _engine().begin() as conexao:
+        if conexao.execute(
+            update(tabela)
+            .where(tabela.c.id == job_id, tabela.c.status == 'pendente')
+            .values(status='cancelado', cancelar_solicitado=True, mensagem='Cancelado antes de iniciar',
+                    concluido_em=datetime.now())
+        ).rowcount:
+            return True
+        return conexao.execute(
+            update(tabela)
+            .where(tabela.c.id == job_id, tabela.c.status.notin_(STATUS_FINAIS))
+            .values(cancelar_solicitado=True)
+        ).rowcount == 1
+
+
+def obter_job(job_id):
+    """Estado do job com percentual e estimativa de término, ou None (somente leitura)."""
+    tabela = _tabela()
+    with _engine().connect() as conexao:
+        linha = conexao.execute(select(tabela).where(tabela.c.id == job_id)).mappings().first()
+    if linha is None:
+        return None
+    job = dict(linha)
+    if job['status'] == 'executando' and job['atualizado_em'] < _limite_interrupcao():
+        # Exibido como de volta à fila; o executor do líder faz a marcação no banco
+        job['status'] = 'pendente'
+        job['mensagem'] = 'Interrompido; aguardando nova execução'
+    job['parametros'] = json.loads(job['parametros'] or '{}')
+
+    percentual = eta = None
+    total, processados = job['total'], job['processados']
+    if total:
+        percentual = round(100 * processados / total, 1)
+        if job['status'] == 'executando' and processados and job['iniciado_em']:
+            decorrido = (datetime.now() - job['iniciado_em']).total_seconds()
+            eta = round(decorrido / processados * (total - processados))
+    elif total == 0:
+        percentual = 100.0
+    job['percentual'] = percentual
+    job['eta_segundos'] = eta
+    job['finalizado'] = job['status'] in STATUS_FINAIS
+    for chave in ('criado_em', 'iniciado_em', 'concluido_em', 'atualizado_em'):
+        if job[chave] is not None:
+            job[chave] = job[chave].isoformat()
+    return job
@@ -0,0 +1,237 @@
+# utils/logs.py
+"""Logging sem I/O de disco nas threads de requisição.
+
+O logger raiz recebe só um ``QueueHandler``: ``logger.info`` enfileira o
+registro e retorna. Uma thread ``QueueListener`` por processo entrega os
+registros ao destino:
+
+* processo único (``flask run``, waitress, ``manage_db.py``, ``run_scheduler.py``):
+  o próprio processo grava ``LOG_FILE`` (e o console fora de produção);
+* gunicorn: o master é o único dono do arquivo. Ele escuta em ``LOG_SOCKET``
+  (:func:`iniciar_servidor_logs`) e os workers enviam os registros pelo socket
+  (:func:`conectar_servidor_logs`), então a rotação acontece em um só processo.
+
+Processos avulsos com ``LOG_SOCKET`` apontando para um master ativo também
+enviam para ele em vez de abrir o arquivo.
+
+Rotação por tamanho (``LOG_ROTATION=size``, ``LOG_MAX_BYTES``) ou por tempo
+(``LOG_ROTATION=time``, ``LOG_ROTATION_WHEN``); ``LOG_FORMAT=json`` grava uma
+linha JSON por registro.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from datetime import datetime, timezone
+
+FORMATO_TEXTO = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+# Atributos padrão de LogRecord; o que sobrar veio de ``extra=``
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_estado = {'pid': None, 'fila': None, 'listener': None, 'servidor': None}
+_lock = threading.Lock()
+
+
+def _int_env(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em ``extra=``."""
+
+    def format(self, record):
+        dados = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pathname': record.pathname,
+            'lineno': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            dados['exception'] = record.exc_text
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and chave not in dados:
+                dados[chave] = valor
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enfileira sem formatar a mensagem; o traceback vai em ``exc_text``.
+
+    O ``prepare`` padrão embute o traceback na mensagem, o que impede o
+    formato JSON de separá-lo.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatador():
+    if os.environ.get('LOG_FORMAT', 'text').lower() == 'json':
+        return FormatadorJson()
+    return logging.Formatter(FORMATO_TEXTO)
+
+
+def _handler_arquivo():
+    caminho = os.environ.get('LOG_FILE', 'logs/app.log')
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    backups = _int_env('LOG_BACKUP_COUNT', 10)
+    if os.environ.get('LOG_ROTATION', 'size').lower() == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            caminho, when=os.environ.get('LOG_ROTATION_WHEN', 'midnight'),
+            backupCount=backups, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            caminho, maxBytes=_int_env('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=backups, encoding='utf-8'
+        )
+    handler.setFormatter(_formatador())
+    return handler
+
+
+def _destinos_locais():
+    destinos = [_handler_arquivo()]
+    # Log para console apenas em desenvolvimento
+    if os.environ.get('FLASK_ENV') != 'production':
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(_formatador())
+        destinos.append(console)
+    return destinos
+
+
+def _servidor_ativo(caminho):
+    if not caminho or not hasattr(socket, 'AF_UNIX') or not os.path.exists(caminho):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as teste:
+            teste.settimeout(0.5)
+            teste.connect(caminho)
+        return True
+    except OSError:
+        return False
+
+
+def _instalar(destinos):
+    """Troca os handlers do logger raiz por um QueueHandler ligado a ``destinos``."""
+    antigo = _estado['listener']
+    if antigo is not None and _estado['pid'] == os.getpid():
+        antigo.stop()
+    # Após um fork a thread do listener herdado não existe mais; o objeto é descartado
+
+    fila = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    raiz.addHandler(_QueueHandler(fila))
+
+    listener = logging.handlers.QueueListener(fila, *destinos, respect_handler_level=True)
+    listener.start()
+    _estado.update(pid=os.getpid(), fila=fila, listener=listener)
+
+
+def configurar_logging():
+    """Configura o logging do processo (idempotente).
+
+    Se ``LOG_SOCKET`` aponta para um servidor de logs ativo, os registros são
+    enviados a ele; senão este processo grava o arquivo.
+    """
+    with _lock:
+        if _estado['pid'] == os.getpid():
+            return
+        caminho = os.environ.get('LOG_SOCKET')
+        if _servidor_ativo(caminho):
+            _instalar([logging.handlers.SocketHandler(caminho, None)])
+        else:
+            _instalar(_destinos_locais())
+        atexit.register(parar_logging)
+
+
+def conectar_servidor_logs(caminho):
+    """Worker do gunicorn: envia os registros ao master em vez de gravar o arquivo."""
+    with _lock:
+        _instalar([logging.handlers.SocketHandler(caminho, None)])
+
+
+def parar_logging():
+    """Entrega os registros pendentes (chamado na saída do processo)."""
+    with _lock:
+        listener = _estado['listener']
+        if listener is not None and _estado['pid'] == os.getpid():
+            _estado['listener'] = None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+
+class _RecebeRegistros(socketserver.StreamRequestHandler):
+    """Registros de ``SocketHandler``: tamanho (4 bytes) + pickle do ``__dict__``."""
+
+    def handle(self):
+        while True:
+            cabecalho = self.rfile.read(4)
+            if len(cabecalho) < 4:
+                return
+            tamanho = struct.unpack('>L', cabecalho)[0]
+            dados = self.rfile.read(tamanho)
+            if len(dados) < tamanho:
+                return
+            self.server.fila.put_nowait(logging.makeLogRecord(pickle.loads(dados)))
+
+
+class _ServidorLogs(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def iniciar_servidor_logs(caminho):
+    """Master do gunicorn: recebe os registros dos workers em ``caminho``.
+
+    Os registros recebidos entram na fila deste processo, cuja thread é a
+    única a gravar (e rotacionar) o arquivo de log.
+    """
+    configurar_logging()
+    with _lock:
+        if _estado['servidor'] is not None:
+            return _estado['servidor']
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        if os.path.exists(caminho):
+            os.unlink(caminho)  # Socket de uma execução anterior
+        # O socket aceita pickles: só o usuário do serviço pode conectar
+        mascara = os.umask(0o177)
+        try:
+            servidor = _ServidorLogs(caminho, _RecebeRegistros)
+        finally:
+            os.umask(mascara)
+        servidor.fila = _estado['fila']
+        threading.Thread(target=servidor.serve_forever, name='servidor-logs', daemon=True).start()
+        _estado['servidor'] = servidor
+        return servidor
@@ -0,0 +1,217 @@
+# utils/metrics.py
+"""Métricas no formato Prometheus.
+
+Expõe latência por endpoint, requisições em andamento, checkouts e esperas do
+pool de conexões, acertos do cache, duração dos jobs do scheduler, envios de
+email e os contadores de status dos registros em ``/metrics``.
+
+Com vários workers do gunicorn, defina ``PROMETHEUS_MULTIPROC_DIR`` (diretório
+gravável, limpo a cada início do servidor) para que todos os processos gravem
+no mesmo coletor e o scrape tenha uma visão consistente. Sem o pacote
+``prometheus-client`` as funções deste módulo não fazem nada.
+"""
+
+import hmac
+import logging
+import os
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.pool import QueuePool
+
+try:
+    from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram,
+                                   CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess)
+except ImportError:  # pragma: no cover - dependência opcional
+    CollectorRegistry = None
+
+logger = logging.getLogger(__name__)
+
+METRICAS_DISPONIVEIS = CollectorRegistry is not None
+
+if METRICAS_DISPONIVEIS:
+    REQUISICOES = Counter(
+        'http_requests_total', 'Requisições HTTP atendidas',
+        ['endpoint', 'method', 'status']
+    )
+    LATENCIA = Histogram(
+        'http_request_duration_seconds', 'Latência das requisições HTTP',
+        ['endpoint', 'method'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    )
+    EM_ANDAMENTO = Gauge(
+        'http_requests_in_flight', 'Requisições em andamento',
+        multiprocess_mode='livesum'
+    )
+    POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Conexões retiradas do pool')
+    POOL_EM_USO = Gauge(
+        'db_pool_connections_in_use', 'Conexões do pool em uso',
+        multiprocess_mode='livesum'
+    )
+    POOL_ESPERA = Histogram(
+        'db_pool_checkout_wait_seconds', 'Tempo para obter uma conexão do pool (inclui abertura de conexões novas)',
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+    )
+    POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts que estouraram o timeout do pool')
+    CACHE = Counter('app_cache_requests_total', 'Leituras do cache em memória', ['resultado'])
+    JOBS = Histogram(
+        'scheduler_job_duration_seconds', 'Duração dos jobs do scheduler',
+        ['job', 'resultado'],
+        buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900)
+    )
+    LIDER_SCHEDULER = Gauge(
+        'scheduler_leader', 'Processos que são líderes do scheduler (esperado: 1 na instalação)',
+        multiprocess_mode='livesum'
+    )
+    EMAILS = Counter('emails_total', 'Emails enviados ou com falha', ['tipo', 'resultado'])
+    STATUS_REGISTROS = Gauge(
+        'registros_status', 'Registros por status (rollup)', ['status'],
+        multiprocess_mode='mostrecent'
+    )
+
+
+def get_multiproc_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir')
+
+
+# --- Pool de conexões ---
+
+class QueuePoolMetricas(QueuePool):
+    """QueuePool que mede o tempo de espera por conexão."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_ESPERA.observe(time.perf_counter() - inicio)
+
+
+def opcoes_engine(uri, opcoes=None):
+    """Acrescenta o pool instrumentado às opções do engine (exceto SQLite em memória)."""
+    opcoes = dict(opcoes or {})
+    if not METRICAS_DISPONIVEIS or 'poolclass' in opcoes:
+        return opcoes
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/')):
+        return opcoes
+    opcoes['poolclass'] = QueuePoolMetricas
+    return opcoes
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKOUTS.inc()
+    POOL_EM_USO.inc()
+
+
+def _checkin(dbapi_connection, connection_record):
+    POOL_EM_USO.dec()
+
+
+# --- Registradores usados pela aplicação ---
+
+def registrar_email(tipo, resultado):
+    """Conta um email ('enviado', 'falha' ou 'simulado') do tipo informado."""
+    if METRICAS_DISPONIVEIS:
+        EMAILS.labels(tipo=tipo, resultado=resultado).inc()
+
+
+def executar_job(nome, funcao, *args, **kwargs):
+    """Executa um job do scheduler registrando sua duração."""
+    inicio = time.perf_counter()
+    resultado = 'erro'
+    try:
+        retorno = funcao(*args, **kwargs)
+        resultado = 'ok'
+        return retorno
+    finally:
+        if METRICAS_DISPONIVEIS:
+            JOBS.labels(job=nome, resultado=resultado).observe(time.perf_counter() - inicio)
+
+
+def registrar_lideranca_scheduler(lider):
+    """Marca se este processo é o líder do scheduler."""
+    if METRICAS_DISPONIVEIS:
+        LIDER_SCHEDULER.set(1 if lider else 0)
+
+
+def _registrar_cache(hit):
+    CACHE.labels(resultado='hit' if hit else 'miss').inc()
+
+
+def _atualizar_status_registros():
+    from utils.status_rollup import resumo_status
+    try:
+        resumo = resumo_status()
+    except Exception as e:
+        logger.warning(f"Não foi possível ler o rollup de status para métricas: {e}")
+        return
+    for status, chave in (('vencido', 'vencidos'), ('vencendo', 'vencendo'), ('valido', 'validos')):
+        STATUS_REGISTROS.labels(status=status).set(resumo[chave])
+
+
+# --- Integração com o Flask ---
+
+def _token_valido():
+    esperado = os.environ.get('METRICS_TOKEN')
+    if not esperado:
+        return True
+    cabecalho = request.headers.get('Authorization', '')
+    recebido = cabecalho[7:] if cabecalho.startswith('Bearer ') else request.args.get('token', '')
+    return hmac.compare_digest(recebido.encode(), esperado.encode())
+
+
+def init_metrics(app, db):
+    """Registra hooks de requisição, eventos do pool/cache e a rota ``/metrics``."""
+    if not METRICAS_DISPONIVEIS:
+        logger.info("prometheus-client não instalado; métricas desativadas")
+        return
+
+    from utils.cache import cache
+    cache.adicionar_ouvinte(_registrar_cache)
+
+    with app.app_context():
+        engine = db.engine
+    # Eventos de pool no engine sobrevivem a engine.dispose()
+    event.listen(engine, 'checkout', _checkout)
+    event.listen(engine, 'checkin', _checkin)
+
+    @app.before_request
+    def _iniciar_metricas():
+        g.metricas_inicio = time.perf_counter()
+        EM_ANDAMENTO.inc()
+
+    @app.after_request
+    def _status_metricas(response):
+        g.metricas_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finalizar_metricas(exc):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return
+        EM_ANDAMENTO.dec()
+        # Rotas inexistentes ficam agrupadas para não explodir a cardinalidade
+        endpoint = request.endpoint or 'nao_encontrado'
+        if endpoint in ('static', 'metrics'):
+            return
+        status = g.pop('metricas_status', 500 if exc else 200)
+        LATENCIA.labels(endpoint=endpoint, method=request.method).observe(time.perf_counter() - inicio)
+        REQUISICOES.labels(endpoint=endpoint, method=request.method, status=str(status)).inc()
+
+    @app.route('/metrics')
+    def metrics():
+        """Endpoint de scrape do Prometheus (protegido por METRICS_TOKEN, se definido)."""
+        if not _token_valido():
+            return Response('Não autorizado\n', status=401, mimetype='text/plain')
+        _atualizar_status_registros()
+        if get_multiproc_dir():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
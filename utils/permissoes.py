@@ -0,0 +1,130 @@
+# utils/permissoes.py
+"""Sessão, login e controle de acesso por permissão (RBAC).
+
+:func:`init_autenticacao` liga o Flask-Login e o Flask-Principal ao app;
+:func:`permission_required` protege as rotas dos blueprints em ``routes/``.
+"""
+
+import logging
+from datetime import datetime
+from functools import wraps
+
+from flask import flash, g, redirect, session, url_for
+from flask_login import LoginManager, current_user, logout_user
+from flask_principal import Need, Principal, RoleNeed, UserNeed, identity_loaded
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+principals = Principal()
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return User.query.get(int(user_id))
+
+
+# Variável global para controlar reinicializações do servidor
+SERVER_START_TIME = datetime.now().isoformat()
+
+
+# Função para limpar sessões antigas ao iniciar o sistema
+def clear_old_sessions():
+    """Limpa sessões antigas ao iniciar o sistema."""
+    try:
+        # Limpar sessões do Flask
+        session.clear()
+        logger.info("Sessões antigas limpas ao iniciar o sistema")
+    except Exception as e:
+        logger.warning(f"Erro ao limpar sessões: {e}")
+
+# A função clear_old_sessions será chamada apenas quando necessário
+# (por exemplo, no logout ou reinicialização do servidor)
+# Middleware para forçar logout se a sessão for inválida
+def check_session_validity():
+    """Verifica se a sessão é válida antes de cada requisição."""
+    if current_user.is_authenticated:
+        # Verificar se a sessão foi criada antes da reinicialização do servidor
+        session_start_time = session.get('server_start_time')
+        if session_start_time != SERVER_START_TIME:
+            # Sessão foi criada antes da reinicialização, forçar logout
+            logout_user()
+            session.clear()
+            flash('Servidor foi reiniciado. Faça login novamente.', 'warning')
+            return redirect(url_for('auth.login'))
+        
+        # Verificar se o usuário ainda existe no banco
+        try:
+            user = User.query.get(current_user.id)
+            if not user or user.status != 'ativo':
+                # Usuário não existe mais ou foi desativado
+                logout_user()
+                session.clear()
+                flash('Sua sessão expirou. Faça login novamente.', 'warning')
+                return redirect(url_for('auth.login'))
+        except Exception as e:
+            # Erro ao verificar usuário, forçar logout
+            logout_user()
+            session.clear()
+            flash('Erro na sessão. Faça login novamente.', 'warning')
+            return redirect(url_for('auth.login'))
+
+# Permissões padrão sugeridas
+PERMISSOES_PADRAO = {
+    'admin': ['manage_access', 'manage_registros', 'manage_responsaveis', 'manage_config', 'send_alerts'],
+    'gestor_acessos': ['manage_access'],
+    'operador': ['manage_registros', 'manage_responsaveis', 'send_alerts'],
+    'visualizador': []
+}
+
+
+# Carregar permissões do usuário logado
+def on_identity_loaded(sender, identity):
+    identity.user = current_user
+    if hasattr(current_user, 'id'):
+        identity.provides.add(UserNeed(current_user.id))
+    if hasattr(current_user, 'role') and current_user.role:
+        identity.provides.add(RoleNeed(current_user.role.nome))
+        # Adiciona permissões do perfil
+        for perm in current_user.role.permissions:
+            identity.provides.add(Need('permission', perm.nome))
+
+# --- Decorators e RBAC ---
+def permission_required(permission_name):
+    """
+    Decorator para proteger rotas por permissão.
+    Exemplo: @permission_required('manage_access')
+    Checa se o usuário logado tem a permissão via seu perfil (role).
+    Admin tem bypass automático em todas as permissões.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Primeiro verifica se está logado
+            if not current_user.is_authenticated:
+                return redirect(url_for('auth.login'))
+            
+            # Bypass para admin - admin tem acesso a tudo
+            if hasattr(current_user, 'role') and current_user.role and current_user.role.nome == 'admin':
+                return f(*args, **kwargs)
+            
+            # Depois verifica a permissão
+            need = Need('permission', permission_name)
+            if not hasattr(g, 'identity') or need not in getattr(g.identity, 'provides', set()):
+                flash('Você não tem permissão para acessar esta página.', 'danger')
+                return redirect(url_for('dashboards.dashboard'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def init_autenticacao(app):
+    """Registra login, identidade (permissões do perfil) e validação de sessão no app."""
+    login_manager.init_app(app)
+    principals.init_app(app)
+    identity_loaded.connect_via(app)(on_identity_loaded)
+    app.before_request(check_session_validity)
@@ -0,0 +1,179 @@
+# utils/replica.py
+"""Roteamento opcional de leituras para uma réplica do banco.
+
+Com ``DATABASE_REPLICA_URL`` definida, as rotas marcadas com
+:func:`somente_leitura` enviam seus SELECTs para a réplica. Escritas, flushes,
+``SELECT ... FOR UPDATE`` e ``session.connection()`` continuam no primário.
+A réplica é evitada quando:
+
+- falhou recentemente (fica fora por ``DATABASE_REPLICA_COOLDOWN`` segundos);
+- o atraso de replicação passa de ``DATABASE_REPLICA_MAX_LAG`` segundos;
+- o usuário escreveu há menos de ``DATABASE_REPLICA_STICKY`` segundos
+  (para que ele veja as próprias alterações).
+
+Para testar localmente basta uma cópia do arquivo SQLite ou uma segunda
+instância Postgres; o roteamento não depende de replicação real.
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+BIND_REPLICA = 'replica'
+_CHAVE_ULTIMA_ESCRITA = '_ultima_escrita'
+
+_estado = {'indisponivel_ate': 0.0, 'verificado_em': 0.0, 'atraso': None}
+_estado_lock = threading.Lock()
+
+
+def _float_env(nome, padrao):
+    return float(os.environ.get(nome, padrao))
+
+
+def get_replica_url():
+    return os.environ.get('DATABASE_REPLICA_URL') or None
+
+
+def configurar_replica(app, opcoes_engine=None):
+    """Registra a réplica como bind ``replica`` (antes de ``db.init_app``)."""
+    url = get_replica_url()
+    if not url:
+        return False
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[BIND_REPLICA] = {'url': url, **(opcoes_engine or {})}
+    app.config['SQLALCHEMY_BINDS'] = binds
+    logger.info("Réplica de leitura configurada")
+    return True
+
+
+# --- Saúde e atraso da réplica ---
+
+_SQL_ATRASO = {
+    'postgresql': (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+
+def _medir_atraso(engine):
+    """Atraso de replicação em segundos (0 para bancos sem replicação, como SQLite)."""
+    sql = _SQL_ATRASO.get(engine.dialect.name, 'SELECT 0')
+    with engine.connect() as conexao:
+        return float(conexao.execute(text(sql)).scalar() or 0)
+
+
+def marcar_indisponivel(motivo):
+    """Tira a réplica de uso por ``DATABASE_REPLICA_COOLDOWN`` segundos."""
+    with _estado_lock:
+        _estado['indisponivel_ate'] = time.monotonic() + _float_env('DATABASE_REPLICA_COOLDOWN', 30)
+        _estado['atraso'] = None
+    logger.warning(f"Réplica indisponível, usando o primário: {motivo}")
+
+
+def replica_saudavel(engine):
+    """Verifica (com cache de ``DATABASE_REPLICA_CHECK_INTERVAL`` s) se a réplica pode ser usada."""
+    agora = time.monotonic()
+    with _estado_lock:
+        if agora < _estado['indisponivel_ate']:
+            return False
+        if agora - _estado['verificado_em'] < _float_env('DATABASE_REPLICA_CHECK_INTERVAL', 5):
+            atraso = _estado['atraso']
+            return atraso is not None and atraso <= _float_env('DATABASE_REPLICA_MAX_LAG', 30)
+        # Outras threads seguem com o valor atual enquanto esta mede
+        _estado['verificado_em'] = agora
+    try:
+        atraso = _medir_atraso(engine)
+    except Exception as e:
+        marcar_indisponivel(e)
+        return False
+    with _estado_lock:
+        _estado['atraso'] = atraso
+    maximo = _float_env('DATABASE_REPLICA_MAX_LAG', 30)
+    if atraso > maximo:
+        logger.warning(f"Atraso da réplica de {atraso:.1f}s acima de {maximo:g}s; usando o primário")
+        return False
+    return True
+
+
+def estado_replica():
+    """Situação atual da réplica para diagnóstico."""
+    with _estado_lock:
+        indisponivel = max(0.0, _estado['indisponivel_ate'] - time.monotonic())
+        return {
+            'configurada': bool(get_replica_url()),
+            'atraso_segundos': _estado['atraso'],
+            'indisponivel_por_segundos': round(indisponivel, 1),
+        }
+
+
+# --- Sessão com roteamento ---
+
+def _leitura_roteavel(clause):
+    return (
+        clause is not None
+        and getattr(clause, 'is_select', False)
+        and getattr(clause, '_for_update_arg', None) is None
+    )
+
+
+def _escreveu_recentemente():
+    ultima = session.get(_CHAVE_ULTIMA_ESCRITA)
+    return ultima is not None and time.time() - ultima < _float_env('DATABASE_REPLICA_STICKY', 5)
+
+
+class SessaoRoteada(Session):
+    """Sessão do Flask-SQLAlchemy que envia leituras de rotas ``somente_leitura`` à réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context()
+                and g.get('usar_replica') and _leitura_roteavel(clause)):
+            engine = self._db.engines.get(BIND_REPLICA)
+            if engine is not None and replica_saudavel(engine):
+                g.replica_usada = True
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _registrar_escrita(sessao, flush_context):
+    # Leituras dos próximos segundos vão ao primário para o usuário ver o que gravou
+    if has_request_context() and get_replica_url():
+        session[_CHAVE_ULTIMA_ESCRITA] = time.time()
+
+
+def somente_leitura(f):
+    """Marca uma view como somente leitura: os SELECTs dela podem ir para a réplica.
+
+    Se a réplica falhar no meio da requisição, a view é executada novamente
+    no primário (seguro, pois ela não escreve).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not get_replica_url() or _escreveu_recentemente():
+            return f(*args, **kwargs)
+        g.usar_replica = True
+        g.replica_usada = False
+        try:
+            return f(*args, **kwargs)
+        except DBAPIError as e:
+            if not g.get('replica_usada'):
+                raise
+            from models import db
+            db.session.rollback()
+            marcar_indisponivel(e)
+            g.usar_replica = False
+            return f(*args, **kwargs)
+        finally:
+            g.usar_replica = False
+    return decorated_function
@@ -0,0 +1,213 @@
+# utils/sql_instrumentation.py
+"""Instrumentação de SQL por requisição.
+
+Conta os statements executados, o tempo total gasto no banco e o statement
+mais lento de cada requisição. O resultado sai no cabeçalho ``Server-Timing``,
+em uma linha de log ``chave=valor`` e em agregados por endpoint consultáveis em
+``/diagnostico/sql``. Statements acima de ``SQL_SLOW_QUERY_MS`` são logados com
+texto e parâmetros completos.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sql')
+
+_MAX_TEXTO = 2000  # Limite de caracteres para statements/parâmetros no log
+_local = threading.local()
+_agregados = {}
+_agregados_lock = threading.Lock()
+_listeners_registrados = False
+
+
+def get_slow_query_ms():
+    """Limite (ms) para logar statements lentos; 0 desativa."""
+    return float(os.environ.get('SQL_SLOW_QUERY_MS', '500'))
+
+
+class EstatisticasSQL:
+    """Acumulador de statements de uma requisição ou bloco de código."""
+
+    __slots__ = ('statements', 'tempo_ms', 'mais_lento_ms', 'mais_lento_sql')
+
+    def __init__(self):
+        self.statements = 0
+        self.tempo_ms = 0.0
+        self.mais_lento_ms = 0.0
+        self.mais_lento_sql = None
+
+    def registrar(self, statement, duracao_ms):
+        self.statements += 1
+        self.tempo_ms += duracao_ms
+        if duracao_ms > self.mais_lento_ms:
+            self.mais_lento_ms = duracao_ms
+            self.mais_lento_sql = statement
+
+    def to_dict(self):
+        return {
+            'statements': self.statements,
+            'tempo_ms': round(self.tempo_ms, 2),
+            'mais_lento_ms': round(self.mais_lento_ms, 2),
+            'mais_lento_sql': _resumir(self.mais_lento_sql, 200),
+        }
+
+
+def _resumir(texto, limite=_MAX_TEXTO):
+    if texto is None:
+        return None
+    texto = ' '.join(str(texto).split())
+    return texto if len(texto) <= limite else texto[:limite] + '...'
+
+
+def _coletor_atual():
+    """Coletor ativo: bloco ``coletar_sql`` da thread ou a requisição corrente."""
+    pilha = getattr(_local, 'coletores', None)
+    if pilha:
+        return pilha[-1]
+    if has_request_context():
+        return g.get('sql_stats')
+    return None
+
+
+# --- Listeners do SQLAlchemy ---
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sql_inicio', []).append(time.perf_counter())
+
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('sql_inicio')
+    if not inicios:
+        return
+    duracao_ms = (time.perf_counter() - inicios.pop()) * 1000
+
+    coletor = _coletor_atual()
+    if coletor is not None:
+        coletor.registrar(statement, duracao_ms)
+
+    limite = get_slow_query_ms()
+    if limite and duracao_ms >= limite:
+        endpoint = request.endpoint if has_request_context() else None
+        logger.warning(
+            f"sql_lento duracao_ms={duracao_ms:.1f} endpoint={endpoint} "
+            f"executemany={executemany} statement=\"{_resumir(statement)}\" "
+            f"params={_resumir(repr(parameters))}"
+        )
+
+
+def _erro_execucao(exception_context):
+    # Statement falhou: descartar o início pendente para não desalinhar a pilha
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('sql_inicio'):
+        conn.info['sql_inicio'].pop()
+
+
+def registrar_listeners():
+    """Liga os listeners a todos os engines (primário e réplicas)."""
+    global _listeners_registrados
+    if _listeners_registrados:
+        return
+    event.listen(Engine, 'before_cursor_execute', _antes_execucao)
+    event.listen(Engine, 'after_cursor_execute', _depois_execucao)
+    event.listen(Engine, 'handle_error', _erro_execucao)
+    _listeners_registrados = True
+
+
+@contextmanager
+def coletar_sql():
+    """Coleta estatísticas de SQL fora de requisições (jobs, CLI).
+
+    Exemplo::
+
+        with coletar_sql() as stats:
+            enviar_alertas_vencimento()
+        logger.info(f"{stats.statements} statements em {stats.tempo_ms:.1f}ms")
+    """
+    stats = EstatisticasSQL()
+    pilha = getattr(_local, 'coletores', None)
+    if pilha is None:
+        pilha = _local.coletores = []
+    pilha.append(stats)
+    try:
+        yield stats
+    finally:
+        pilha.pop()
+
+
+# --- Agregados por endpoint ---
+
+def _agregar(endpoint, stats):
+    with _agregados_lock:
+        agregado = _agregados.get(endpoint)
+        if agregado is None:
+            agregado = _agregados[endpoint] = {
+                'requisicoes': 0, 'statements': 0, 'tempo_ms': 0.0,
+                'max_statements': 0, 'max_tempo_ms': 0.0, 'mais_lento_sql': None,
+            }
+        agregado['requisicoes'] += 1
+        agregado['statements'] += stats.statements
+        agregado['tempo_ms'] += stats.tempo_ms
+        agregado['max_statements'] = max(agregado['max_statements'], stats.statements)
+        if stats.tempo_ms > agregado['max_tempo_ms']:
+            agregado['max_tempo_ms'] = stats.tempo_ms
+            agregado['mais_lento_sql'] = _resumir(stats.mais_lento_sql, 200)
+
+
+def obter_agregados():
+    """Agregados do processo atual, ordenados pela média de statements por requisição."""
+    with _agregados_lock:
+        copia = {endpoint: dict(valores) for endpoint, valores in _agregados.items()}
+    resultado = []
+    for endpoint, valores in copia.items():
+        requisicoes = valores['requisicoes']
+        resultado.append({
+            'endpoint': endpoint,
+            'requisicoes': requisicoes,
+            'media_statements': round(valores['statements'] / requisicoes, 2),
+            'media_tempo_ms': round(valores['tempo_ms'] / requisicoes, 2),
+            'max_statements': valores['max_statements'],
+            'max_tempo_ms': round(valores['max_tempo_ms'], 2),
+            'mais_lento_sql': valores['mais_lento_sql'],
+        })
+    resultado.sort(key=lambda item: item['media_statements'], reverse=True)
+    return resultado
+
+
+# --- Integração com o Flask ---
+
+def init_sql_instrumentation(app):
+    """Registra os listeners e os hooks de requisição (``SQL_INSTRUMENTATION=false`` desativa)."""
+    if os.environ.get('SQL_INSTRUMENTATION', 'true').lower() != 'true':
+        return
+
+    registrar_listeners()
+
+    @app.before_request
+    def _iniciar_estatisticas_sql():
+        g.sql_stats = EstatisticasSQL()
+
+    @app.after_request
+    def _publicar_estatisticas_sql(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        endpoint = request.endpoint or 'desconhecido'
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.tempo_ms:.1f};desc="{stats.statements} statements"'
+        )
+        if endpoint != 'static':
+            _agregar(endpoint, stats)
+            logger.info(
+                f"sql_request endpoint={endpoint} method={request.method} status={response.status_code} "
+                f"statements={stats.statements} sql_ms={stats.tempo_ms:.1f} "
+                f"mais_lento_ms={stats.mais_lento_ms:.1f}"
+            )
+        return response
@@ -0,0 +1,76 @@
+# utils/startup_profile.py
+"""Perfil de tempo de importação da aplicação (``python -X importtime``).
+
+:func:`perfilar_importacao` importa o módulo em um processo novo (o mesmo
+caminho de um worker do gunicorn ou de um comando do ``manage_db.py``) e
+agrega o relatório do interpretador por pacote. Usado pelo comando
+``manage_db.py startup-profile``.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+# Subsistemas que só devem ser carregados no primeiro uso
+OPCIONAIS = ('ldap3', 'flask_mail', 'apscheduler', 'wtforms')
+
+_LINHA = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+_MARCA = '__startup_profile_ms__'
+
+
+def perfilar_importacao(modulo='app', diretorio=None, papel='web'):
+    """Importa ``modulo`` em um processo novo e retorna o perfil.
+
+    Se o módulo tiver ``create_app``, a aplicação do ``papel`` também é criada
+    (é o que um worker ou comando faz na subida). Retorna um dict com
+    ``total_ms`` (tempo de parede do import e da criação do app), ``pacotes`` (tempo próprio por
+    pacote de topo, em ms, do maior para o menor), ``diretos`` (imports
+    feitos pelo próprio módulo, com tempo acumulado em ms) e ``opcionais``
+    (subsistemas de :data:`OPCIONAIS` carregados na subida).
+    """
+    diretorio = diretorio or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    codigo = (f"import time; inicio = time.perf_counter(); import {modulo}; "
+              f"criar = getattr({modulo}, 'create_app', None); criar and criar({papel!r}); "
+              f"print({_MARCA!r}, (time.perf_counter() - inicio) * 1000)")
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=diretorio, capture_output=True, text=True, env=dict(os.environ)
+    )
+    total_ms = None
+    for linha in processo.stdout.splitlines():
+        if linha.startswith(_MARCA):
+            total_ms = float(linha.split()[1])
+    if processo.returncode != 0 or total_ms is None:
+        erro = [linha for linha in processo.stderr.splitlines() if not linha.startswith('import time:')]
+        raise RuntimeError(f"Falha ao importar {modulo}: {' '.join(erro[-3:]) or processo.returncode}")
+
+    linhas = [_LINHA.match(linha) for linha in processo.stderr.splitlines()]
+    linhas = [linha.groups() for linha in linhas if linha]
+    pacotes = Counter()
+    for proprio, _, _, nome in linhas:
+        pacotes[nome.split('.')[0]] += int(proprio)
+
+    # Cada módulo aparece depois das suas dependências, com recuo de dois
+    # espaços por nível: os imports diretos do alvo são as linhas anteriores
+    # a ele com um nível a mais
+    diretos = []
+    posicoes = [i for i, linha in enumerate(linhas) if linha[3] == modulo]
+    if posicoes:
+        nivel = len(linhas[posicoes[-1]][2])
+        for proprio, acumulado, recuo, nome in reversed(linhas[:posicoes[-1]]):
+            if len(recuo) <= nivel:
+                break
+            if len(recuo) == nivel + 2:
+                diretos.append((nome, int(acumulado) / 1000))
+        diretos.sort(key=lambda item: item[1], reverse=True)
+
+    return {
+        'modulo': modulo,
+        'papel': papel,
+        'total_ms': round(total_ms, 1),
+        'pacotes': [(nome, round(us / 1000, 1)) for nome, us in pacotes.most_common()],
+        'diretos': [(nome, round(ms, 1)) for nome, ms in diretos],
+        'opcionais': [nome for nome in OPCIONAIS if nome in pacotes],
+    }
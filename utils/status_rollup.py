@@ -0,0 +1,299 @@
+# utils/status_rollup.py
+"""Rollup incremental de registros por (tipo, status).
+
+Os contadores são mantidos por eventos da sessão do SQLAlchemy (criação,
+edição, regularização e exclusão de registros) e classificados em relação a
+uma data de referência persistida em ``rollup_estado``. Como o status depende
+do dia, a data de referência é avançada pelo job noturno (e na inicialização do
+agendador, se uma virada foi perdida). As leituras não gravam: enquanto a
+referência está atrasada, a diferença até hoje é somada em memória.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, timedelta
+
+from sqlalchemy import case, event, func, inspect, select, true, update
+
+from models import db, Registro, RegistroStatusRollup, RollupEstado
+
+logger = logging.getLogger(__name__)
+
+NOME_ROLLUP = 'registro_status'
+DIAS_VENCENDO = 7  # Mesma janela usada pelos dashboards
+STATUS = ('vencido', 'vencendo', 'valido')
+
+_CHAVE_DELTAS = 'status_rollup_deltas'
+_eventos_registrados = False
+
+
+def classificar(data_vencimento, regularizado, referencia):
+    """Status de um registro na data de referência.
+
+    ``regularizado`` nulo conta como válido, igual aos filtros
+    ``regularizado == False`` dos dashboards.
+    """
+    if regularizado is not False or data_vencimento is None:
+        return 'valido'
+    if data_vencimento < referencia:
+        return 'vencido'
+    if data_vencimento <= referencia + timedelta(days=DIAS_VENCENDO):
+        return 'vencendo'
+    return 'valido'
+
+
+def _expressao_status(referencia):
+    """Equivalente SQL de :func:`classificar`."""
+    pendente = Registro.regularizado == False  # noqa: E712
+    return case(
+        (pendente & (Registro.data_vencimento < referencia), 'vencido'),
+        (pendente & (Registro.data_vencimento <= referencia + timedelta(days=DIAS_VENCENDO)), 'vencendo'),
+        else_='valido'
+    )
+
+
+# --- Aplicação de deltas ---
+
+def _aplicar_deltas(conexao, deltas):
+    """Soma os deltas {(tipo, status): n} aos contadores com upsert atômico."""
+    tabela = RegistroStatusRollup.__table__
+    dialeto = conexao.dialect.name
+    for (tipo, status), delta in deltas.items():
+        if not delta:
+            continue
+        if dialeto in ('postgresql', 'sqlite'):
+            if dialeto == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(tabela).values(tipo=tipo, status=status, total=delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabela.c.tipo, tabela.c.status],
+                set_={'total': tabela.c.total + stmt.excluded.total}
+            )
+            conexao.execute(stmt)
+            continue
+        resultado = conexao.execute(
+            update(tabela)
+            .where(tabela.c.tipo == tipo, tabela.c.status == status)
+            .values(total=tabela.c.total + delta)
+        )
+        if not resultado.rowcount:
+            conexao.execute(tabela.insert().values(tipo=tipo, status=status, total=delta))
+
+
+def _data_referencia(conexao, bloquear=False):
+    """Lê a data de referência do rollup (``None`` se ainda não foi construído)."""
+    tabela = RollupEstado.__table__
+    consulta = select(tabela.c.data_referencia).where(tabela.c.nome == NOME_ROLLUP)
+    if bloquear:
+        # Serializa com a virada de dia; ignorado pelo SQLite, que já serializa escritas
+        consulta = consulta.with_for_update()
+    return conexao.execute(consulta).scalar()
+
+
+# --- Eventos da sessão ---
+
+def _valor_anterior(estado, atributo):
+    """Valor do atributo antes das alterações pendentes."""
+    historico = estado.attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.unchanged:
+        return historico.unchanged[0]
+    return getattr(estado.obj(), atributo)
+
+
+def _coletar_deltas(session, flush_context, instances):
+    novos = [obj for obj in session.new if isinstance(obj, Registro)]
+    excluidos = [obj for obj in session.deleted if isinstance(obj, Registro)]
+    alterados = [obj for obj in session.dirty
+                 if isinstance(obj, Registro) and session.is_modified(obj, include_collections=False)]
+    if not (novos or excluidos or alterados):
+        return
+
+    referencia = _data_referencia(session.connection(), bloquear=True)
+    if referencia is None:
+        # Rollup ainda não construído; a virada do agendador fará a reconstrução
+        return
+
+    deltas = session.info.setdefault(_CHAVE_DELTAS, Counter())
+    for obj in novos:
+        regularizado = obj.regularizado if obj.regularizado is not None else False
+        deltas[(obj.tipo, classificar(obj.data_vencimento, regularizado, referencia))] += 1
+    for obj in excluidos:
+        estado = inspect(obj)
+        anterior = (_valor_anterior(estado, 'tipo'),
+                    classificar(_valor_anterior(estado, 'data_vencimento'),
+                                _valor_anterior(estado, 'regularizado'), referencia))
+        deltas[anterior] -= 1
+    for obj in alterados:
+        estado = inspect(obj)
+        anterior = (_valor_anterior(estado, 'tipo'),
+                    classificar(_valor_anterior(estado, 'data_vencimento'),
+                                _valor_anterior(estado, 'regularizado'), referencia))
+        atual = (obj.tipo, classificar(obj.data_vencimento, obj.regularizado, referencia))
+        if anterior != atual:
+            deltas[anterior] -= 1
+            deltas[atual] += 1
+
+
+def _gravar_deltas(session, flush_context):
+    deltas = session.info.pop(_CHAVE_DELTAS, None)
+    if deltas:
+        _aplicar_deltas(session.connection(), deltas)
+
+
+def _descartar_deltas(session, previous_transaction=None):
+    session.info.pop(_CHAVE_DELTAS, None)
+
+
+def registrar_eventos():
+    """Liga a manutenção do rollup aos flushes da sessão da aplicação."""
+    global _eventos_registrados
+    if _eventos_registrados:
+        return
+    event.listen(db.session, 'before_flush', _coletar_deltas)
+    event.listen(db.session, 'after_flush', _gravar_deltas)
+    event.listen(db.session, 'after_soft_rollback', _descartar_deltas)
+    _eventos_registrados = True
+
+
+# --- Reconstrução e virada de dia ---
+
+def _deltas_virada(conexao, referencia, hoje):
+    """Deltas {(tipo, status): n} da passagem de ``referencia`` para ``hoje``.
+
+    Só mudam de status registros pendentes com vencimento entre a referência
+    antiga e ``hoje + DIAS_VENCENDO``; a diferença sai de uma única consulta
+    agrupada. ``conexao`` é a conexão da transação da virada ou, nas leituras,
+    a própria sessão.
+    """
+    status_antigo = _expressao_status(referencia)
+    status_novo = _expressao_status(hoje)
+    linhas = conexao.execute(
+        select(Registro.tipo, status_antigo, status_novo, func.count(Registro.id))
+        .where(
+            Registro.regularizado == False,  # noqa: E712
+            Registro.data_vencimento >= referencia,
+            Registro.data_vencimento <= hoje + timedelta(days=DIAS_VENCENDO)
+        )
+        .group_by(Registro.tipo, status_antigo, status_novo)
+    ).all()
+
+    deltas = Counter()
+    for tipo, antigo, novo, total in linhas:
+        if antigo != novo:
+            deltas[(tipo, antigo)] -= total
+            deltas[(tipo, novo)] += total
+    return deltas
+
+
+def reconstruir_status_rollup(hoje=None):
+    """Recalcula todos os contadores a partir da tabela de registros."""
+    hoje = hoje or date.today()
+    conexao = db.session.connection()
+    tabela_estado = RollupEstado.__table__
+    if _data_referencia(conexao, bloquear=True) is None:
+        conexao.execute(tabela_estado.insert().values(nome=NOME_ROLLUP, data_referencia=hoje))
+    else:
+        conexao.execute(
+            update(tabela_estado)
+            .where(tabela_estado.c.nome == NOME_ROLLUP)
+            .values(data_referencia=hoje, atualizado_em=func.now())
+        )
+
+    status = _expressao_status(hoje)
+    linhas = conexao.execute(
+        select(Registro.tipo, status, func.count(Registro.id)).group_by(Registro.tipo, status)
+    ).all()
+    conexao.execute(RegistroStatusRollup.__table__.delete())
+    if linhas:
+        conexao.execute(
+            RegistroStatusRollup.__table__.insert(),
+            [{'tipo': tipo, 'status': st, 'total': total} for tipo, st, total in linhas]
+        )
+    db.session.commit()
+    logger.info(f"Rollup de status reconstruído para {hoje} ({len(linhas)} grupos)")
+    return len(linhas)
+
+
+def avancar_data_referencia(hoje=None):
+    """Avança a data de referência até ``hoje`` reclassificando apenas o intervalo afetado.
+
+    Chamada pelo job noturno; constrói o rollup se ainda não existe. Retorna
+    True se a data foi avançada por esta chamada.
+    """
+    hoje = hoje or date.today()
+    conexao = db.session.connection()
+    referencia = _data_referencia(conexao)
+    if referencia is None:
+        reconstruir_status_rollup(hoje)
+        return True
+    if referencia >= hoje:
+        return False
+
+    tabela_estado = RollupEstado.__table__
+    reivindicado = conexao.execute(
+        update(tabela_estado)
+        .where(tabela_estado.c.nome == NOME_ROLLUP, tabela_estado.c.data_referencia == referencia)
+        .values(data_referencia=hoje, atualizado_em=func.now())
+    )
+    if reivindicado.rowcount != 1:
+        # Outro worker avançou primeiro
+        return False
+
+    _aplicar_deltas(conexao, _deltas_virada(conexao, referencia, hoje))
+    db.session.commit()
+    logger.info(f"Rollup de status avançado de {referencia} para {hoje}")
+    return True
+
+
+# --- Leitura ---
+
+def obter_contadores(hoje=None):
+    """Retorna {(tipo, status): total} já na data de hoje, sem gravar.
+
+    Referência e contadores vêm da mesma consulta (mesmo instante). Com a
+    referência atrasada (virada ainda não executada), a diferença até ``hoje``
+    é somada em memória; sem rollup construído, conta direto nos registros.
+    As consultas passam pela sessão, então em rotas ``somente_leitura`` vão
+    para o mesmo banco (réplica ou primário) que as versões do ETag.
+    """
+    hoje = hoje or date.today()
+    tabela_estado = RollupEstado.__table__
+    tabela = RegistroStatusRollup.__table__
+    linhas = db.session.execute(
+        select(tabela_estado.c.data_referencia, tabela.c.tipo, tabela.c.status, tabela.c.total)
+        .select_from(tabela_estado.outerjoin(tabela, true()))
+        .where(tabela_estado.c.nome == NOME_ROLLUP)
+    ).all()
+    if not linhas:
+        status = _expressao_status(hoje)
+        return {(tipo, st): total for tipo, st, total in db.session.execute(
+            select(Registro.tipo, status, func.count(Registro.id)).group_by(Registro.tipo, status)
+        )}
+
+    referencia = linhas[0][0]
+    contadores = Counter({(tipo, status): total for _, tipo, status, total in linhas if tipo is not None})
+    if referencia < hoje:
+        for chave, delta in _deltas_virada(db.session, referencia, hoje).items():
+            contadores[chave] += delta
+    return dict(contadores)
+
+
+def resumo_status(hoje=None):
+    """Totais consolidados usados pelos dashboards."""
+    contadores = obter_contadores(hoje)
+    por_status = Counter()
+    por_tipo = Counter()
+    for (tipo, status), total in contadores.items():
+        por_status[status] += total
+        por_tipo[tipo] += total
+    return {
+        'total': sum(por_status.values()),
+        'vencidos': por_status['vencido'],
+        'vencendo': por_status['vencendo'],
+        'validos': por_status['valido'],
+        'por_tipo': dict(por_tipo),
+    }
@@ -0,0 +1,62 @@
+# utils/template_cache.py
+"""Cache de bytecode dos templates e aquecimento na subida dos workers.
+
+Com ``max_requests`` os workers do gunicorn são reciclados com frequência, e
+cada worker novo compilava os templates (``base.html`` tem mais de mil
+linhas) na primeira requisição que os usava. :func:`configurar_cache_templates`
+grava o código compilado em disco (``JINJA_CACHE_DIR``), então a compilação
+acontece uma vez por versão do template, e :func:`aquecer_templates` carrega
+todos os templates antes do worker atender requisições.
+"""
+
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DESLIGADO = ('false', 'off', '0', 'no')
+
+
+def configurar_cache_templates(app):
+    """Liga o cache de bytecode do Jinja em ``app.jinja_env``.
+
+    Sem ``JINJA_CACHE_DIR`` é usado o diretório temporário do sistema (um por
+    usuário); ``JINJA_CACHE_DIR=false`` desliga o cache.
+    """
+    from jinja2 import FileSystemBytecodeCache
+
+    diretorio = os.environ.get('JINJA_CACHE_DIR', '').strip()
+    if diretorio.lower() in DESLIGADO:
+        return None
+    if diretorio:
+        try:
+            os.makedirs(diretorio, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Cache de templates desligado: não foi possível criar {diretorio}: {e}")
+            return None
+    # Cada arquivo guarda o checksum do template e a versão do Python; entradas
+    # de outra versão do template ou do interpretador são recompiladas
+    cache = FileSystemBytecodeCache(diretorio or None)
+    app.jinja_env.bytecode_cache = cache
+    return cache
+
+
+def aquecer_templates(app):
+    """Compila (ou lê do cache de bytecode) todos os templates da aplicação.
+
+    Retorna ``(quantidade, segundos)``. Templates com erro de sintaxe são
+    apenas logados; o erro aparece de novo quando a página for acessada.
+    """
+    env = app.jinja_env
+    inicio = time.perf_counter()
+    quantidade = 0
+    for nome in env.list_templates():
+        try:
+            env.get_template(nome)
+            quantidade += 1
+        except Exception as e:
+            logger.warning(f"Falha ao pré-compilar o template {nome}: {e}")
+    segundos = time.perf_counter() - inicio
+    logger.info(f"{quantidade} templates carregados em {segundos * 1000:.0f}ms")
+    return quantidade, segundos